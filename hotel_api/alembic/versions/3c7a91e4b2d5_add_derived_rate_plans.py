@@ -0,0 +1,32 @@
+"""Add derived rate plans
+
+Revision ID: 3c7a91e4b2d5
+Revises: 58de663f6d0d
+Create Date: 2026-10-17 11:26:52.804117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7a91e4b2d5'
+down_revision = '58de663f6d0d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('rate_plans', sa.Column('parent_plan_id', sa.Integer(), nullable=True))
+    op.add_column('rate_plans', sa.Column('modifier_type', sa.Enum('percent', 'amount', name='ratemodifiertype'), nullable=True))
+    op.add_column('rate_plans', sa.Column('modifier_value', sa.Float(), nullable=True))
+    op.add_column('rate_plans', sa.Column('rounding', sa.Enum('none', 'whole', 'tens', 'hundreds', name='pricerounding'), server_default='none', nullable=False))
+    op.create_foreign_key('fk_rate_plans_parent_plan_id', 'rate_plans', 'rate_plans', ['parent_plan_id'], ['id'])
+
+
+def downgrade():
+    op.drop_constraint('fk_rate_plans_parent_plan_id', 'rate_plans', type_='foreignkey')
+    op.drop_column('rate_plans', 'rounding')
+    op.drop_column('rate_plans', 'modifier_value')
+    op.drop_column('rate_plans', 'modifier_type')
+    op.drop_column('rate_plans', 'parent_plan_id')
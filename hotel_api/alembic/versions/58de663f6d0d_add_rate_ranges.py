@@ -0,0 +1,38 @@
+"""Add rate_ranges
+
+Revision ID: 58de663f6d0d
+Revises: 825222fdeb88
+Create Date: 2026-10-17 10:41:07.310552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '58de663f6d0d'
+down_revision = '825222fdeb88'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rate_ranges',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date_from', sa.Date(), nullable=False),
+    sa.Column('date_to', sa.Date(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('weekday_mask', sa.Integer(), nullable=False),
+    sa.Column('room_type', sa.String(length=100), nullable=False),
+    sa.Column('rate_plan_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['rate_plan_id'], ['rate_plans.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_rate_ranges_id'), 'rate_ranges', ['id'], unique=False)
+    op.create_index('ix_rate_ranges_room_type_plan_dates', 'rate_ranges', ['room_type', 'rate_plan_id', 'date_from', 'date_to'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_rate_ranges_room_type_plan_dates', table_name='rate_ranges')
+    op.drop_index(op.f('ix_rate_ranges_id'), table_name='rate_ranges')
+    op.drop_table('rate_ranges')
@@ -0,0 +1,37 @@
+"""Add room floor
+
+Revision ID: 6b2e8d5f1c09
+Revises: a41f0c2d9e73
+Create Date: 2026-10-17 13:15:44.902318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b2e8d5f1c09'
+down_revision = 'a41f0c2d9e73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('rooms', sa.Column('floor', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_rooms_floor'), 'rooms', ['floor'], unique=False)
+
+    # --- Backfill: patro odvodíme z čísla pokoje ve tvaru "PNN" (např. 101 -> 1, 1203 -> 12) ---
+    rooms = sa.table('rooms', sa.column('id', sa.Integer), sa.column('number', sa.String), sa.column('floor', sa.Integer))
+    bind = op.get_bind()
+    updates = [
+        {'room_id': room_id, 'floor': int(number) // 100}
+        for room_id, number in bind.execute(sa.select(rooms.c.id, rooms.c.number)).fetchall()
+        if number and number.isdigit() and len(number) >= 3
+    ]
+    if updates:
+        bind.execute(rooms.update().where(rooms.c.id == sa.bindparam('room_id')).values(floor=sa.bindparam('floor')), updates)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_rooms_floor'), table_name='rooms')
+    op.drop_column('rooms', 'floor')
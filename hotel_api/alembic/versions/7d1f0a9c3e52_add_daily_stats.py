@@ -0,0 +1,100 @@
+"""Add daily_stats rollup
+
+Revision ID: 7d1f0a9c3e52
+Revises: e5d4c3b2a190
+Create Date: 2026-10-17 15:20:44.803114
+
+"""
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d1f0a9c3e52'
+down_revision = 'e5d4c3b2a190'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+# Prodané noci (Enum sloupec ukládá názvy členů ReservationStatus)
+SOLD_STATUSES = ['potvrzeno', 'ubytovan', 'odhlasen']
+
+
+def upgrade():
+    op.create_table('daily_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('room_type', sa.String(length=100), nullable=False),
+    sa.Column('rooms_sold', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('room_revenue', sa.Float(), server_default='0', nullable=False),
+    sa.Column('other_revenue', sa.Float(), server_default='0', nullable=False),
+    sa.Column('payments', sa.Float(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'room_type', name='uq_daily_stats_day_room_type')
+    )
+    op.create_index(op.f('ix_daily_stats_id'), 'daily_stats', ['id'], unique=False)
+
+    # --- Backfill z existujících rezervací, účtů a plateb (stejný výpočet jako app.stats) ---
+    daily_stats = sa.table('daily_stats',
+        sa.column('day', sa.Date), sa.column('room_type', sa.String),
+        sa.column('rooms_sold', sa.Integer), sa.column('room_revenue', sa.Float),
+        sa.column('other_revenue', sa.Float), sa.column('payments', sa.Float))
+    rooms = sa.table('rooms', sa.column('id', sa.Integer), sa.column('type', sa.String))
+    reservations = sa.table('reservations',
+        sa.column('id', sa.Integer), sa.column('room_id', sa.Integer), sa.column('status', sa.String),
+        sa.column('check_in_date', sa.Date), sa.column('check_out_date', sa.Date),
+        sa.column('accommodation_price', sa.Float))
+    room_charges = sa.table('room_charges',
+        sa.column('reservation_id', sa.Integer), sa.column('total_price', sa.Float), sa.column('charged_at', sa.DateTime))
+    payments = sa.table('payments',
+        sa.column('reservation_id', sa.Integer), sa.column('amount', sa.Float), sa.column('paid_at', sa.DateTime))
+
+    bind = op.get_bind()
+    # Souhrn má jen (dny x typy pokojů) buněk; zdrojové řádky se čtou po dávkách
+    totals = {}
+
+    def add(day, room_type, column, value):
+        cell = totals.setdefault((day, room_type), dict(rooms_sold=0, room_revenue=0.0, other_revenue=0.0, payments=0.0))
+        cell[column] += value
+
+    sold = (
+        sa.select(rooms.c.type, reservations.c.check_in_date, reservations.c.check_out_date, reservations.c.accommodation_price)
+        .join(rooms, reservations.c.room_id == rooms.c.id)
+        .where(reservations.c.status.in_(SOLD_STATUSES))
+    )
+    for partition in bind.execution_options(stream_results=True).execute(sold).partitions(BATCH_SIZE):
+        for room_type, check_in, check_out, price in partition:
+            nights = (check_out - check_in).days
+            if nights <= 0:
+                continue
+            # Rovnoměrně po haléřích, zbytek na poslední noc (app.stats.nightly_revenue)
+            per_night = round((price or 0.0) / nights, 2)
+            for i in range(nights):
+                revenue = per_night if i < nights - 1 else round((price or 0.0) - per_night * (nights - 1), 2)
+                add(check_in + timedelta(days=i), room_type, 'rooms_sold', 1)
+                add(check_in + timedelta(days=i), room_type, 'room_revenue', revenue)
+
+    for table, amount, stamp, column in (
+        (room_charges, room_charges.c.total_price, room_charges.c.charged_at, 'other_revenue'),
+        (payments, payments.c.amount, payments.c.paid_at, 'payments'),
+    ):
+        query = (
+            sa.select(rooms.c.type, stamp, amount)
+            .join(reservations, table.c.reservation_id == reservations.c.id)
+            .join(rooms, reservations.c.room_id == rooms.c.id)
+            .where(stamp.is_not(None))
+        )
+        for partition in bind.execution_options(stream_results=True).execute(query).partitions(BATCH_SIZE):
+            for room_type, at, value in partition:
+                add(at.date(), room_type, column, value or 0.0)
+
+    rows = [{'day': day, 'room_type': room_type, **values} for (day, room_type), values in sorted(totals.items())]
+    for i in range(0, len(rows), BATCH_SIZE):
+        op.bulk_insert(daily_stats, rows[i:i + BATCH_SIZE])
+
+
+def downgrade():
+    op.drop_index(op.f('ix_daily_stats_id'), table_name='daily_stats')
+    op.drop_table('daily_stats')
@@ -0,0 +1,33 @@
+"""Unique rate per day, room type and plan
+
+Revision ID: 825222fdeb88
+Revises: ee049710741d
+Create Date: 2026-10-17 10:03:18.552910
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '825222fdeb88'
+down_revision = 'ee049710741d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Opakovaná nahrání ceníku vytvořila duplicity - ponecháme vždy naposledy vloženou cenu
+    op.execute(
+        "DELETE r_old FROM rates AS r_old "
+        "JOIN rates AS r_new "
+        "ON r_new.room_type = r_old.room_type "
+        "AND r_new.rate_plan_id = r_old.rate_plan_id "
+        "AND r_new.date = r_old.date "
+        "AND r_new.id > r_old.id"
+    )
+    op.create_unique_constraint('uq_rates_room_type_plan_date', 'rates', ['room_type', 'rate_plan_id', 'date'])
+
+
+def downgrade():
+    op.drop_constraint('uq_rates_room_type_plan_date', 'rates', type_='unique')
@@ -0,0 +1,46 @@
+"""Hot path composite indexes
+
+Revision ID: 9a6c2e1f4b87
+Revises: 2c8e4b7a9d13
+Create Date: 2026-10-17 16:48:31.905126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a6c2e1f4b87'
+down_revision = '2c8e4b7a9d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_reservations_room_id_dates', 'reservations', ['room_id', 'check_in_date', 'check_out_date'], unique=False)
+    op.create_index('ix_reservations_status_dates', 'reservations', ['status', 'check_out_date', 'check_in_date'], unique=False)
+    op.create_index('ix_reservations_check_out_date_check_in_date', 'reservations', ['check_out_date', 'check_in_date'], unique=False)
+    op.create_index('ix_tasks_assignee_id_due_date', 'tasks', ['assignee_id', 'due_date'], unique=False)
+    op.create_index('ix_tasks_room_id_due_date', 'tasks', ['room_id', 'due_date'], unique=False)
+    op.create_index('ix_tasks_status_due_date', 'tasks', ['status', 'due_date'], unique=False)
+    op.create_index('ix_tasks_due_date', 'tasks', ['due_date'], unique=False)
+    op.create_index('ix_room_blocks_room_id_dates', 'room_blocks', ['room_id', 'start_date', 'end_date'], unique=False)
+    op.create_index('ix_room_blocks_end_date_start_date', 'room_blocks', ['end_date', 'start_date'], unique=False)
+    op.create_index('ix_stock_location_id_item_id', 'stock', ['location_id', 'item_id'], unique=False)
+    op.create_index(op.f('ix_room_charges_reservation_id'), 'room_charges', ['reservation_id'], unique=False)
+    op.create_index(op.f('ix_payments_reservation_id'), 'payments', ['reservation_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_payments_reservation_id'), table_name='payments')
+    op.drop_index(op.f('ix_room_charges_reservation_id'), table_name='room_charges')
+    op.drop_index('ix_stock_location_id_item_id', table_name='stock')
+    op.drop_index('ix_room_blocks_end_date_start_date', table_name='room_blocks')
+    op.drop_index('ix_room_blocks_room_id_dates', table_name='room_blocks')
+    op.drop_index('ix_tasks_due_date', table_name='tasks')
+    op.drop_index('ix_tasks_status_due_date', table_name='tasks')
+    op.drop_index('ix_tasks_room_id_due_date', table_name='tasks')
+    op.drop_index('ix_tasks_assignee_id_due_date', table_name='tasks')
+    op.drop_index('ix_reservations_check_out_date_check_in_date', table_name='reservations')
+    op.drop_index('ix_reservations_status_dates', table_name='reservations')
+    op.drop_index('ix_reservations_room_id_dates', table_name='reservations')
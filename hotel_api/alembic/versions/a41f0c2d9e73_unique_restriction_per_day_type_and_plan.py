@@ -0,0 +1,33 @@
+"""Unique restriction per day, room type and plan
+
+Revision ID: a41f0c2d9e73
+Revises: 3c7a91e4b2d5
+Create Date: 2026-10-17 12:08:31.447190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f0c2d9e73'
+down_revision = '3c7a91e4b2d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Případné duplicity - ponecháme vždy naposledy vloženou restrikci
+    op.execute(
+        "DELETE r_old FROM restrictions AS r_old "
+        "JOIN restrictions AS r_new "
+        "ON r_new.room_type = r_old.room_type "
+        "AND r_new.rate_plan_id = r_old.rate_plan_id "
+        "AND r_new.date = r_old.date "
+        "AND r_new.id > r_old.id"
+    )
+    op.create_unique_constraint('uq_restrictions_room_type_plan_date', 'restrictions', ['room_type', 'rate_plan_id', 'date'])
+
+
+def downgrade():
+    op.drop_constraint('uq_restrictions_room_type_plan_date', 'restrictions', type_='unique')
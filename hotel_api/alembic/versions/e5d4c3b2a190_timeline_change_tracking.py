@@ -0,0 +1,53 @@
+"""Timeline change tracking
+
+Revision ID: e5d4c3b2a190
+Revises: 6b2e8d5f1c09
+Create Date: 2026-10-17 14:02:19.551730
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5d4c3b2a190'
+down_revision = '6b2e8d5f1c09'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('timeline_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity_type', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('room_id', sa.Integer(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_timeline_tombstones_id'), 'timeline_tombstones', ['id'], unique=False)
+    op.create_index(op.f('ix_timeline_tombstones_deleted_at'), 'timeline_tombstones', ['deleted_at'], unique=False)
+    op.add_column('tasks', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_tasks_updated_at'), 'tasks', ['updated_at'], unique=False)
+    op.add_column('room_blocks', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_room_blocks_updated_at'), 'room_blocks', ['updated_at'], unique=False)
+    op.create_index(op.f('ix_reservations_updated_at'), 'reservations', ['updated_at'], unique=False)
+
+    # Existující záznamy dostanou čas migrace (UTC jako datetime.utcnow v modelech)
+    now = datetime.utcnow()
+    for table in ('tasks', 'room_blocks', 'reservations'):
+        updated_at = sa.table(table, sa.column('updated_at', sa.DateTime))
+        op.execute(updated_at.update().where(updated_at.c.updated_at.is_(None)).values(updated_at=now))
+
+
+def downgrade():
+    op.drop_index(op.f('ix_reservations_updated_at'), table_name='reservations')
+    op.drop_index(op.f('ix_room_blocks_updated_at'), table_name='room_blocks')
+    op.drop_column('room_blocks', 'updated_at')
+    op.drop_index(op.f('ix_tasks_updated_at'), table_name='tasks')
+    op.drop_column('tasks', 'updated_at')
+    op.drop_index(op.f('ix_timeline_tombstones_deleted_at'), table_name='timeline_tombstones')
+    op.drop_index(op.f('ix_timeline_tombstones_id'), table_name='timeline_tombstones')
+    op.drop_table('timeline_tombstones')
@@ -0,0 +1,120 @@
+"""Add room_nights ledger
+
+Revision ID: ee049710741d
+Revises: d918d4e197ba
+Create Date: 2026-10-17 09:12:40.118273
+
+"""
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ee049710741d'
+down_revision = 'd918d4e197ba'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade():
+    room_nights = sa.table('room_nights',
+        sa.column('room_id', sa.Integer), sa.column('night', sa.Date),
+        sa.column('reservation_id', sa.Integer), sa.column('block_id', sa.Integer))
+    reservations = sa.table('reservations',
+        sa.column('id', sa.Integer), sa.column('room_id', sa.Integer), sa.column('status', sa.String),
+        sa.column('check_in_date', sa.Date), sa.column('check_out_date', sa.Date))
+    room_blocks = sa.table('room_blocks',
+        sa.column('id', sa.Integer), sa.column('room_id', sa.Integer),
+        sa.column('start_date', sa.Date), sa.column('end_date', sa.Date))
+    # Enum sloupec ukládá názvy členů ReservationStatus
+    active = reservations.c.status.in_(['potvrzeno', 'ubytovan'])
+
+    bind = op.get_bind()
+    # Ledger povoluje jednu rezervaci/blokaci na pokoj a noc. Historický overbooking se musí
+    # vyřešit ručně ještě před založením tabulky (MySQL DDL neumí vrátit zpět).
+    conflicts = _find_overlaps(bind, reservations, room_blocks, active)
+    if conflicts:
+        reservation_ids = sorted({source_id for kind, source_id in conflicts if kind == 'reservation'})
+        block_ids = sorted({source_id for kind, source_id in conflicts if kind == 'block'})
+        raise RuntimeError(
+            "room_nights: aktivní rezervace/blokace se překrývají na stejném pokoji, ledger nelze naplnit. "
+            f"Upravte nebo zrušte je a spusťte migraci znovu. Rezervace: {reservation_ids}, blokace: {block_ids}."
+        )
+
+    op.create_table('room_nights',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('room_id', sa.Integer(), nullable=False),
+    sa.Column('night', sa.Date(), nullable=False),
+    sa.Column('reservation_id', sa.Integer(), nullable=True),
+    sa.Column('block_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['room_id'], ['rooms.id'], ),
+    sa.ForeignKeyConstraint(['reservation_id'], ['reservations.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['block_id'], ['room_blocks.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('room_id', 'night', name='uq_room_nights_room_id_night')
+    )
+    op.create_index(op.f('ix_room_nights_id'), 'room_nights', ['id'], unique=False)
+    op.create_index(op.f('ix_room_nights_reservation_id'), 'room_nights', ['reservation_id'], unique=False)
+    op.create_index(op.f('ix_room_nights_block_id'), 'room_nights', ['block_id'], unique=False)
+    op.create_index('ix_room_nights_night_room_id', 'room_nights', ['night', 'room_id'], unique=False)
+
+    # --- Backfill z existujících aktivních rezervací a blokací ---
+    # Po stránkách podle id: v paměti je vždy jen jedna stránka zdrojů a jedna dávka nocí
+    sources = (
+        (reservations, reservations.c.check_in_date, reservations.c.check_out_date, 'reservation_id', active),
+        (room_blocks, room_blocks.c.start_date, room_blocks.c.end_date, 'block_id', sa.true()),
+    )
+    for table, start_col, end_col, source_column, condition in sources:
+        last_id = 0
+        while True:
+            page = bind.execute(
+                sa.select(table.c.id, table.c.room_id, start_col, end_col)
+                .where(condition, table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(BATCH_SIZE)
+            ).fetchall()
+            if not page:
+                break
+            last_id = page[-1][0]
+            rows = []
+            for source_id, room_id, start, end in page:
+                for i in range((end - start).days):
+                    rows.append({'room_id': room_id, 'night': start + timedelta(days=i), 'reservation_id': None, 'block_id': None, source_column: source_id})
+                    if len(rows) >= BATCH_SIZE:
+                        op.bulk_insert(room_nights, rows)
+                        rows = []
+            if rows:
+                op.bulk_insert(room_nights, rows)
+
+
+def _find_overlaps(bind, reservations, room_blocks, active):
+    """Dvojice aktivních rezervací/blokací, které na stejném pokoji sdílí aspoň jednu noc (spočítá DB)."""
+    sources = sa.union_all(
+        sa.select(sa.literal('reservation').label('kind'), reservations.c.id, reservations.c.room_id,
+                  reservations.c.check_in_date.label('start'), reservations.c.check_out_date.label('end')).where(active),
+        sa.select(sa.literal('block').label('kind'), room_blocks.c.id, room_blocks.c.room_id,
+                  room_blocks.c.start_date.label('start'), room_blocks.c.end_date.label('end')),
+    )
+    a, b = sources.subquery('a'), sources.subquery('b')
+    pairs = bind.execute(
+        sa.select(a.c.kind, a.c.id, b.c.kind, b.c.id)
+        .where(
+            a.c.room_id == b.c.room_id,
+            sa.or_(a.c.kind < b.c.kind, sa.and_(a.c.kind == b.c.kind, a.c.id < b.c.id)),
+            a.c.start < b.c.end, b.c.start < a.c.end,
+            a.c.start < a.c.end, b.c.start < b.c.end,
+        )
+    ).fetchall()
+    return {(kind, source_id) for a_kind, a_id, b_kind, b_id in pairs for kind, source_id in ((a_kind, a_id), (b_kind, b_id))}
+
+
+def downgrade():
+    op.drop_index('ix_room_nights_night_room_id', table_name='room_nights')
+    op.drop_index(op.f('ix_room_nights_block_id'), table_name='room_nights')
+    op.drop_index(op.f('ix_room_nights_reservation_id'), table_name='room_nights')
+    op.drop_index(op.f('ix_room_nights_id'), table_name='room_nights')
+    op.drop_table('room_nights')
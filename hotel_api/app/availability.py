@@ -0,0 +1,308 @@
+# FILE: hotel_api/app/availability.py
+"""
+In-memory index obsazenosti pokojů pro booking engine.
+
+Každý pokoj má jedno celé číslo použité jako bitmapa: bit `i` znamená,
+že noc `horizon_start + i` je obsazená (aktivní rezervace nebo blokace).
+Dotaz "volné pokoje typu X pro [start, end)" je pak jen AND s maskou nocí,
+bez jediného SQL dotazu.
+
+Index je per-proces. Zápisové cesty v `crud` ho průběžně aktualizují,
+`verify` porovná jeho stav s databází a odhalí případný drift.
+
+Zápisy z jiných workerů se dočítají jednou za `AVAILABILITY_SYNC_SECONDS` na
+pozadí: stejně jako delta časové osy se hledají rezervace a blokace změněné
+po kurzoru (`updated_at`) a záznamy o smazaných blokacích, a dotčeným pokojům
+se obsazenost načte znovu z DB. Požadavky na dočtení nečekají.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .config import settings
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger("hotel_api.indexes")
+
+# Stavy rezervací, které drží pokoj obsazený
+ACTIVE_RESERVATION_STATUSES = [models.ReservationStatus.potvrzeno, models.ReservationStatus.ubytovan]
+
+
+def _set_bits(bits: Dict[int, int], room_id: int, offset: int, nights: int):
+    bits[room_id] = bits.get(room_id, 0) | (((1 << nights) - 1) << offset)
+
+
+async def load_occupancy(db: AsyncSession, start: date, end: date, room_ids: Optional[List[int]] = None) -> Dict[int, int]:
+    """Načte z DB obsazenost pokojů pro okno [start, end) jako bitmapy s bitem 0 = `start`."""
+    res_q = select(models.Reservation.room_id, models.Reservation.check_in_date, models.Reservation.check_out_date).filter(
+        models.Reservation.status.in_(ACTIVE_RESERVATION_STATUSES),
+        models.Reservation.check_in_date < end,
+        models.Reservation.check_out_date > start
+    )
+    block_q = select(models.RoomBlock.room_id, models.RoomBlock.start_date, models.RoomBlock.end_date).filter(
+        models.RoomBlock.start_date < end,
+        models.RoomBlock.end_date > start
+    )
+    if room_ids is not None:
+        res_q = res_q.filter(models.Reservation.room_id.in_(room_ids))
+        block_q = block_q.filter(models.RoomBlock.room_id.in_(room_ids))
+    bits: Dict[int, int] = {}
+    for query in (res_q, block_q):
+        for room_id, first, last in (await db.execute(query)).all():
+            first, last = max(first, start), min(last, end)
+            if first < last:
+                _set_bits(bits, room_id, (first - start).days, (last - first).days)
+    return bits
+
+
+def change_cursor() -> datetime:
+    """Kurzor změn jako u delta časové osy: nyní minus bezpečnostní prodleva, bez zlomků sekund."""
+    return (datetime.utcnow() - timedelta(seconds=settings.TIMELINE_DELTA_SAFETY_LAG_SECONDS)).replace(microsecond=0)
+
+
+class AvailabilityIndex:
+    def __init__(self, horizon_days: int, enabled: bool = True, sync_seconds: float = 0.0):
+        self.horizon_days = horizon_days
+        self.enabled = enabled
+        self.sync_seconds = sync_seconds
+        self.horizon_start: Optional[date] = None
+        self.ready = False
+        self.room_bits: Dict[int, int] = {}
+        self.room_types: Dict[int, str] = {}
+        self.room_capacities: Dict[int, int] = {}
+        self._lock = asyncio.Lock()
+        self._rebuilding = False
+        self._dirty = False
+        # Změny s `updated_at` do kurzoru už index obsahuje
+        self._synced_through: Optional[datetime] = None
+        self._synced_at = 0.0
+        # Nejvyšší id pokoje načtené z DB (pokoje přidané lokálně přes `add_room` se nepočítají)
+        self._synced_room_id = 0
+        # Pokoje zapsané lokálně během dočítání (jinak None)
+        self._syncing_rooms: Optional[set] = None
+        self._sync_task: Optional[asyncio.Task] = None
+        # Volá se, když dočtení změnilo obsazenost (crud zneplatní cache dostupnosti)
+        self.on_external_change: Optional[Callable[[], None]] = None
+
+    @property
+    def horizon_end(self) -> date:
+        return self.horizon_start + timedelta(days=self.horizon_days)
+
+    def covers(self, start: date, end: date) -> bool:
+        return self.enabled and self.ready and self.horizon_start <= start and end <= self.horizon_end
+
+    def _mask(self, start: date, end: date) -> int:
+        return ((1 << (end - start).days) - 1) << (start - self.horizon_start).days
+
+    def _touch(self, room_id: int):
+        # Zápis během přestavby nebo dočítání by mohl být přepsán načteným snapshotem
+        if self._rebuilding:
+            self._dirty = True
+        if self._syncing_rooms is not None:
+            self._syncing_rooms.add(room_id)
+
+    # --- Správa indexu ---
+    async def rebuild(self, db: AsyncSession):
+        """Kompletně sestaví index z tabulek `rooms`, `reservations` a `room_blocks`."""
+        async with self._lock:
+            await self._rebuild(db, date.today())
+
+    async def _rebuild(self, db: AsyncSession, horizon_start: date):
+        self._rebuilding, self._dirty = True, False
+        cursor = change_cursor()
+        try:
+            rooms = (await db.execute(select(models.Room.id, models.Room.type, models.Room.capacity).order_by(models.Room.id))).all()
+            bits = await load_occupancy(db, horizon_start, horizon_start + timedelta(days=self.horizon_days))
+        finally:
+            self._rebuilding = False
+        self.room_types = {room_id: room_type for room_id, room_type, _ in rooms}
+        self.room_capacities = {room_id: capacity or 0 for room_id, _, capacity in rooms}
+        self.room_bits = {room_id: bits.get(room_id, 0) for room_id, _, _ in rooms}
+        self.horizon_start = horizon_start
+        self._synced_through, self._synced_at = cursor, time.monotonic()
+        self._synced_room_id = max(self.room_bits, default=0)
+        # Pokud mezitím proběhl zápis, příští dotaz index sestaví znovu
+        self.ready = not self._dirty
+
+    async def _roll(self, db: AsyncSession, new_start: date):
+        """Posune horizont dopředu: zahodí minulé noci a dočte z DB jen nově přidaný konec okna."""
+        shift = (new_start - self.horizon_start).days
+        old_end = self.horizon_end
+        tail = await load_occupancy(db, old_end, new_start + timedelta(days=self.horizon_days))
+        tail_offset = (old_end - new_start).days
+        self.room_bits = {room_id: (room_bits >> shift) | (tail.get(room_id, 0) << tail_offset) for room_id, room_bits in self.room_bits.items()}
+        self.horizon_start = new_start
+
+    async def ensure_ready(self, db: AsyncSession):
+        """Zajistí, že je index sestavený a jeho horizont začíná dnešním dnem."""
+        if not self.enabled:
+            return
+        today = date.today()
+        if not self.ready or self.horizon_start != today:
+            async with self._lock:
+                if not self.ready:
+                    await self._rebuild(db, today)
+                elif self.horizon_start < today:
+                    if (today - self.horizon_start).days >= self.horizon_days:
+                        await self._rebuild(db, today)
+                    else:
+                        await self._roll(db, today)
+        if self.sync_seconds and time.monotonic() - self._synced_at >= self.sync_seconds:
+            self.schedule_sync()
+
+    # --- Dočítání zápisů z jiných workerů ---
+    def schedule_sync(self) -> asyncio.Task:
+        """Spustí dočtení změn na pozadí (nejvýš jedno současně)."""
+        if self._sync_task is None or self._sync_task.done():
+            # Prázdný kontext: dotazy dočtení se nezapočítají do měřiče požadavku, který ho spustil
+            self._sync_task = asyncio.get_running_loop().create_task(self._sync(), context=contextvars.Context())
+        return self._sync_task
+
+    async def _sync(self):
+        try:
+            async with self._lock:
+                if not self.ready:
+                    return
+                async with AsyncSessionLocal() as db:
+                    await self._sync_changes(db)
+        except Exception:
+            # Index zůstává beze změny, kurzor se neposunul - příští dočtení změny najde znovu
+            logger.exception("Dočtení změn indexu obsazenosti selhalo.")
+
+    async def _sync_changes(self, db: AsyncSession):
+        since, cursor = self._synced_through, change_cursor()
+        if since < datetime.utcnow() - timedelta(days=settings.TIMELINE_TOMBSTONE_RETENTION_DAYS):
+            # Záznamy o smazaných blokacích už mohly být promazány - sestavíme index celý
+            await self._rebuild(db, self.horizon_start)
+            self._notify_external_change()
+            return
+        changed_queries = (
+            select(models.Reservation.room_id).filter(models.Reservation.updated_at > since),
+            select(models.RoomBlock.room_id).filter(models.RoomBlock.updated_at > since),
+            select(models.TimelineTombstone.room_id).filter(models.TimelineTombstone.entity_type == "block", models.TimelineTombstone.deleted_at > since, models.TimelineTombstone.room_id.isnot(None)),
+        )
+        changed = set()
+        self._syncing_rooms = touched = set()
+        try:
+            for query in changed_queries:
+                changed.update((await db.execute(query.distinct())).scalars().all())
+            new_rooms = (await db.execute(select(models.Room.id, models.Room.type, models.Room.capacity).filter(models.Room.id > self._synced_room_id))).all()
+            horizon_start = self.horizon_start
+            room_ids = changed | {room_id for room_id, _, _ in new_rooms}
+            bits = await load_occupancy(db, horizon_start, horizon_start + timedelta(days=self.horizon_days), room_ids=sorted(room_ids)) if room_ids else {}
+        finally:
+            self._syncing_rooms = None
+        if self.horizon_start != horizon_start:
+            return
+        updated = False
+        for room_id, room_type, capacity in new_rooms:
+            self.room_types[room_id] = room_type
+            self.room_capacities[room_id] = capacity or 0
+            self.room_bits.setdefault(room_id, 0)
+        # Pokoje zapsané lokálně během načítání mají novější stav; jejich `updated_at` je po kurzoru,
+        # takže je příští dočtení načte znovu
+        for room_id in (room_ids & self.room_bits.keys()) - touched:
+            room_bits = bits.get(room_id, 0)
+            if self.room_bits[room_id] != room_bits:
+                self.room_bits[room_id] = room_bits
+                updated = True
+        self._synced_through, self._synced_at = cursor, time.monotonic()
+        self._synced_room_id = max([self._synced_room_id] + [room_id for room_id, _, _ in new_rooms])
+        if updated or new_rooms:
+            self._notify_external_change()
+
+    def _notify_external_change(self):
+        if self.on_external_change is not None:
+            self.on_external_change()
+
+    async def stop(self):
+        """Zruší rozběhnuté dočtení (při ukončení aplikace)."""
+        task = self._sync_task
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    # --- Inkrementální aktualizace ze zápisových cest ---
+    def add_room(self, room_id: int, room_type: str, capacity: int):
+        if not self.ready:
+            return
+        self.room_types[room_id] = room_type
+        self.room_capacities[room_id] = capacity or 0
+        self.room_bits.setdefault(room_id, 0)
+
+    def occupy(self, room_id: int, start: date, end: date):
+        self._touch(room_id)
+        if not self.ready or room_id not in self.room_bits:
+            return
+        start, end = max(start, self.horizon_start), min(end, self.horizon_end)
+        if start < end:
+            self.room_bits[room_id] |= self._mask(start, end)
+
+    async def refresh_room(self, db: AsyncSession, room_id: int):
+        """Znovu načte obsazenost jednoho pokoje z DB (uvolnění nocí, změna termínu)."""
+        self._touch(room_id)
+        if not self.ready or room_id not in self.room_bits:
+            return
+        horizon_start = self.horizon_start
+        bits = await load_occupancy(db, horizon_start, horizon_start + timedelta(days=self.horizon_days), room_ids=[room_id])
+        if self.horizon_start == horizon_start:
+            self.room_bits[room_id] = bits.get(room_id, 0)
+
+    # --- Dotazy ---
+    def free_rooms(self, start: date, end: date, room_type: Optional[str] = None, min_capacity: int = 0) -> List[Tuple[int, str, int]]:
+        """Vrátí (id, typ, kapacita) pokojů volných po celé období [start, end), seřazené podle id."""
+        mask = self._mask(start, end)
+        return [
+            (room_id, self.room_types[room_id], self.room_capacities[room_id])
+            for room_id, room_bits in self.room_bits.items()
+            if not room_bits & mask
+            and (room_type is None or self.room_types[room_id] == room_type)
+            and self.room_capacities[room_id] >= min_capacity
+        ]
+
+    def occupancy_window(self, start: date, end: date) -> Dict[int, int]:
+        """Obsazenost všech pokojů pro okno [start, end) jako bitmapy s bitem 0 = `start` (stejně jako `load_occupancy`)."""
+        shift, mask = (start - self.horizon_start).days, (1 << (end - start).days) - 1
+        return {room_id: (room_bits >> shift) & mask for room_id, room_bits in self.room_bits.items()}
+
+    async def verify(self, db: AsyncSession) -> dict:
+        """Porovná index s databází a vrátí seznam nocí, ve kterých se liší."""
+        if not self.enabled or not self.ready:
+            return {"ready": False, "horizon_start": None, "horizon_end": None, "rooms_checked": 0, "mismatches": []}
+        horizon_start = self.horizon_start
+        room_ids = (await db.execute(select(models.Room.id).order_by(models.Room.id))).scalars().all()
+        db_bits = await load_occupancy(db, horizon_start, horizon_start + timedelta(days=self.horizon_days))
+        mismatches = []
+        for room_id in room_ids:
+            expected = db_bits.get(room_id, 0)
+            actual = self.room_bits.get(room_id)
+            if actual is None:
+                mismatches.append({"room_id": room_id, "missing_room": True, "missing_nights": [], "extra_nights": []})
+                continue
+            diff = expected ^ actual
+            if diff:
+                nights = [i for i in range(self.horizon_days) if diff >> i & 1]
+                mismatches.append({
+                    "room_id": room_id,
+                    "missing_room": False,
+                    # Noci obsazené v DB, které index považuje za volné (riziko overbookingu)
+                    "missing_nights": [horizon_start + timedelta(days=i) for i in nights if expected >> i & 1],
+                    # Noci volné v DB, které index považuje za obsazené (ztracený prodej)
+                    "extra_nights": [horizon_start + timedelta(days=i) for i in nights if actual >> i & 1],
+                })
+        return {"ready": True, "horizon_start": horizon_start, "horizon_end": self.horizon_end, "rooms_checked": len(room_ids), "mismatches": mismatches}
+
+
+# Jediná instance pro celou aplikaci
+availability_index = AvailabilityIndex(
+    horizon_days=settings.AVAILABILITY_HORIZON_DAYS,
+    enabled=settings.AVAILABILITY_INDEX_ENABLED,
+    sync_seconds=settings.AVAILABILITY_SYNC_SECONDS
+)
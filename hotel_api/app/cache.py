@@ -0,0 +1,104 @@
+# FILE: hotel_api/app/cache.py
+"""
+Jednoduchá in-memory cache s TTL a LRU vytlačováním.
+
+Kapacita je omezena počtem záznamů a volitelně i součtem "ceny" záznamů
+(např. počtem položek v uložené odpovědi), aby cache nemohla neomezeně
+růst v paměti. Každý záznam může nést libovolná metadata (`tags`), podle
+kterých ho lze cíleně zneplatnit. Čítač `generation` se zvyšuje s každým
+zneplatněním; `set(..., generation=g)` uloží hodnotu jen tehdy, pokud mezi
+jejím výpočtem a uložením žádné zneplatnění neproběhlo.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLLRUCache:
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float, max_cost: Optional[int] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_cost = max_cost
+        # klíč -> (hodnota, expirace, cena, tags)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._cost = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if entry[1] <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, cost: int = 1, tags: Any = None, generation: Optional[int] = None):
+        if generation is not None and generation != self.generation:
+            # Během výpočtu hodnoty proběhl zápis - hodnota může být zastaralá
+            return
+        if key in self._data:
+            self._remove(key)
+        if self.max_cost is not None and cost > self.max_cost:
+            # Záznam by sám přesáhl rozpočet - neukládáme ho
+            return
+        self._data[key] = (value, time.monotonic() + self.ttl_seconds, cost, tags)
+        self._cost += cost
+        while len(self._data) > self.max_entries or (self.max_cost is not None and self._cost > self.max_cost):
+            oldest_key = next(iter(self._data))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self.generation += 1
+        if key in self._data:
+            self._remove(key)
+            self.invalidations += 1
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Odstraní všechny záznamy, pro které `predicate(klíč, tags)` vrátí True."""
+        self.generation += 1
+        doomed = [key for key, entry in self._data.items() if predicate(key, entry[3])]
+        for key in doomed:
+            self._remove(key)
+        self.invalidations += len(doomed)
+        return len(doomed)
+
+    def clear(self):
+        self.generation += 1
+        self.invalidations += len(self._data)
+        self._data.clear()
+        self._cost = 0
+
+    def _remove(self, key: Hashable):
+        entry = self._data.pop(key)
+        self._cost -= entry[2]
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "cost": self._cost,
+            "max_cost": self.max_cost,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -6,11 +8,89 @@ class Settings(BaseSettings):
     
     # Databaze
     DATABASE_URL: str
+    # Volitelná read-only replika pro náročné čtecí endpointy (bez ní se čte z primární DB)
+    DATABASE_READ_URL: Optional[str] = None
+    # Horní odhad zpoždění repliky - o tolik se posouvá kurzor časové osy načtené z repliky
+    DATABASE_READ_MAX_LAG_SECONDS: float = 5.0
+
+    # Pool spojení (pro každý engine zvlášť; u SQLite se nepoužije)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # Ladění: počet SQL dotazů a čas v DB pro každý požadavek v hlavičkách X-DB-Query-Count / X-DB-Time-Ms
+    QUERY_STATS_HEADERS: bool = False
+
+    # Metriky pro Prometheus na GET /metrics (latence podle routy, pooly, cache); výchozí vypnuto.
+    # S METRICS_TOKEN vyžaduje endpoint hlavičku "Authorization: Bearer <token>"
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: Optional[str] = None
+
+    # Log pomalých SQL dotazů (JSON řádky, rotace podle velikosti); 0 = vypnuto.
+    # SAMPLE_RATE zapíše jen část pomalých dotazů, EXPLAIN běží mimo požadavek a stejný příkaz
+    # se vysvětluje nejvýš jednou za EXPLAIN_TTL_SECONDS
+    SLOW_QUERY_THRESHOLD_MS: float = 0.0
+    SLOW_QUERY_SAMPLE_RATE: float = 1.0
+    SLOW_QUERY_LOG_FILE: str = "slow_queries.log"
+    SLOW_QUERY_LOG_MAX_BYTES: int = 10_000_000
+    SLOW_QUERY_LOG_BACKUP_COUNT: int = 5
+    SLOW_QUERY_EXPLAIN: bool = False
+    SLOW_QUERY_EXPLAIN_TTL_SECONDS: float = 600.0
+    SLOW_QUERY_EXPLAIN_MAX_PENDING: int = 4
 
     # Bezpecnost / JWT
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
 
+    # Booking engine - in-memory index obsazenosti (počet nocí dopředu od dneška)
+    AVAILABILITY_INDEX_ENABLED: bool = True
+    AVAILABILITY_HORIZON_DAYS: int = 730
+    # Jak často (s) index dočte změny obsazenosti z jiných workerů; 0 = nedočítá (jen jeden worker)
+    AVAILABILITY_SYNC_SECONDS: float = 5.0
+
+    # Cache odpovědí /booking/availability (max_cost = celkový počet uložených nabídek)
+    AVAILABILITY_CACHE_TTL_SECONDS: float = 60.0
+    AVAILABILITY_CACHE_MAX_ENTRIES: int = 2048
+    AVAILABILITY_CACHE_MAX_OFFERS: int = 100_000
+
+    # Index kumulativních cen (prefixové součty) - periodické načtení kvůli zápisům z jiných procesů
+    PRICE_INDEX_ENABLED: bool = True
+    PRICE_INDEX_HORIZON_DAYS: int = 730
+    PRICE_INDEX_REFRESH_SECONDS: float = 300.0
+    # Memoizované ceny odvozených plánů pro (typ pokoje, plán, okno pobytu)
+    DERIVED_PRICE_CACHE_MAX_ENTRIES: int = 10_000
+
+    # Limity hledání s flexibilním termínem (/booking/availability/flexible)
+    FLEXIBLE_SEARCH_MAX_ARRIVAL_DAYS: int = 62
+    FLEXIBLE_SEARCH_MAX_NIGHTS: int = 30
+
+    # Delta dotazy časové osy: kurzor zaostává o bezpečnostní prodlevu kvůli transakcím,
+    # které commitnou později, než zapsaly updated_at; záznamy o smazání se drží omezenou dobu
+    TIMELINE_DELTA_SAFETY_LAG_SECONDS: float = 5.0
+    TIMELINE_TOMBSTONE_RETENTION_DAYS: int = 7
+
+    # Obnovovací tokeny (POST /auth/refresh) - platnost od vydání, při každém použití se rotují
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+
+    # Hashování hesel (bcrypt) ve vlákně mimo event loop; při změně BCRYPT_ROUNDS se heslo
+    # při příštím přihlášení přehashuje. Nad PASSWORD_HASH_MAX_WAITING čekajícími vrací 503.
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_WAITING: int = 64
+
+    # Cache přihlášených uživatelů (ověření tokenu bez dotazu do DB)
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10_000
+
+    # Živé události (SSE): délka fronty na odběratele, heartbeat a limit současných odběratelů
+    EVENT_QUEUE_SIZE: int = 256
+    EVENT_HEARTBEAT_SECONDS: float = 15.0
+    EVENT_MAX_SUBSCRIBERS: int = 500
+    # Platnost tokenu pro `?token=` u SSE (jen na otevření streamu, jiné endpointy ho nepřijmou)
+    STREAM_TOKEN_EXPIRE_SECONDS: int = 60
+
 # Vytvorime jednu jedinou instanci, kterou bude pouzivat cela aplikace
 settings = Settings()
\ No newline at end of file
@@ -1,12 +1,25 @@
 # FILE: hotel_api/app/crud.py
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_, distinct
+from sqlalchemy import select, insert, update, delete, func, and_, or_, distinct, tuple_
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload, joinedload
 from . import models, schemas
-from .security import get_password_hash
-from datetime import date, datetime, timedelta
+from .security import password_hasher, create_refresh_token, hash_refresh_token
+from .principals import Principal, invalidate_principal
+from uuid import uuid4
+from datetime import date, datetime, timedelta, timezone
 from fastapi import HTTPException
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from .availability import availability_index, load_occupancy, ACTIVE_RESERVATION_STATUSES
+from .cache import TTLLRUCache
+from .pricing_index import price_index, load_nightly_prices, load_rate_plan_defs, derivation_chain, derive_price
+from .restriction_index import restriction_index, load_arrival_restrictions, load_restrictions, restriction_violation
+from .flexible_search import longest_free_runs, sweep_stays
+from .events import event_bus, room_status_data, task_data
+from .stats import reservation_stats, diff_stats, apply_stats_delta, add_to_delta
+from .rate_ranges import weekdays_to_mask, compact_daily_rates
+from .config import settings
 
 # --- CRUD pro Uživatele (Users) ---
 async def get_user_by_email(db: AsyncSession, email: str):
@@ -24,13 +37,92 @@ async def get_employees(db: AsyncSession):
     return result.scalars().all()
 
 async def create_user(db: AsyncSession, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
     db_user = models.User(email=user.email, hashed_password=hashed_password, role=user.role)
     db.add(db_user)
     await db.commit()
     await db.refresh(db_user)
     return db_user
 
+async def update_user(db: AsyncSession, user_id: int, user_update: schemas.UserUpdate, changed_by: Principal):
+    """Změna role nebo aktivace uživatele; zneplatní jeho záznam v cache přihlášených uživatelů."""
+    db_user = await db.get(models.User, user_id)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="Uživatel nenalezen.")
+    changes = user_update.dict(exclude_unset=True)
+    touches_owner = db_user.role == models.UserRole.majitel or changes.get("role") == models.UserRole.majitel
+    if touches_owner and changed_by.role != models.UserRole.majitel:
+        raise HTTPException(status_code=403, detail="Účet majitele může měnit jen majitel.")
+    for key, value in changes.items():
+        setattr(db_user, key, value)
+    if changes.get("is_active") is False:
+        # Deaktivovaný uživatel si už nesmí obnovit přístupový token
+        await revoke_refresh_tokens(db, user_id=user_id)
+    await db.commit()
+    await db.refresh(db_user)
+    invalidate_principal(db_user.email)
+    return db_user
+
+# --- CRUD pro Obnovovací tokeny (Refresh tokens) ---
+async def issue_refresh_token(db: AsyncSession, user_id: int, family_id: Optional[str] = None) -> str:
+    """Vydá refresh token (v rodině `family_id`, jinak v nové) a vrátí jeho hodnotu. Necommituje."""
+    token, now = create_refresh_token(), datetime.utcnow()
+    # Prošlé tokeny uživatele rovnou uklidíme
+    await db.execute(delete(models.RefreshToken).filter(models.RefreshToken.user_id == user_id, models.RefreshToken.expires_at < now))
+    db.add(models.RefreshToken(
+        token_hash=hash_refresh_token(token), family_id=family_id or uuid4().hex, user_id=user_id,
+        created_at=now, expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+    return token
+
+async def revoke_refresh_tokens(db: AsyncSession, user_id: Optional[int] = None, family_id: Optional[str] = None):
+    """Zneplatní refresh tokeny uživatele nebo jedné rodiny. Necommituje."""
+    query = update(models.RefreshToken).where(models.RefreshToken.revoked_at.is_(None)).values(revoked_at=datetime.utcnow())
+    if user_id is not None:
+        query = query.where(models.RefreshToken.user_id == user_id)
+    if family_id is not None:
+        query = query.where(models.RefreshToken.family_id == family_id)
+    await db.execute(query)
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> Tuple[Principal, str]:
+    """
+    Vymění platný refresh token za nový (jedno vyhledání podle indexu, žádný bcrypt).
+    Opětovné použití již vyměněného tokenu zneplatní celou rodinu - token mohl uniknout.
+    """
+    invalid = HTTPException(status_code=401, detail="Neplatný nebo prošlý refresh token.", headers={"WWW-Authenticate": "Bearer"})
+    query = (
+        select(models.RefreshToken.id, models.RefreshToken.family_id, models.RefreshToken.expires_at, models.RefreshToken.revoked_at,
+               models.User.id, models.User.email, models.User.role, models.User.is_active)
+        .join(models.User, models.RefreshToken.user_id == models.User.id)
+        .filter(models.RefreshToken.token_hash == hash_refresh_token(token))
+    )
+    row = (await db.execute(query)).first()
+    if row is None:
+        raise invalid
+    token_id, family_id, expires_at, revoked_at, user_id, email, role, is_active = row
+    now = datetime.utcnow()
+    if expires_at <= now or not is_active:
+        raise invalid
+    # Podmíněný update - ze dvou souběžných obnov stejným tokenem uspěje jen jedna
+    result = None if revoked_at is not None else await db.execute(
+        update(models.RefreshToken).where(models.RefreshToken.id == token_id, models.RefreshToken.revoked_at.is_(None)).values(revoked_at=now)
+    )
+    if result is None or result.rowcount != 1:
+        # Token už byl vyměněn - mohl uniknout, zneplatníme celou rodinu
+        await revoke_refresh_tokens(db, family_id=family_id)
+        await db.commit()
+        raise invalid
+    new_token = await issue_refresh_token(db, user_id, family_id)
+    await db.commit()
+    return Principal(id=user_id, email=email, role=role, is_active=bool(is_active)), new_token
+
+async def revoke_refresh_token_family(db: AsyncSession, token: str):
+    """Odhlášení: zneplatní token i všechny tokeny vzniklé z téhož přihlášení."""
+    family_id = (await db.execute(select(models.RefreshToken.family_id).filter(models.RefreshToken.token_hash == hash_refresh_token(token)))).scalar_one_or_none()
+    if family_id is not None:
+        await revoke_refresh_tokens(db, family_id=family_id)
+        await db.commit()
+
 # --- CRUD pro Úkoly (Tasks) ---
 async def get_task_by_id(db: AsyncSession, task_id: int):
     result = await db.execute(select(models.Task).filter(models.Task.id == task_id))
@@ -50,6 +142,7 @@ async def create_task(db: AsyncSession, task: schemas.TaskCreate):
     db.add(db_task)
     await db.commit()
     await db.refresh(db_task)
+    event_bus.publish("task_created", task_data(db_task))
     return db_task
 
 # --- CRUD pro Pokoje (Rooms) ---
@@ -61,6 +154,8 @@ async def create_room(db: AsyncSession, room: schemas.RoomCreate):
     db.add(db_room)
     await db.commit()
     await db.refresh(db_room)
+    availability_index.add_room(db_room.id, db_room.type, db_room.capacity)
+    invalidate_availability(min_capacity=db_room.capacity)
     return db_room
 
 async def get_room_by_number(db: AsyncSession, number: str):
@@ -77,16 +172,46 @@ async def get_rooms(db: AsyncSession, status: schemas.RoomStatus = None, skip: i
 async def create_room_block(db: AsyncSession, block: schemas.RoomBlockCreate):
     db_block = models.RoomBlock(**block.dict())
     db.add(db_block)
-    await db.commit()
+    try:
+        await db.flush()
+        await claim_room_nights(db, db_block.room_id, db_block.start_date, db_block.end_date, block_id=db_block.id)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Pokoj je v zadaném období obsazen nebo již blokován.")
     await db.refresh(db_block)
+    availability_index.occupy(db_block.room_id, db_block.start_date, db_block.end_date)
+    room_type = availability_index.room_types.get(db_block.room_id)
+    invalidate_availability(db_block.start_date, db_block.end_date, room_types={room_type} if room_type else None)
     return db_block
 
 async def delete_room_block(db: AsyncSession, block_id: int):
     db_block = await db.get(models.RoomBlock, block_id)
     if not db_block:
         raise HTTPException(status_code=404, detail="Blokace nenalezena.")
+    room_id, start_date, end_date = db_block.room_id, db_block.start_date, db_block.end_date
+    await db.execute(delete(models.RoomNight).where(models.RoomNight.block_id == block_id))
     await db.delete(db_block)
+    await add_timeline_tombstone(db, "block", block_id, room_id)
     await db.commit()
+    await availability_index.refresh_room(db, room_id)
+    invalidate_availability(start_date, end_date)
+
+# --- Kniha obsazených nocí (room_nights) ---
+async def claim_room_nights(db: AsyncSession, room_id: int, start_date: date, end_date: date, reservation_id: Optional[int] = None, block_id: Optional[int] = None):
+    """
+    Zapíše noci [start_date, end_date) pokoje do ledgeru jedním hromadným INSERTem.
+    Pokud je některá noc již obsazená, unikátní klíč (room_id, night) vyhodí IntegrityError.
+    """
+    nights = [
+        {"room_id": room_id, "night": start_date + timedelta(days=i), "reservation_id": reservation_id, "block_id": block_id}
+        for i in range((end_date - start_date).days)
+    ]
+    if nights:
+        await db.execute(insert(models.RoomNight), nights)
+
+async def release_reservation_nights(db: AsyncSession, reservation_id: int):
+    await db.execute(delete(models.RoomNight).where(models.RoomNight.reservation_id == reservation_id))
 
 # --- CRUD pro Sklad (Inventory) ---
 async def get_or_create_central_storage(db: AsyncSession):
@@ -130,12 +255,14 @@ async def add_stock(db: AsyncSession, item_id: int, location_id: int, quantity:
     return stock_entry
 
 async def remove_stock(db: AsyncSession, item_id: int, location_id: int, quantity: int):
-    stock_entry = await get_stock_entry(db, item_id, location_id)
-    if not stock_entry or stock_entry.quantity < quantity:
+    # Kontrola zásoby a odečet jedním podmíněným UPDATE - bez předchozího SELECTu a bez souběhu dvou odběrů
+    result = await db.execute(
+        update(models.Stock)
+        .where(models.Stock.item_id == item_id, models.Stock.location_id == location_id, models.Stock.quantity >= quantity)
+        .values(quantity=models.Stock.quantity - quantity)
+    )
+    if result.rowcount == 0:
         raise HTTPException(status_code=400, detail=f"Nedostatek polozky ID {item_id} v lokaci ID {location_id}")
-    stock_entry.quantity -= quantity
-    await db.flush()
-    return stock_entry
 
 async def transfer_stock(db: AsyncSession, transfer_data: schemas.StockTransfer):
     async with db.begin():
@@ -157,67 +284,416 @@ async def create_receipt(db: AsyncSession, receipt_data: schemas.ReceiptDocument
 
 # --- CRUD pro Dynamickou Cenotvorbu ---
 async def create_rate_plan(db: AsyncSession, plan: schemas.RatePlanCreate):
+    if plan.parent_plan_id is not None:
+        if plan.modifier_type is None or plan.modifier_value is None:
+            raise HTTPException(status_code=400, detail="Odvozený plán musí mít typ a hodnotu úpravy ceny.")
+        if await db.get(models.RatePlan, plan.parent_plan_id) is None:
+            raise HTTPException(status_code=404, detail="Nadřazený cenový plán nenalezen.")
+    elif plan.modifier_type is not None or plan.modifier_value is not None:
+        raise HTTPException(status_code=400, detail="Úpravu ceny lze zadat jen u odvozeného plánu.")
     db_plan = models.RatePlan(**plan.dict())
     db.add(db_plan)
     await db.commit()
     await db.refresh(db_plan)
+    price_index.add_plan(db_plan)
+    # Odvozený plán hned přidává nabídky ke všem pobytům, kde má nadřazený plán ceny
+    invalidate_availability()
     return db_plan
 
 async def get_rate_plans(db: AsyncSession):
     result = await db.execute(select(models.RatePlan))
     return result.scalars().all()
 
-async def create_rates_batch(db: AsyncSession, rates: List[schemas.RateCreate]):
-    db_rates = [models.Rate(**r.dict()) for r in rates]
-    db.add_all(db_rates)
+RATES_UPSERT_CHUNK_SIZE = 1000
+
+def _upsert_statement(dialect_name: str, model, rows: List[dict], update_columns: List[str]):
+    """Množinový INSERT, který při kolizi unikátního klíče (typ, plán, den) jen přepíše `update_columns`."""
+    if dialect_name == "mysql":
+        stmt = mysql.insert(model).values(rows)
+        return stmt.on_duplicate_key_update(**{column: stmt.inserted[column] for column in update_columns})
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(model).values(rows)
+    return stmt.on_conflict_do_update(index_elements=["room_type", "rate_plan_id", "date"], set_={column: stmt.excluded[column] for column in update_columns})
+
+async def _upsert_by_day(db: AsyncSession, model, rows: List[dict], update_columns: List[str]) -> Tuple[int, int]:
+    """Upsert řádků s klíčem (typ, plán, den) po dávkách; vrací (vloženo, aktualizováno)."""
+    dialect_name = db.bind.dialect.name
+    inserted = updated = 0
+    for i in range(0, len(rows), RATES_UPSERT_CHUNK_SIZE):
+        chunk = rows[i:i + RATES_UPSERT_CHUNK_SIZE]
+        keys = [(row["room_type"], row["rate_plan_id"], row["date"]) for row in chunk]
+        existing_q = select(func.count()).select_from(model).filter(tuple_(model.room_type, model.rate_plan_id, model.date).in_(keys))
+        existing = (await db.execute(existing_q)).scalar_one()
+        await db.execute(_upsert_statement(dialect_name, model, chunk, update_columns))
+        updated += existing
+        inserted += len(chunk) - existing
+    return inserted, updated
+
+async def _ensure_base_plans(db: AsyncSession, plan_ids: set):
+    """Ceny lze nahrávat jen pro základní plány - odvozené se počítají z nadřazeného."""
+    if not plan_ids:
+        return
+    derived_q = select(models.RatePlan.name).filter(models.RatePlan.id.in_(plan_ids), models.RatePlan.parent_plan_id.is_not(None))
+    derived = (await db.execute(derived_q)).scalars().all()
+    if derived:
+        raise HTTPException(status_code=400, detail=f"Plány {', '.join(derived)} jsou odvozené, jejich ceny se počítají z nadřazeného plánu.")
+
+async def create_rates_batch(db: AsyncSession, rates: List[schemas.RateCreate]) -> schemas.RateBatchResult:
+    """
+    Vloží nebo přepíše ceny po dávkách `INSERT ... ON DUPLICATE KEY UPDATE`.
+    Opakované nahrání sezóny tak nevytváří duplicity, ale aktualizuje ceny.
+    """
+    await _ensure_base_plans(db, {r.rate_plan_id for r in rates})
+    # V rámci jedné dávky vyhrává poslední cena pro daný den
+    prices = {(r.room_type, r.rate_plan_id, r.date): r.price for r in rates}
+    rows = [{"room_type": room_type, "rate_plan_id": plan_id, "date": day, "price": price} for (room_type, plan_id, day), price in prices.items()]
+    inserted, updated = await _upsert_by_day(db, models.Rate, rows, ["price"])
     await db.commit()
-    return db_rates
+    price_index.apply_rates([(room_type, plan_id, day, price) for (room_type, plan_id, day), price in prices.items()])
+    if rows:
+        invalidate_availability(min(row["date"] for row in rows), max(row["date"] for row in rows) + timedelta(days=1))
+    return schemas.RateBatchResult(
+        message=f"{len(rows)} cenových záznamů bylo úspěšně uloženo.",
+        inserted=inserted,
+        updated=updated
+    )
 
 async def calculate_accommodation_price(db: AsyncSession, start_date: date, end_date: date, room_type: str, rate_plan_id: int) -> float:
+    """
+    Cena pobytu pro zápis rezervace - vždy z DB (plány a ceny v okně pobytu), ne z cenového
+    indexu. Index jiného workeru může být až `PRICE_INDEX_REFRESH_SECONDS` pozadu a účtovaná
+    cena musí odpovídat aktuálnímu ceníku; index slouží jen vyhledávání a nabídkám.
+    """
     if start_date >= end_date:
         raise HTTPException(status_code=400, detail="Datum odjezdu musí být po datu příjezdu.")
     stay_dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days)]
-    query = select(models.Rate).filter(
-        models.Rate.date.in_(stay_dates),
-        models.Rate.room_type == room_type,
-        models.Rate.rate_plan_id == rate_plan_id
-    )
-    result = await db.execute(query)
-    rates_map = {r.date: r.price for r in result.scalars().all()}
+    # Odvozený plán bere ceny z kořenového plánu
+    root_plan_id, chain = derivation_chain(await load_rate_plan_defs(db), rate_plan_id)
+    nightly_prices = await load_nightly_prices(db, start_date, end_date, room_types=[room_type], rate_plan_id=root_plan_id)
+    rates_map = nightly_prices.get((room_type, root_plan_id), {})
     if len(rates_map) != len(stay_dates):
         missing_dates = [d.isoformat() for d in stay_dates if d not in rates_map]
         raise HTTPException(status_code=404, detail=f"Cena nebyla nalezena pro dny: {', '.join(missing_dates)}")
-    return sum(rates_map.values())
+    return round(sum(derive_price(price, chain) for price in rates_map.values()), 2)
+
+async def get_stay_prices(db: AsyncSession, start_date: date, end_date: date, room_types: List[str]) -> Dict[Tuple[str, int], Tuple[str, float]]:
+    """
+    Spočítá cenu pobytu pro všechny zadané typy pokojů a všechny cenové plány najednou.
+    V horizontu cenového indexu bez dotazu do DB, mimo něj konstantním počtem dotazů.
+    Vrací {(typ pokoje, id plánu): (název plánu, celková cena)} jen pro kombinace s cenou na každou noc.
+    """
+    await price_index.ensure_ready(db)
+    if price_index.covers(start_date, end_date):
+        return price_index.quote_all(room_types, start_date, end_date)
+    nights = (end_date - start_date).days
+    plans = await load_rate_plan_defs(db)
+    nightly_prices = await load_nightly_prices(db, start_date, end_date, room_types=room_types)
+    result = {}
+    for plan_id, plan in plans.items():
+        root_plan_id, chain = derivation_chain(plans, plan_id)
+        for room_type in set(room_types):
+            nightly = nightly_prices.get((room_type, root_plan_id), {})
+            if len(nightly) == nights:
+                result[(room_type, plan_id)] = (plan.name, round(sum(derive_price(price, chain) for price in nightly.values()), 2))
+    return result
+
+async def create_rate_ranges_batch(db: AsyncSession, ranges: List[schemas.RateRangeCreate]) -> schemas.RateRangeBatchResult:
+    """
+    Uloží ceny platné po obdobích (sezóny, víkendy...) jedním hromadným INSERTem.
+    Novější období přepisuje starší, denní ceny z `rates` mají vždy přednost.
+    """
+    await _ensure_base_plans(db, {r.rate_plan_id for r in ranges})
+    for r in ranges:
+        if r.date_to < r.date_from:
+            raise HTTPException(status_code=400, detail=f"Období {r.date_from.isoformat()} - {r.date_to.isoformat()} končí dříve, než začíná.")
+    rows = [
+        {"room_type": r.room_type, "rate_plan_id": r.rate_plan_id, "date_from": r.date_from, "date_to": r.date_to, "price": r.price, "weekday_mask": weekdays_to_mask(r.weekdays)}
+        for r in ranges
+    ]
+    if rows:
+        await db.execute(insert(models.RateRange), rows)
+    await db.commit()
+    price_index.apply_ranges(rows)
+    if rows:
+        invalidate_availability(min(row["date_from"] for row in rows), max(row["date_to"] for row in rows) + timedelta(days=1))
+    return schemas.RateRangeBatchResult(message=f"{len(rows)} cenových období bylo úspěšně uloženo.", created=len(rows))
+
+async def get_rate_ranges(db: AsyncSession, room_type: Optional[str] = None, rate_plan_id: Optional[int] = None) -> List[models.RateRange]:
+    query = select(models.RateRange).order_by(models.RateRange.room_type, models.RateRange.rate_plan_id, models.RateRange.date_from)
+    if room_type:
+        query = query.filter(models.RateRange.room_type == room_type)
+    if rate_plan_id:
+        query = query.filter(models.RateRange.rate_plan_id == rate_plan_id)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+async def compact_rates(db: AsyncSession, request: schemas.RateCompactionRequest) -> schemas.RateCompactionResult:
+    """
+    Složí souvislé dny se stejnou denní cenou do období a denní řádky odstraní.
+    Platné ceny se nemění - nová období mají nejvyšší id, takže přebijí starší období
+    stejně, jako je dosud přebíjely denní ceny.
+    """
+    query = select(models.Rate.id, models.Rate.room_type, models.Rate.rate_plan_id, models.Rate.date, models.Rate.price).order_by(models.Rate.room_type, models.Rate.rate_plan_id, models.Rate.date)
+    if request.room_type:
+        query = query.filter(models.Rate.room_type == request.room_type)
+    if request.rate_plan_id:
+        query = query.filter(models.Rate.rate_plan_id == request.rate_plan_id)
+    if request.date_from:
+        query = query.filter(models.Rate.date >= request.date_from)
+    if request.date_to:
+        query = query.filter(models.Rate.date <= request.date_to)
+    daily_rates = (await db.execute(query)).all()
+    ranges = compact_daily_rates((r.room_type, r.rate_plan_id, r.date, r.price) for r in daily_rates)
+    if ranges:
+        await db.execute(insert(models.RateRange), [
+            {"room_type": room_type, "rate_plan_id": plan_id, "date_from": date_from, "date_to": date_to, "price": price, "weekday_mask": weekdays_to_mask(None)}
+            for room_type, plan_id, date_from, date_to, price in ranges
+        ])
+    rate_ids = [r.id for r in daily_rates]
+    for i in range(0, len(rate_ids), RATES_UPSERT_CHUNK_SIZE):
+        await db.execute(delete(models.Rate).where(models.Rate.id.in_(rate_ids[i:i + RATES_UPSERT_CHUNK_SIZE])))
+    await db.commit()
+    # Ceny se nezměnily, jen jejich uložení - index načteme znovu kvůli přednosti denních cen
+    await price_index.rebuild(db)
+    return schemas.RateCompactionResult(rates_removed=len(rate_ids), ranges_created=len(ranges))
+
+async def create_restrictions_batch(db: AsyncSession, restrictions: List[schemas.RestrictionCreate]) -> schemas.RestrictionBatchResult:
+    """
+    Vloží nebo přepíše restrikce (typ, plán, den) hromadným upsertem.
+    Restrikce platí jen pro zadaný plán, odvozené plány je nepřebírají.
+    """
+    # V rámci jedné dávky vyhrává poslední restrikce pro daný den
+    values = {(r.room_type, r.rate_plan_id, r.date): (r.min_stay, bool(r.closed_to_arrival)) for r in restrictions}
+    rows = [
+        {"room_type": room_type, "rate_plan_id": plan_id, "date": day, "min_stay": min_stay, "closed_to_arrival": closed_to_arrival}
+        for (room_type, plan_id, day), (min_stay, closed_to_arrival) in values.items()
+    ]
+    inserted, updated = await _upsert_by_day(db, models.Restriction, rows, ["min_stay", "closed_to_arrival"])
+    await db.commit()
+    restriction_index.apply([(row["room_type"], row["rate_plan_id"], row["date"], row["min_stay"], row["closed_to_arrival"]) for row in rows])
+    if rows:
+        invalidate_availability(min(row["date"] for row in rows), max(row["date"] for row in rows) + timedelta(days=1))
+    return schemas.RestrictionBatchResult(
+        message=f"{len(rows)} restrikcí bylo úspěšně uloženo.",
+        inserted=inserted,
+        updated=updated
+    )
+
+async def get_restrictions(db: AsyncSession, room_type: Optional[str] = None, rate_plan_id: Optional[int] = None, date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[models.Restriction]:
+    query = select(models.Restriction).order_by(models.Restriction.room_type, models.Restriction.rate_plan_id, models.Restriction.date)
+    if room_type:
+        query = query.filter(models.Restriction.room_type == room_type)
+    if rate_plan_id:
+        query = query.filter(models.Restriction.rate_plan_id == rate_plan_id)
+    if date_from:
+        query = query.filter(models.Restriction.date >= date_from)
+    if date_to:
+        query = query.filter(models.Restriction.date <= date_to)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+async def get_restriction_violations(db: AsyncSession, start_date: date, end_date: date, offers: List[Tuple[str, int]], from_db: bool = False) -> Dict[Tuple[str, int], str]:
+    """
+    Vyhodnotí restrikce pro pobyt [start_date, end_date) a zadané kombinace (typ, plán).
+    V horizontu indexu bez dotazu do DB, mimo něj (nebo s `from_db`) jedním dotazem na den příjezdu.
+    Zápis rezervace používá `from_db`: index jiného workeru může být až
+    `PRICE_INDEX_REFRESH_SECONDS` pozadu a nová restrikce (stop-sell) musí platit hned.
+    Vrací {(typ, plán): důvod} jen pro kombinace, které restrikce nesplňují.
+    """
+    if not from_db:
+        await restriction_index.ensure_ready(db)
+    if not from_db and restriction_index.covers(start_date):
+        violations = {key: restriction_index.violation(key[0], key[1], start_date, end_date) for key in offers}
+    else:
+        arrival_restrictions = await load_arrival_restrictions(db, start_date, room_types=list({room_type for room_type, _ in offers}))
+        nights = (end_date - start_date).days
+        violations = {key: restriction_violation(*arrival_restrictions.get(key, (None, False)), start_date, nights) for key in offers}
+    return {key: reason for key, reason in violations.items() if reason is not None}
+
+# --- Cache dostupnosti ---
+availability_cache = TTLLRUCache(
+    "availability",
+    max_entries=settings.AVAILABILITY_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AVAILABILITY_CACHE_TTL_SECONDS,
+    max_cost=settings.AVAILABILITY_CACHE_MAX_OFFERS
+)
+
+def invalidate_availability(start_date: Optional[date] = None, end_date: Optional[date] = None, room_types: Optional[set] = None, min_capacity: Optional[int] = None):
+    """
+    Zneplatní uložené výsledky dostupnosti, kterých se zápis může týkat.
+    - `start_date`/`end_date`: jen výsledky, jejichž pobyt se s obdobím překrývá.
+    - `room_types`: jen výsledky obsahující některý z typů (pro zápisy, které nabídku pouze ubírají).
+    - `min_capacity`: jen výsledky hledání pro nejvýše tolik hostů (nový pokoj).
+    """
+    def affected(key, cached_types):
+        cached_start, cached_end, guests = key
+        if start_date is not None and not (cached_start < end_date and cached_end > start_date):
+            return False
+        if room_types is not None and not (cached_types & room_types):
+            return False
+        if min_capacity is not None and guests > min_capacity:
+            return False
+        return True
+    availability_cache.invalidate_where(affected)
+
+# Obsazenost změněná jiným workerem (staré ani nové termíny neznáme) - zahodíme celou cache
+availability_index.on_external_change = invalidate_availability
 
 # --- CRUD pro Dostupnost a Rezervace ---
-async def find_available_room_types(db: AsyncSession, start_date: date, end_date: date, guests: int) -> List[schemas.AvailableRoomType]:
-    rooms_with_capacity_q = select(models.Room).filter(models.Room.capacity >= guests)
-    potential_rooms = (await db.execute(rooms_with_capacity_q)).scalars().all()
+async def get_free_rooms(db: AsyncSession, start_date: date, end_date: date, room_type: Optional[str] = None, min_capacity: int = 0) -> List[Tuple[int, str, int]]:
+    """
+    Vrátí (id, typ, kapacita) pokojů volných po celé období [start_date, end_date).
+    V rámci horizontu odpovídá in-memory index, mimo něj se použije SQL.
+    """
+    await availability_index.ensure_ready(db)
+    if availability_index.covers(start_date, end_date):
+        return availability_index.free_rooms(start_date, end_date, room_type=room_type, min_capacity=min_capacity)
+    rooms_q = select(models.Room.id, models.Room.type, models.Room.capacity).filter(models.Room.capacity >= min_capacity).order_by(models.Room.id)
+    if room_type is not None:
+        rooms_q = rooms_q.filter(models.Room.type == room_type)
+    potential_rooms = (await db.execute(rooms_q)).all()
     potential_room_ids = [r.id for r in potential_rooms]
     if not potential_room_ids:
         return []
-    occupied_rooms_q = select(distinct(models.Reservation.room_id)).filter(models.Reservation.room_id.in_(potential_room_ids), models.Reservation.status.in_([models.ReservationStatus.potvrzeno, models.ReservationStatus.ubytovan]), models.Reservation.check_in_date < end_date, models.Reservation.check_out_date > start_date)
-    blocked_rooms_q = select(distinct(models.RoomBlock.room_id)).filter(models.RoomBlock.room_id.in_(potential_room_ids), models.RoomBlock.start_date < end_date, models.RoomBlock.end_date > start_date)
-    occupied_room_ids = (await db.execute(occupied_rooms_q)).scalars().all()
-    blocked_room_ids = (await db.execute(blocked_rooms_q)).scalars().all()
-    unavailable_room_ids = set(occupied_room_ids) | set(blocked_room_ids)
-    available_rooms_by_type: Dict[str, List[models.Room]] = {}
-    for room in potential_rooms:
-        if room.id not in unavailable_room_ids:
-            if room.type not in available_rooms_by_type:
-                available_rooms_by_type[room.type] = []
-            available_rooms_by_type[room.type].append(room)
-    availability_result = []
-    rate_plans = await get_rate_plans(db)
+    # Obsazené noci (rezervace i blokace) jsou v ledgeru - stačí jeden indexovaný rozsahový dotaz
+    occupied_rooms_q = select(distinct(models.RoomNight.room_id)).filter(models.RoomNight.room_id.in_(potential_room_ids), models.RoomNight.night >= start_date, models.RoomNight.night < end_date)
+    unavailable_room_ids = set((await db.execute(occupied_rooms_q)).scalars().all())
+    return [(r.id, r.type, r.capacity) for r in potential_rooms if r.id not in unavailable_room_ids]
+
+async def find_available_room_types(db: AsyncSession, start_date: date, end_date: date, guests: int) -> List[schemas.AvailableRoomType]:
+    offers, _ = await _cached_availability_search(db, start_date, end_date, guests)
+    return list(offers)
+
+async def find_available_room_types_detailed(db: AsyncSession, start_date: date, end_date: date, guests: int) -> schemas.AvailabilitySearchResult:
+    """Dostupné nabídky i nabídky vyřazené restrikcemi (s důvodem)."""
+    offers, rejected = await _cached_availability_search(db, start_date, end_date, guests)
+    return schemas.AvailabilitySearchResult(offers=list(offers), rejected=list(rejected))
+
+async def _cached_availability_search(db: AsyncSession, start_date: date, end_date: date, guests: int) -> Tuple[List[schemas.AvailableRoomType], List[schemas.RejectedOffer]]:
+    cache_key = (start_date, end_date, guests)
+    cached = availability_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = availability_cache.generation
+    offers, rejected = await _search_available_room_types(db, start_date, end_date, guests)
+    tags = {offer.room_type for offer in offers} | {offer.room_type for offer in rejected}
+    availability_cache.set(cache_key, (offers, rejected), cost=len(offers) + len(rejected) + 1, tags=tags, generation=generation)
+    return offers, rejected
+
+async def _search_available_room_types(db: AsyncSession, start_date: date, end_date: date, guests: int) -> Tuple[List[schemas.AvailableRoomType], List[schemas.RejectedOffer]]:
+    free_rooms = await get_free_rooms(db, start_date, end_date, min_capacity=guests)
+    available_rooms_by_type: Dict[str, List[Tuple[int, str, int]]] = {}
+    for room in free_rooms:
+        available_rooms_by_type.setdefault(room[1], []).append(room)
+    availability_result, rejected = [], []
+    if not available_rooms_by_type:
+        return availability_result, rejected
+    # Ceny všech typů a plánů jedním agregačním dotazem místo dotazu na každou kombinaci
+    stay_prices = await get_stay_prices(db, start_date, end_date, list(available_rooms_by_type))
+    violations = await get_restriction_violations(db, start_date, end_date, list(stay_prices))
+    offers_by_type: Dict[str, List[Tuple[int, str, float]]] = {}
+    for (room_type, plan_id), (plan_name, price) in sorted(stay_prices.items()):
+        offers_by_type.setdefault(room_type, []).append((plan_id, plan_name, price))
     for room_type, rooms in available_rooms_by_type.items():
-        for plan in rate_plans:
-            try:
-                price = await calculate_accommodation_price(db, start_date, end_date, room_type, plan.id)
-                availability_result.append(schemas.AvailableRoomType(room_type=room_type, capacity=rooms[0].capacity, total_price=price, rate_plan_id=plan.id, rate_plan_name=plan.name))
-            except HTTPException as e:
-                if e.status_code == 404: continue
-                raise e
-    return availability_result
+        for plan_id, plan_name, price in offers_by_type.get(room_type, []):
+            reason = violations.get((room_type, plan_id))
+            if reason is not None:
+                rejected.append(schemas.RejectedOffer(room_type=room_type, rate_plan_id=plan_id, rate_plan_name=plan_name, reason=reason))
+                continue
+            availability_result.append(schemas.AvailableRoomType(room_type=room_type, capacity=rooms[0][2], total_price=price, rate_plan_id=plan_id, rate_plan_name=plan_name))
+    return availability_result, rejected
+
+async def find_flexible_availability(db: AsyncSession, request: schemas.FlexibleAvailabilityRequest) -> List[schemas.FlexibleAvailableRoomType]:
+    """
+    Všechny pobyty s příjezdem v [arrival_from, arrival_to] a délkou [min_nights, max_nights]
+    jedním průchodem přes obsazenost, ceny a restrikce (klouzavé součty místo hledání pro každý den).
+    V horizontu indexů bez dotazů do DB, mimo něj s dočasně načteným oknem.
+    """
+    max_nights = request.max_nights or request.min_nights
+    if request.arrival_to < request.arrival_from:
+        raise HTTPException(status_code=400, detail="Konec okna příjezdů musí být po jeho začátku.")
+    if max_nights < request.min_nights:
+        raise HTTPException(status_code=400, detail="Maximální počet nocí musí být alespoň minimální počet nocí.")
+    arrival_days = (request.arrival_to - request.arrival_from).days + 1
+    if arrival_days > settings.FLEXIBLE_SEARCH_MAX_ARRIVAL_DAYS:
+        raise HTTPException(status_code=400, detail=f"Okno příjezdů může mít nejvýše {settings.FLEXIBLE_SEARCH_MAX_ARRIVAL_DAYS} dní.")
+    if max_nights > settings.FLEXIBLE_SEARCH_MAX_NIGHTS:
+        raise HTTPException(status_code=400, detail=f"Pobyt může mít nejvýše {settings.FLEXIBLE_SEARCH_MAX_NIGHTS} nocí.")
+    start = request.arrival_from
+    end = request.arrival_to + timedelta(days=max_nights)
+    span = (end - start).days
+
+    # 1) Obsazenost -> nejdelší volný úsek od každé noci pro každý typ
+    await availability_index.ensure_ready(db)
+    if availability_index.covers(start, end):
+        rooms = [
+            (room_id, availability_index.room_types[room_id], availability_index.room_capacities[room_id])
+            for room_id in sorted(availability_index.room_bits)
+            if availability_index.room_capacities[room_id] >= request.guests
+        ]
+        occupancy = availability_index.occupancy_window(start, end)
+    else:
+        rooms_q = select(models.Room.id, models.Room.type, models.Room.capacity).filter(models.Room.capacity >= request.guests).order_by(models.Room.id)
+        rooms = (await db.execute(rooms_q)).all()
+        occupancy = await load_occupancy(db, start, end, room_ids=[room_id for room_id, _, _ in rooms])
+    rooms_by_type: Dict[str, List[Tuple[int, str, int]]] = {}
+    for room in rooms:
+        rooms_by_type.setdefault(room[1], []).append(room)
+    runs_by_type = {}
+    for room_type, type_rooms in rooms_by_type.items():
+        runs = longest_free_runs((occupancy.get(room_id, 0) for room_id, _, _ in type_rooms), span)
+        if max(runs[:arrival_days]) >= request.min_nights:
+            runs_by_type[room_type] = runs
+    if not runs_by_type:
+        return []
+
+    # 2) Noční ceny všech plánů (včetně odvozených) pro celé okno
+    await price_index.ensure_ready(db)
+    nightly_by_offer: Dict[Tuple[str, int], List[Optional[float]]] = {}
+    if price_index.covers(start, end):
+        plans = price_index.plans
+        for plan_id in plans:
+            root_plan_id, _ = derivation_chain(plans, plan_id)
+            for room_type in runs_by_type:
+                if (room_type, root_plan_id) in price_index.series:
+                    nightly_by_offer[(room_type, plan_id)] = price_index.nightly_prices(room_type, plan_id, start, end)
+    else:
+        plans = await load_rate_plan_defs(db)
+        loaded_prices = await load_nightly_prices(db, start, end, room_types=list(runs_by_type))
+        days = [start + timedelta(days=i) for i in range(span)]
+        for plan_id in plans:
+            root_plan_id, chain = derivation_chain(plans, plan_id)
+            for room_type in runs_by_type:
+                nightly = loaded_prices.get((room_type, root_plan_id))
+                if nightly:
+                    nightly_by_offer[(room_type, plan_id)] = [derive_price(nightly[day], chain) if day in nightly else None for day in days]
+
+    # 3) Restrikce pro každý den příjezdu
+    arrivals = [start + timedelta(days=i) for i in range(arrival_days)]
+    await restriction_index.ensure_ready(db)
+    if restriction_index.covers(start) and restriction_index.covers(request.arrival_to):
+        restrictions_by_offer = {key: [restriction_index.lookup(key[0], key[1], day) for day in arrivals] for key in nightly_by_offer}
+    else:
+        loaded_restrictions = await load_restrictions(db, start, request.arrival_to + timedelta(days=1), room_types=list(runs_by_type))
+        restrictions_by_offer = {key: [loaded_restrictions.get(key, {}).get(day, (None, False)) for day in arrivals] for key in nightly_by_offer}
+
+    result = []
+    for (room_type, plan_id), nightly in sorted(nightly_by_offer.items()):
+        stays = sweep_stays(nightly, runs_by_type[room_type], restrictions_by_offer[(room_type, plan_id)], request.min_nights, max_nights)
+        if not stays:
+            continue
+        result.append(schemas.FlexibleAvailableRoomType(
+            room_type=room_type,
+            capacity=rooms_by_type[room_type][0][2],
+            rate_plan_id=plan_id,
+            rate_plan_name=plans[plan_id].name,
+            cheapest_price=min(price for _, _, price in stays),
+            stays=[
+                schemas.FlexibleStayPrice(check_in_date=arrivals[arrival], check_out_date=arrivals[arrival] + timedelta(days=nights), nights=nights, total_price=price)
+                for arrival, nights, price in stays
+            ]
+        ))
+    return result
 
 async def get_or_create_guest(db: AsyncSession, name: str, email: str, phone: str = None, preferences: str = None):
     result = await db.execute(select(models.Guest).filter(models.Guest.email == email))
@@ -236,22 +712,38 @@ async def create_reservation(db: AsyncSession, res_data: schemas.PublicReservati
         if e.status_code == 404:
             raise HTTPException(status_code=400, detail="Pro zadané období a typ pokoje neexistuje platný ceník.")
         raise e
-    rooms_of_type_q = select(models.Room.id).filter(models.Room.type == res_data.room_type)
-    potential_room_ids = (await db.execute(rooms_of_type_q)).scalars().all()
-    if not potential_room_ids:
+    violations = await get_restriction_violations(db, res_data.check_in_date, res_data.check_out_date, [(res_data.room_type, res_data.rate_plan_id)], from_db=True)
+    if violations:
+        raise HTTPException(status_code=400, detail=violations[(res_data.room_type, res_data.rate_plan_id)])
+    room_type_exists_q = select(models.Room.id).filter(models.Room.type == res_data.room_type).limit(1)
+    if (await db.execute(room_type_exists_q)).first() is None:
         raise HTTPException(status_code=404, detail=f"Nenalezen žádný pokoj typu '{res_data.room_type}'.")
-    occupied_rooms_q = select(distinct(models.Reservation.room_id)).filter(models.Reservation.room_id.in_(potential_room_ids), models.Reservation.status.in_([models.ReservationStatus.potvrzeno, models.ReservationStatus.ubytovan]), models.Reservation.check_in_date < res_data.check_out_date, models.Reservation.check_out_date > res_data.check_in_date)
-    blocked_rooms_q = select(distinct(models.RoomBlock.room_id)).filter(models.RoomBlock.room_id.in_(potential_room_ids), models.RoomBlock.start_date < res_data.check_out_date, models.RoomBlock.end_date > res_data.check_in_date)
-    occupied_room_ids = (await db.execute(occupied_rooms_q)).scalars().all()
-    blocked_room_ids = (await db.execute(blocked_rooms_q)).scalars().all()
-    unavailable_room_ids = set(occupied_room_ids) | set(blocked_room_ids)
-    available_room_id = next((room_id for room_id in potential_room_ids if room_id not in unavailable_room_ids), None)
-    if not available_room_id:
+    candidates = await get_free_rooms(db, res_data.check_in_date, res_data.check_out_date, room_type=res_data.room_type)
+    if not candidates:
         raise HTTPException(status_code=409, detail="Bohužel, tento typ pokoje byl právě zarezervován.")
     guest = await get_or_create_guest(db, name=res_data.guest_name, email=res_data.guest_email, phone=res_data.phone)
-    db_reservation = models.Reservation(room_id=available_room_id, guest_id=guest.id, check_in_date=res_data.check_in_date, check_out_date=res_data.check_out_date, accommodation_price=price, status=models.ReservationStatus.potvrzeno)
-    db.add(db_reservation)
+    db_reservation = None
+    for room_id, _, _ in candidates:
+        # Alokace = zápis nocí do ledgeru. Pokud noc mezitím prodal jiný požadavek (nebo proces),
+        # unikátní klíč zápis odmítne a zkusíme další pokoj - bez zamykání celé tabulky.
+        try:
+            async with db.begin_nested():
+                db_reservation = models.Reservation(room_id=room_id, guest_id=guest.id, check_in_date=res_data.check_in_date, check_out_date=res_data.check_out_date, accommodation_price=price, status=models.ReservationStatus.potvrzeno)
+                db.add(db_reservation)
+                await db.flush()
+                await claim_room_nights(db, room_id, res_data.check_in_date, res_data.check_out_date, reservation_id=db_reservation.id)
+        except IntegrityError:
+            db_reservation = None
+            await availability_index.refresh_room(db, room_id)
+            continue
+        break
+    if db_reservation is None:
+        raise HTTPException(status_code=409, detail="Bohužel, tento typ pokoje byl právě zarezervován.")
+    available_room_id = db_reservation.room_id
+    await apply_stats_delta(db, reservation_stats(res_data.room_type, res_data.check_in_date, res_data.check_out_date, price, db_reservation.status))
     await db.commit()
+    availability_index.occupy(available_room_id, res_data.check_in_date, res_data.check_out_date)
+    invalidate_availability(res_data.check_in_date, res_data.check_out_date, room_types={res_data.room_type})
     await db.refresh(db_reservation, attribute_names=['room', 'guest'])
     return db_reservation
 
@@ -293,64 +785,132 @@ async def update_reservation(db: AsyncSession, reservation_id: int, res_update:
     if not db_res:
         raise HTTPException(status_code=404, detail="Rezervace nenalezena.")
         
+    old_range, was_active = (db_res.check_in_date, db_res.check_out_date), db_res.status in ACTIVE_RESERVATION_STATUSES
+    room_type = (await db.get(models.Room, db_res.room_id)).type
+    old_stats = reservation_stats(room_type, *old_range, db_res.accommodation_price, db_res.status)
     for key, value in res_update.dict(exclude_unset=True).items():
         setattr(db_res, key, value)
-        
-    await db.commit()
+    if db_res.check_in_date >= db_res.check_out_date:
+        # Prázdný/obrácený termín by z ledgeru noci jen uvolnil a žádné neobsadil
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Datum odjezdu musí být po datu příjezdu.")
+
+    room_id, new_range, is_active = db_res.room_id, (db_res.check_in_date, db_res.check_out_date), db_res.status in ACTIVE_RESERVATION_STATUSES
+    try:
+        # Ledger nocí musí odpovídat novému termínu a stavu
+        if new_range != old_range or was_active != is_active:
+            await release_reservation_nights(db, reservation_id)
+            if is_active:
+                await claim_room_nights(db, room_id, *new_range, reservation_id=reservation_id)
+        await apply_stats_delta(db, diff_stats(old_stats, reservation_stats(room_type, *new_range, db_res.accommodation_price, db_res.status)))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Pokoj je v novém termínu již obsazen.")
+    # Změna termínu nebo stavu může noci obsadit i uvolnit
+    await availability_index.refresh_room(db, room_id)
+    invalidate_availability(*old_range)
+    if new_range != old_range:
+        invalidate_availability(*new_range)
     
     # Po commitu znovu načteme objekt i jeho relace
     await db.refresh(db_res, attribute_names=['room', 'guest'])
     
     return db_res
 
-async def perform_check_in(db: AsyncSession, reservation_id: int):
-    reservation = await db.get(models.Reservation, reservation_id, options=[joinedload(models.Reservation.room)])
+async def _apply_status_stats(db: AsyncSession, reservation: models.Reservation, old_status: models.ReservationStatus):
+    """Souhrny se mění jen při přechodu mezi prodaným a neprodaným stavem (např. check-in zrušené rezervace)."""
+    stay = (reservation.room.type, reservation.check_in_date, reservation.check_out_date, reservation.accommodation_price)
+    await apply_stats_delta(db, diff_stats(reservation_stats(*stay, old_status), reservation_stats(*stay, reservation.status)))
+
+async def _commit_keep_loaded(db: AsyncSession):
+    """
+    Commit bez expirace načtených objektů. Odpověď se pak složí z toho, co je už v paměti,
+    místo dalších `refresh` dotazů - jen tam, kde zápis nemění sloupce s hodnotou z DB (server_default).
+    Nastavení session se vrátí na původní hodnotu i při chybě commitu.
+    """
+    session = db.sync_session
+    expire_on_commit, session.expire_on_commit = session.expire_on_commit, False
+    try:
+        await db.commit()
+    finally:
+        session.expire_on_commit = expire_on_commit
+
+async def _get_reservation_with_room(db: AsyncSession, reservation_id: int, with_guest: bool = False) -> models.Reservation:
+    """Rezervace s pokojem (a případně hostem) jedním dotazem - místo dalších `db.get` / `refresh`."""
+    options = [joinedload(models.Reservation.room)]
+    if with_guest:
+        options.append(joinedload(models.Reservation.guest))
+    reservation = await db.get(models.Reservation, reservation_id, options=options)
     if not reservation:
         raise HTTPException(status_code=404, detail="Rezervace nenalezena.")
+    return reservation
+
+async def perform_check_in(db: AsyncSession, reservation_id: int):
+    reservation = await _get_reservation_with_room(db, reservation_id, with_guest=True)
     
+    old_status = reservation.status
     reservation.status = models.ReservationStatus.ubytovan
     reservation.room.status = models.RoomStatus.occupied
+    # Zrušená / odhlášená / no-show rezervace své noci v ledgeru uvolnila - check-in je musí znovu obsadit
+    reclaim = old_status not in ACTIVE_RESERVATION_STATUSES
+    stay_range = (reservation.check_in_date, reservation.check_out_date)
+    try:
+        if reclaim:
+            async with db.begin_nested():
+                await claim_room_nights(db, reservation.room_id, *stay_range, reservation_id=reservation.id)
+        await _apply_status_stats(db, reservation, old_status)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Pokoj je v termínu rezervace již obsazen.")
     
-    await db.commit()
-    
-    # Po commitu znovu načteme objekt i jeho relace
-    await db.refresh(reservation, attribute_names=['room', 'guest'])
-    # Zajistíme, že i samotný pokoj má načtené čerstvé atributy
-    await db.refresh(reservation.room)
+    await _commit_keep_loaded(db)
+    if reclaim:
+        await availability_index.refresh_room(db, reservation.room_id)
+        invalidate_availability(*stay_range)
+    event_bus.publish("check_in", {"reservation_id": reservation.id, "room_id": reservation.room_id, "guest_name": reservation.guest.name})
+    event_bus.publish("room_status", room_status_data(reservation.room))
     
     return reservation
 
 async def perform_check_out(db: AsyncSession, reservation_id: int):
-    reservation = await db.get(models.Reservation, reservation_id, options=[joinedload(models.Reservation.room)])
-    if not reservation:
-        raise HTTPException(status_code=404, detail="Rezervace nenalezena.")
+    reservation = await _get_reservation_with_room(db, reservation_id, with_guest=True)
         
+    old_status = reservation.status
     reservation.status = models.ReservationStatus.odhlasen
     reservation.room.status = models.RoomStatus.available_dirty
+    room_id, stay_range = reservation.room_id, (reservation.check_in_date, reservation.check_out_date)
+    await release_reservation_nights(db, reservation_id)
+    await _apply_status_stats(db, reservation, old_status)
     
-    await db.commit()
+    await _commit_keep_loaded(db)
+    await availability_index.refresh_room(db, room_id)
+    invalidate_availability(*stay_range)
     
-    # Po commitu znovu načteme objekt i jeho relace
-    await db.refresh(reservation, attribute_names=['room', 'guest'])
-    await db.refresh(reservation.room)
+    event_bus.publish("check_out", {"reservation_id": reservation.id, "room_id": reservation.room_id, "guest_name": reservation.guest.name})
+    event_bus.publish("room_status", room_status_data(reservation.room))
     
     return reservation
 # --- CRUD pro Účtování (Billing) ---
 
 # **** KLÍČOVÁ OPRAVA ZDE ****
 async def add_charge_to_room(db: AsyncSession, reservation_id: int, charge_data: schemas.RoomChargeCreate):
-    # Načteme rezervaci
-    res = await db.get(models.Reservation, reservation_id)
-    if not res:
-        raise HTTPException(status_code=404, detail="Rezervace nenalezena.")
+    # Načteme rezervaci i s pokojem (typ pro souhrny, lokace minibaru)
+    res = await _get_reservation_with_room(db, reservation_id)
+    room = res.room
     
     total_price = charge_data.price_per_item * charge_data.quantity
+    charged_at = datetime.utcnow()
+    item = None
+    if charge_data.item_id:
+        # Položka je potřeba i do odpovědi - načteme ji hned, ne až líně po commitu
+        item = await db.get(models.InventoryItem, charge_data.item_id)
+        if item is None:
+            raise HTTPException(status_code=404, detail="Položka nenalezena.")
     
     # Pokud je položka ze skladu, snížíme stav
-    if charge_data.item_id:
-        room = await db.get(models.Room, res.room_id)
-        if room and room.location_id:
-            await remove_stock(db, item_id=charge_data.item_id, location_id=room.location_id, quantity=charge_data.quantity)
+    if charge_data.item_id and room.location_id:
+        await remove_stock(db, item_id=charge_data.item_id, location_id=room.location_id, quantity=charge_data.quantity)
 
     db_charge = models.RoomCharge(
         reservation_id=reservation_id, # Explicitně přiřadíme ID
@@ -358,13 +918,16 @@ async def add_charge_to_room(db: AsyncSession, reservation_id: int, charge_data:
         quantity=charge_data.quantity,
         price_per_item=charge_data.price_per_item,
         total_price=total_price,
-        item_id=charge_data.item_id
+        charged_at=charged_at,
+        item_id=charge_data.item_id,
+        item=item
     )
     
     db.add(db_charge)
-    await db.commit()
-
-    await db.refresh(db_charge)
+    stats_delta = {}
+    add_to_delta(stats_delta, charged_at.date(), room.type, "other_revenue", total_price)
+    await apply_stats_delta(db, stats_delta)
+    await _commit_keep_loaded(db)
     return db_charge
 
 # **** KLÍČOVÁ OPRAVA ZDE ****
@@ -377,9 +940,10 @@ async def get_bill_for_reservation(db: AsyncSession, reservation_id: int) -> sch
         select(models.Reservation)
         .where(models.Reservation.id == reservation_id)
         .options(
-            selectinload(models.Reservation.room), 
-            selectinload(models.Reservation.guest),
-            selectinload(models.Reservation.charges).selectinload(models.RoomCharge.item),
+            # Vazby N:1 (pokoj, host, položka) joinem, kolekce selectinem - celkem tři dotazy
+            joinedload(models.Reservation.room), 
+            joinedload(models.Reservation.guest),
+            selectinload(models.Reservation.charges).joinedload(models.RoomCharge.item),
             selectinload(models.Reservation.payments)
         )
     )
@@ -405,31 +969,161 @@ async def get_bill_for_reservation(db: AsyncSession, reservation_id: int) -> sch
     )
 
 async def record_payment(db: AsyncSession, reservation_id: int, payment_data: schemas.PaymentCreate):
-    reservation = await db.get(models.Reservation, reservation_id)
-    if not reservation: raise HTTPException(status_code=404, detail="Rezervace nenalezena.")
-    db_payment = models.Payment(reservation_id=reservation_id, amount=payment_data.amount, method=payment_data.method, notes=payment_data.notes)
+    reservation = await _get_reservation_with_room(db, reservation_id)
+    paid_at = datetime.utcnow()
+    db_payment = models.Payment(reservation_id=reservation_id, amount=payment_data.amount, method=payment_data.method, notes=payment_data.notes, paid_at=paid_at)
     db.add(db_payment)
-    await db.commit()
-    await db.refresh(db_payment)
+    stats_delta = {}
+    add_to_delta(stats_delta, paid_at.date(), reservation.room.type, "payments", payment_data.amount)
+    await apply_stats_delta(db, stats_delta)
+    await _commit_keep_loaded(db)
     return db_payment
 
 # --- CRUD pro Dashboard ---
-async def get_timeline_data(db: AsyncSession, start_date: date, end_date: date) -> List[schemas.RoomTimeline]:
-    rooms = (await db.execute(select(models.Room).order_by(models.Room.number))).scalars().all()
-    reservations = (await db.execute(select(models.Reservation).options(joinedload(models.Reservation.guest)).filter(models.Reservation.check_in_date <= end_date, models.Reservation.check_out_date >= start_date))).scalars().all()
-    tasks = (await db.execute(select(models.Task).options(joinedload(models.Task.assignee)).filter(models.Task.due_date >= start_date, models.Task.due_date <= end_date))).scalars().all()
-    blocks = (await db.execute(select(models.RoomBlock).filter(models.RoomBlock.start_date <= end_date, models.RoomBlock.end_date >= start_date))).scalars().all()
-    room_map = {room.id: schemas.RoomTimeline(room_id=room.id, room_number=room.number, events=[]) for room in rooms}
-    for res in reservations:
-        if res.room_id in room_map:
-            room_map[res.room_id].events.append(schemas.ReservationEvent(title=f"Rezervace: {res.guest.name}", start_date=datetime.combine(res.check_in_date, datetime.min.time()), end_date=datetime.combine(res.check_out_date, datetime.min.time()), reservation_id=res.id, guest_name=res.guest.name, status=res.status))
-    for task in tasks:
-        if task.room_id and task.room_id in room_map:
-            room_map[task.room_id].events.append(schemas.TaskEvent(title=f"Úkol: {task.title}", start_date=datetime.combine(task.due_date, datetime.min.time()), end_date=datetime.combine(task.due_date, datetime.max.time()), task_id=task.id, assignee_email=task.assignee.email if task.assignee else "Nepřiřazeno", status=task.status))
-    for block in blocks:
-        if block.room_id in room_map:
-            room_map[block.room_id].events.append(schemas.BlockEvent(title=f"Blokace: {block.reason}", start_date=datetime.combine(block.start_date, datetime.min.time()), end_date=datetime.combine(block.end_date, datetime.min.time()), block_id=block.id, reason=block.reason))
-    return list(room_map.values())
+TIMELINE_MAX_ROOMS = 500
+_DAY_START, _DAY_END = datetime.min.time(), datetime.max.time()
+
+def _reservation_event(res_id: int, check_in: date, check_out: date, status, guest_name: str) -> dict:
+    return {"type": "reservation", "title": f"Rezervace: {guest_name}", "start_date": datetime.combine(check_in, _DAY_START), "end_date": datetime.combine(check_out, _DAY_START), "reservation_id": res_id, "guest_name": guest_name, "status": status}
+
+def _task_event(task_id: int, title: str, due_date: date, status, assignee_email: Optional[str]) -> dict:
+    return {"type": "task", "title": f"Úkol: {title}", "start_date": datetime.combine(due_date, _DAY_START), "end_date": datetime.combine(due_date, _DAY_END), "task_id": task_id, "assignee_email": assignee_email or "Nepřiřazeno", "status": status}
+
+def _block_event(block_id: int, reason: str, start_date: date, end_date: date) -> dict:
+    return {"type": "block", "title": f"Blokace: {reason}", "start_date": datetime.combine(start_date, _DAY_START), "end_date": datetime.combine(end_date, _DAY_START), "block_id": block_id, "reason": reason}
+
+def timeline_cursor(extra_lag_seconds: float = 0.0) -> datetime:
+    """
+    Kurzor pro delta dotazy: nyní minus bezpečnostní prodleva, zaokrouhleno dolů na sekundy
+    (MySQL DATETIME ukládá čas bez zlomků sekund). `extra_lag_seconds` pokrývá zpoždění
+    repliky, ze které se načetla plná časová osa.
+    """
+    lag = settings.TIMELINE_DELTA_SAFETY_LAG_SECONDS + extra_lag_seconds
+    return (datetime.utcnow() - timedelta(seconds=lag)).replace(microsecond=0)
+
+def _filter_rooms(query, room_type: Optional[str], floor: Optional[int], room_number_from: Optional[str], room_number_to: Optional[str]):
+    if room_type is not None:
+        query = query.filter(models.Room.type == room_type)
+    if floor is not None:
+        query = query.filter(models.Room.floor == floor)
+    if room_number_from is not None:
+        query = query.filter(models.Room.number >= room_number_from)
+    if room_number_to is not None:
+        query = query.filter(models.Room.number <= room_number_to)
+    return query
+
+async def count_timeline_rooms(db: AsyncSession, room_type: Optional[str] = None, floor: Optional[int] = None, room_number_from: Optional[str] = None, room_number_to: Optional[str] = None) -> int:
+    """Počet pokojů odpovídajících filtrům časové osy (pro stránkování klienta)."""
+    count_q = _filter_rooms(select(func.count()).select_from(models.Room), room_type, floor, room_number_from, room_number_to)
+    return (await db.execute(count_q)).scalar_one()
+
+async def get_timeline_data(db: AsyncSession, start_date: date, end_date: date, room_type: Optional[str] = None, floor: Optional[int] = None, room_number_from: Optional[str] = None, room_number_to: Optional[str] = None, skip: int = 0, limit: int = TIMELINE_MAX_ROOMS) -> List[dict]:
+    """
+    Časová osa pro stránku pokojů (seřazených podle čísla). Načítá jen sloupce,
+    které události potřebují, a jen pro pokoje na stránce; odpověď se skládá
+    z prostých slovníků bez ORM objektů (validaci dělá až response_model).
+    """
+    rooms_q = select(models.Room.id, models.Room.number).order_by(models.Room.number).offset(skip).limit(min(limit, TIMELINE_MAX_ROOMS))
+    rooms = (await db.execute(_filter_rooms(rooms_q, room_type, floor, room_number_from, room_number_to))).all()
+    if not rooms:
+        return []
+    room_ids = [room_id for room_id, _ in rooms]
+    events: Dict[int, List[dict]] = {room_id: [] for room_id in room_ids}
+
+    reservations_q = (
+        select(models.Reservation.id, models.Reservation.room_id, models.Reservation.check_in_date, models.Reservation.check_out_date, models.Reservation.status, models.Guest.name)
+        .join(models.Guest, models.Guest.id == models.Reservation.guest_id)
+        .filter(models.Reservation.room_id.in_(room_ids), models.Reservation.check_in_date <= end_date, models.Reservation.check_out_date >= start_date)
+    )
+    for res_id, room_id, check_in, check_out, status, guest_name in (await db.execute(reservations_q)).all():
+        events[room_id].append(_reservation_event(res_id, check_in, check_out, status, guest_name))
+
+    tasks_q = (
+        select(models.Task.id, models.Task.room_id, models.Task.title, models.Task.due_date, models.Task.status, models.User.email)
+        .outerjoin(models.User, models.User.id == models.Task.assignee_id)
+        .filter(models.Task.room_id.in_(room_ids), models.Task.due_date >= start_date, models.Task.due_date <= end_date)
+    )
+    for task_id, room_id, title, due_date, status, assignee_email in (await db.execute(tasks_q)).all():
+        events[room_id].append(_task_event(task_id, title, due_date, status, assignee_email))
+
+    blocks_q = (
+        select(models.RoomBlock.id, models.RoomBlock.room_id, models.RoomBlock.reason, models.RoomBlock.start_date, models.RoomBlock.end_date)
+        .filter(models.RoomBlock.room_id.in_(room_ids), models.RoomBlock.start_date <= end_date, models.RoomBlock.end_date >= start_date)
+    )
+    for block_id, room_id, reason, block_start, block_end in (await db.execute(blocks_q)).all():
+        events[room_id].append(_block_event(block_id, reason, block_start, block_end))
+
+    return [{"room_id": room_id, "room_number": number, "events": events[room_id]} for room_id, number in rooms]
+
+async def get_timeline_changes(db: AsyncSession, since: datetime, start_date: date, end_date: date, room_type: Optional[str] = None, floor: Optional[int] = None, room_number_from: Optional[str] = None, room_number_to: Optional[str] = None) -> dict:
+    """
+    Změny časové osy od kurzoru `since`: události vytvořené nebo změněné v (since, cursor]
+    a záznamy o smazání. Cena je úměrná počtu změn, ne velikosti kalendáře.
+    Změněná událost, která už do okna nebo do vybraných pokojů nepatří, se vrátí jako odebraná.
+    """
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    cursor = timeline_cursor()
+    if since < datetime.utcnow() - timedelta(days=settings.TIMELINE_TOMBSTONE_RETENTION_DAYS):
+        return {"cursor": cursor, "resync_required": True, "changed": [], "removed": []}
+    if since >= cursor:
+        return {"cursor": since, "changed": [], "removed": []}
+    changed, removed = [], []
+
+    def in_rooms(number: Optional[str], r_type: Optional[str], r_floor: Optional[int]) -> bool:
+        return (
+            number is not None
+            and (room_type is None or r_type == room_type)
+            and (floor is None or r_floor == floor)
+            and (room_number_from is None or number >= room_number_from)
+            and (room_number_to is None or number <= room_number_to)
+        )
+
+    reservations_q = (
+        select(models.Reservation.id, models.Reservation.room_id, models.Reservation.check_in_date, models.Reservation.check_out_date, models.Reservation.status, models.Guest.name, models.Room.number, models.Room.type, models.Room.floor)
+        .join(models.Guest, models.Guest.id == models.Reservation.guest_id)
+        .join(models.Room, models.Room.id == models.Reservation.room_id)
+        .filter(models.Reservation.updated_at > since, models.Reservation.updated_at <= cursor)
+    )
+    for res_id, room_id, check_in, check_out, status, guest_name, number, r_type, r_floor in (await db.execute(reservations_q)).all():
+        if in_rooms(number, r_type, r_floor) and check_in <= end_date and check_out >= start_date:
+            changed.append({"room_id": room_id, "room_number": number, "event": _reservation_event(res_id, check_in, check_out, status, guest_name)})
+        else:
+            removed.append({"type": "reservation", "id": res_id, "room_id": room_id})
+
+    tasks_q = (
+        select(models.Task.id, models.Task.room_id, models.Task.title, models.Task.due_date, models.Task.status, models.User.email, models.Room.number, models.Room.type, models.Room.floor)
+        .outerjoin(models.User, models.User.id == models.Task.assignee_id)
+        .outerjoin(models.Room, models.Room.id == models.Task.room_id)
+        .filter(models.Task.updated_at > since, models.Task.updated_at <= cursor)
+    )
+    for task_id, room_id, title, due_date, status, assignee_email, number, r_type, r_floor in (await db.execute(tasks_q)).all():
+        if in_rooms(number, r_type, r_floor) and start_date <= due_date <= end_date:
+            changed.append({"room_id": room_id, "room_number": number, "event": _task_event(task_id, title, due_date, status, assignee_email)})
+        else:
+            removed.append({"type": "task", "id": task_id, "room_id": room_id})
+
+    blocks_q = (
+        select(models.RoomBlock.id, models.RoomBlock.room_id, models.RoomBlock.reason, models.RoomBlock.start_date, models.RoomBlock.end_date, models.Room.number, models.Room.type, models.Room.floor)
+        .join(models.Room, models.Room.id == models.RoomBlock.room_id)
+        .filter(models.RoomBlock.updated_at > since, models.RoomBlock.updated_at <= cursor)
+    )
+    for block_id, room_id, reason, block_start, block_end, number, r_type, r_floor in (await db.execute(blocks_q)).all():
+        if in_rooms(number, r_type, r_floor) and block_start <= end_date and block_end >= start_date:
+            changed.append({"room_id": room_id, "room_number": number, "event": _block_event(block_id, reason, block_start, block_end)})
+        else:
+            removed.append({"type": "block", "id": block_id, "room_id": room_id})
+
+    tombstones_q = select(models.TimelineTombstone.entity_type, models.TimelineTombstone.entity_id, models.TimelineTombstone.room_id).filter(models.TimelineTombstone.deleted_at > since, models.TimelineTombstone.deleted_at <= cursor)
+    for entity_type, entity_id, room_id in (await db.execute(tombstones_q)).all():
+        removed.append({"type": entity_type, "id": entity_id, "room_id": room_id})
+    return {"cursor": cursor, "changed": changed, "removed": removed}
+
+async def add_timeline_tombstone(db: AsyncSession, entity_type: str, entity_id: int, room_id: Optional[int]):
+    """Zapíše záznam o smazání (commit je na volajícím) a uklidí záznamy starší než retenční doba."""
+    db.add(models.TimelineTombstone(entity_type=entity_type, entity_id=entity_id, room_id=room_id))
+    expired_before = datetime.utcnow() - timedelta(days=settings.TIMELINE_TOMBSTONE_RETENTION_DAYS)
+    await db.execute(delete(models.TimelineTombstone).where(models.TimelineTombstone.deleted_at < expired_before))
 
 async def get_employees_schedule(db: AsyncSession, start_date: date, end_date: date) -> List[schemas.EmployeeSchedule]:
     tasks_res = await db.execute(select(models.Task).options(joinedload(models.Task.assignee), joinedload(models.Task.room)).filter(models.Task.due_date >= start_date, models.Task.due_date <= end_date, models.Task.assignee_id != None).order_by(models.Task.assignee_id, models.Task.due_date))
@@ -446,4 +1140,62 @@ async def get_active_tasks(db: AsyncSession) -> List[schemas.ActiveTask]:
     for task in active_tasks_res.scalars().all():
         if task.assignee:
             active_tasks.append(schemas.ActiveTask(task_id=task.id, title=task.title, status=task.status, employee=task.assignee, room=task.room))
-    return active_tasks
\ No newline at end of file
+    return active_tasks
+# --- CRUD pro Statistiky (čtení z denních souhrnů) ---
+STATS_MAX_DAYS = 731
+_STATS_SUMS = [func.sum(models.DailyStat.rooms_sold), func.sum(models.DailyStat.room_revenue), func.sum(models.DailyStat.other_revenue), func.sum(models.DailyStat.payments)]
+
+def _stats_row(day: Optional[date], room_type: Optional[str], available: int, sold, room_revenue, other_revenue, payments) -> schemas.StatsRow:
+    sold, room_revenue = int(sold or 0), room_revenue or 0.0
+    return schemas.StatsRow(
+        day=day, room_type=room_type, rooms_available=available, rooms_sold=sold,
+        occupancy=round(sold / available, 4) if available else 0.0,
+        adr=round(room_revenue / sold, 2) if sold else 0.0,
+        revpar=round(room_revenue / available, 2) if available else 0.0,
+        room_revenue=round(room_revenue, 2), other_revenue=round(other_revenue or 0.0, 2), payments=round(payments or 0.0, 2)
+    )
+
+async def _room_counts(db: AsyncSession, room_type: Optional[str] = None) -> Dict[str, int]:
+    """Počet pokojů podle typu - dostupné noci = pokoje × dny (podle aktuálního stavu pokojů)."""
+    query = select(models.Room.type, func.count(models.Room.id)).group_by(models.Room.type)
+    if room_type:
+        query = query.filter(models.Room.type == room_type)
+    return dict((await db.execute(query)).all())
+
+async def get_daily_stats(db: AsyncSession, start_date: date, end_date: date, room_type: Optional[str] = None, by_room_type: bool = False) -> List[schemas.StatsRow]:
+    """Statistiky po dnech [start_date, end_date] ze souhrnů; dny bez prodeje mají nuly."""
+    counts = await _room_counts(db, room_type)
+    group = [models.DailyStat.day] + ([models.DailyStat.room_type] if by_room_type else [])
+    query = select(*group, *_STATS_SUMS).filter(models.DailyStat.day >= start_date, models.DailyStat.day <= end_date).group_by(*group)
+    if room_type:
+        query = query.filter(models.DailyStat.room_type == room_type)
+    sums = {}
+    for row in (await db.execute(query)).all():
+        key = (row[0], row[1]) if by_room_type else (row[0], room_type)
+        sums[key] = row[len(group):]
+    # Typ pokoje, který už neexistuje (přejmenování), zůstane ve výpisu s nulovou dostupností
+    room_types = sorted(counts.keys() | {key[1] for key in sums}) if by_room_type else [room_type]
+    rows = []
+    for i in range((end_date - start_date).days + 1):
+        day = start_date + timedelta(days=i)
+        for current_type in room_types:
+            available = counts.get(current_type, 0) if current_type else sum(counts.values())
+            rows.append(_stats_row(day, current_type, available, *sums.get((day, current_type), (0, 0.0, 0.0, 0.0))))
+    return rows
+
+async def get_stats_summary(db: AsyncSession, start_date: date, end_date: date) -> schemas.StatsSummary:
+    """Souhrn za období celkem a po typech pokojů - jeden agregační dotaz nad souhrny."""
+    counts = await _room_counts(db)
+    days = (end_date - start_date).days + 1
+    query = select(models.DailyStat.room_type, *_STATS_SUMS).filter(models.DailyStat.day >= start_date, models.DailyStat.day <= end_date).group_by(models.DailyStat.room_type)
+    sums = {row[0]: row[1:] for row in (await db.execute(query)).all()}
+    by_room_type = [
+        _stats_row(None, room_type, counts.get(room_type, 0) * days, *sums.get(room_type, (0, 0.0, 0.0, 0.0)))
+        for room_type in sorted(counts.keys() | sums.keys())
+    ]
+    total = _stats_row(
+        None, None, sum(counts.values()) * days,
+        sum(row.rooms_sold for row in by_room_type), sum(row.room_revenue for row in by_room_type),
+        sum(row.other_revenue for row in by_room_type), sum(row.payments for row in by_room_type)
+    )
+    return schemas.StatsSummary(start_date=start_date, end_date=end_date, total=total, by_room_type=by_room_type)
@@ -1,13 +1,135 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 # Importujeme centralni nastaveni
 from .config import settings
+from .query_stats import attach_query_counter
+from .slow_queries import slow_query_log
+
+
+class PoolMetrics:
+    """Čítače poolu spojení: výdeje, čekání na volné spojení, timeouty a aktuálně půjčená spojení."""
+    def __init__(self, name: str):
+        self.name = name
+        self.connects = 0
+        self.checkouts = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.waits = 0
+
+    def record_wait(self, seconds: float):
+        self.waits += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def attach(self, sync_engine):
+        @event.listens_for(sync_engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            self.connects += 1
+
+        @event.listens_for(sync_engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+        @event.listens_for(sync_engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            self.in_use = max(self.in_use - 1, 0)
+
+    def stats(self, pool) -> dict:
+        return {
+            "name": self.name,
+            "pool_class": type(pool).__name__,
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "max_overflow": getattr(pool, "_max_overflow", None),
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else self.in_use,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            "max_in_use": self.max_in_use,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_avg": self.wait_seconds_total / self.waits if self.waits else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
 
-engine = create_async_engine(settings.DATABASE_URL)
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    QueuePool, který měří, jak dlouho požadavek čekal na spojení (včetně otevření nového).
+    Metriky se berou z atributu třídy, aby přežily `engine.dispose()` (pool se znovu vytvoří
+    stejnou třídou); každý engine proto dostane vlastní podtřídu.
+    """
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - started)
+
+
+def create_engine_with_metrics(name: str, url: str):
+    metrics = PoolMetrics(name)
+    kwargs = {}
+    if make_url(url).get_backend_name() != "sqlite":
+        # SQLite (testy, lokální vývoj) si pool volí sám podle typu databáze
+        kwargs = dict(
+            poolclass=type(f"InstrumentedPool_{name}", (InstrumentedPool,), {"metrics": metrics}),
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    db_engine = create_async_engine(url, **kwargs)
+    metrics.attach(db_engine.sync_engine)
+    attach_query_counter(db_engine.sync_engine)
+    slow_query_log.attach(db_engine)
+    return db_engine, metrics
+
+
+engine, pool_metrics = create_engine_with_metrics("primary", settings.DATABASE_URL)
 AsyncSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)
+
+# Read-only replika: bez DATABASE_READ_URL se čte z primární DB
+if settings.DATABASE_READ_URL:
+    read_engine, read_pool_metrics = create_engine_with_metrics("replica", settings.DATABASE_READ_URL)
+    AsyncReadSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=read_engine, class_=AsyncSession)
+else:
+    read_engine, read_pool_metrics, AsyncReadSessionLocal = engine, None, AsyncSessionLocal
+
 Base = declarative_base()
 
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_read_db():
+    """
+    Session pro čtecí endpointy (časová osa, rozvrhy, seznamy rezervací).
+    Data z repliky se mohou o zpoždění replikace opožďovat - nepoužívat tam, kde se
+    čte právě zapsané, kde se z výsledku zapisuje, ani tam, kde se z výsledku plní
+    sdílený stav procesu (indexy booking enginu, cache dostupnosti).
+    """
+    async with AsyncReadSessionLocal() as session:
+        yield session
+
+def get_pool_stats() -> list:
+    stats = [pool_metrics.stats(engine.sync_engine.pool)]
+    if read_pool_metrics is not None:
+        stats.append(read_pool_metrics.stats(read_engine.sync_engine.pool))
+    return stats
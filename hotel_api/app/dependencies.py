@@ -1,43 +1,65 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from . import crud, models, schemas
-from .database import get_db
+from . import crud, schemas
+from .database import get_db, AsyncSessionLocal
 from .config import settings
 from .models import UserRole
+from .principals import Principal, principal_cache, principal_from_user
+from .security import STREAM_TOKEN_SCOPE
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/auth/token", auto_error=False)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> Principal:
+    return await _user_from_token(token, db)
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+async def _user_from_token(token: Optional[str], db: AsyncSession, scope: Optional[str] = None) -> Principal:
+    """
+    Ověří token a vrátí principal. Při zásahu v cache se na DB nesahá
+    (session z `get_db` se bez dotazu k databázi vůbec nepřipojí).
+    `scope` musí odpovídat tokenu: přístupový token scope nemá, token pro SSE
+    (`STREAM_TOKEN_SCOPE`) tak jinde neprojde a přístupový token zase ne v URL streamu.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not token:
+        raise credentials_exception
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        if email is None or payload.get("scope") != scope:
             raise credentials_exception
         token_data = schemas.TokenData(email=email)
     except JWTError:
         raise credentials_exception
     
+    principal = principal_cache.get(token_data.email)
+    if principal is not None:
+        return principal
+    generation = principal_cache.generation
     user = await crud.get_user_by_email(db, email=token_data.email)
     if user is None:
         raise credentials_exception
-    return user
+    principal = principal_from_user(user)
+    principal_cache.set(token_data.email, principal, generation=generation)
+    return principal
 
-async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 def require_role(required_roles: list[UserRole]):
     """Závislost, která ověří, zda má uživatel jednu z požadovaných rolí."""
-    async def role_checker(current_user: models.User = Depends(get_current_active_user)):
+    async def role_checker(current_user: Principal = Depends(get_current_active_user)):
         if current_user.role not in required_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -51,4 +73,25 @@ is_owner = require_role([UserRole.majitel])
 is_admin_or_manager = require_role([UserRole.majitel, UserRole.spravce])
 is_storekeeper_or_manager = require_role([UserRole.skladnik, UserRole.spravce, UserRole.majitel])
 is_housekeeper_or_manager = require_role([UserRole.uklizecka, UserRole.spravce, UserRole.majitel])
-can_change_room_status = require_role([UserRole.uklizecka, UserRole.recepcni, UserRole.spravce, UserRole.majitel])
\ No newline at end of file
+can_change_room_status = require_role([UserRole.uklizecka, UserRole.recepcni, UserRole.spravce, UserRole.majitel])
+
+STAFF_ROLES = [UserRole.majitel, UserRole.spravce, UserRole.recepcni, UserRole.skladnik, UserRole.uklizecka]
+is_staff = require_role(STAFF_ROLES)
+
+async def get_stream_user(header_token: Optional[str] = Depends(oauth2_scheme_optional), token: Optional[str] = Query(None)):
+    """
+    Ověření pro dlouhá spojení (SSE): přístupový token z hlavičky Authorization, nebo
+    krátkodobý token z `POST /events/token` v `?token=`, protože prohlížečový EventSource
+    hlavičky posílat neumí (a URL končí v logách proxy). DB session se otevře jen na ověření
+    (a jen při minutí cache), aby ji spojení nedrželo po celou dobu streamu.
+    """
+    async with AsyncSessionLocal() as db:
+        if header_token:
+            user = await _user_from_token(header_token, db)
+        else:
+            user = await _user_from_token(token, db, scope=STREAM_TOKEN_SCOPE)
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    if user.role not in STAFF_ROLES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Nemáte dostatečná oprávnění pro tuto operaci.")
+    return user
@@ -0,0 +1,122 @@
+# FILE: hotel_api/app/events.py
+"""
+In-process sběrnice událostí pro živé obrazovky (recepce, tablety úklidu).
+
+Zápisové cesty publikují typované události (`room_status`, `task_created`,
+`task_updated`, `check_in`, `check_out`), SSE endpoint je rozesílá přihlášeným
+odběratelům. Každý odběratel má omezenou frontu: pokud nestíhá číst, nejstarší
+události se zahazují a klient dostane událost `resync` - má si stav znovu
+načíst přes REST. Pomalý klient tak nemůže neomezeně zvětšovat paměť.
+
+Sběrnice je per-proces; při více workerech vidí odběratel jen události
+zapsané ve svém workeru.
+"""
+import asyncio
+import itertools
+import json
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional, Set
+
+from .config import settings
+
+
+class Subscriber:
+    def __init__(self, max_queue: int, types: Optional[Set[str]] = None):
+        self.types = types
+        self._queue: Deque[dict] = deque()
+        self._max_queue = max_queue
+        self._wakeup = asyncio.Event()
+        self.dropped = 0
+        self._resync_pending = False
+
+    def put(self, event: dict):
+        if self.types is not None and event["type"] not in self.types:
+            return
+        if len(self._queue) >= self._max_queue:
+            self._queue.popleft()
+            self.dropped += 1
+            self._resync_pending = True
+        self._queue.append(event)
+        self._wakeup.set()
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """Další událost, nebo None, pokud během `timeout` žádná nepřišla (čas na heartbeat)."""
+        if not self._queue:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self._resync_pending:
+            # Část událostí chybí - klient si musí stav načíst znovu
+            self._resync_pending = False
+            return {"id": None, "type": "resync", "data": {"dropped": self.dropped}}
+        return self._queue.popleft()
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+
+class EventBus:
+    def __init__(self, max_queue: int, max_subscribers: int):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self._subscribers: Set[Subscriber] = set()
+        self._ids = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self, types: Optional[Set[str]] = None) -> Optional[Subscriber]:
+        """Nový odběratel, nebo None, pokud je dosažen limit odběratelů."""
+        if not self.has_capacity():
+            return None
+        subscriber = Subscriber(self.max_queue, types)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def has_capacity(self) -> bool:
+        return len(self._subscribers) < self.max_subscribers
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, event_type: str, data: Dict[str, Any]):
+        event = {"id": next(self._ids), "type": event_type, "data": {**data, "at": datetime.utcnow().isoformat()}}
+        self.published += 1
+        for subscriber in self._subscribers:
+            subscriber.put(event)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "max_subscribers": self.max_subscribers,
+            "max_queue": self.max_queue,
+            "published": self.published,
+            "queued": sum(s.queued for s in self._subscribers),
+            "dropped": sum(s.dropped for s in self._subscribers),
+        }
+
+
+def room_status_data(room) -> Dict[str, Any]:
+    return {"room_id": room.id, "number": room.number, "status": room.status.value}
+
+
+def task_data(task) -> Dict[str, Any]:
+    return {
+        "task_id": task.id, "room_id": task.room_id, "title": task.title,
+        "status": task.status.value, "assignee_id": task.assignee_id,
+        "due_date": task.due_date.isoformat() if task.due_date else None
+    }
+
+
+def format_sse(event: dict) -> str:
+    lines = [f"event: {event['type']}"]
+    if event["id"] is not None:
+        lines.insert(0, f"id: {event['id']}")
+    lines.append(f"data: {json.dumps(event['data'], ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+# Jediná instance pro celou aplikaci
+event_bus = EventBus(max_queue=settings.EVENT_QUEUE_SIZE, max_subscribers=settings.EVENT_MAX_SUBSCRIBERS)
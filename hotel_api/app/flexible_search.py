@@ -0,0 +1,53 @@
+# FILE: hotel_api/app/flexible_search.py
+"""
+Hledání pobytů s flexibilním termínem (okno příjezdů × rozsah počtu nocí) jedním průchodem.
+
+Pro každý typ pokoje se spočítá, kolik nocí po sobě je od daného dne volný
+alespoň jeden vhodný pokoj (nejdelší volný úsek přes všechny pokoje typu),
+a pro každý plán prefixové součty nočních cen. Dostupnost i cena libovolného
+pobytu (příjezd, počet nocí) je pak O(1) - bez opakování celého hledání
+pro každý možný den příjezdu.
+"""
+from typing import Iterable, List, Optional, Tuple
+
+
+def free_runs(occupied: int, span: int) -> List[int]:
+    """`runs[i]` = počet po sobě jdoucích volných nocí od noci `i` (bitmapa obsazenosti, bit 0 = první noc)."""
+    if not occupied:
+        return list(range(span, 0, -1))
+    runs = [0] * (span + 1)
+    for i in range(span - 1, -1, -1):
+        runs[i] = 0 if occupied >> i & 1 else runs[i + 1] + 1
+    return runs[:span]
+
+
+def longest_free_runs(occupancy: Iterable[int], span: int) -> List[int]:
+    """Po nocích maximum `free_runs` přes pokoje - pobyt délky n od noci i je možný, pokud `best[i] >= n`."""
+    best = [0] * span
+    for occupied in occupancy:
+        for i, run in enumerate(free_runs(occupied, span)):
+            if run > best[i]:
+                best[i] = run
+    return best
+
+
+def sweep_stays(nightly: List[Optional[float]], runs: List[int], restrictions: List[Tuple[Optional[int], bool]], min_nights: int, max_nights: int) -> List[Tuple[int, int, float]]:
+    """
+    Projde všechny příjezdy (indexy `restrictions`) a délky pobytu [min_nights, max_nights].
+    Vrací (index příjezdu, počet nocí, cena) pro pobyty, které jsou volné, mají cenu
+    na každou noc a splňují restrikce dne příjezdu.
+    """
+    cum_price, cum_covered = [0.0], [0]
+    for price in nightly:
+        cum_price.append(cum_price[-1] + (price or 0.0))
+        cum_covered.append(cum_covered[-1] + (price is not None))
+    stays = []
+    for arrival, (min_stay, closed_to_arrival) in enumerate(restrictions):
+        if closed_to_arrival:
+            continue
+        for nights in range(max(min_nights, min_stay or 0), min(max_nights, runs[arrival]) + 1):
+            if cum_covered[arrival + nights] - cum_covered[arrival] != nights:
+                # Noc bez ceny - delší pobyty ji obsahují také
+                break
+            stays.append((arrival, nights, round(cum_price[arrival + nights] - cum_price[arrival], 2)))
+    return stays
@@ -0,0 +1,106 @@
+# FILE: hotel_api/app/index_refresh.py
+"""
+Periodické znovunačtení in-memory indexů (ceny, restrikce) mimo cestu požadavku.
+
+Poprvé se index sestaví při startu aplikace (nebo při prvním dotazu) a požadavky
+na to počkají - bez indexu není co číst. Potom `ensure_ready` jen porovná stáří
+indexu; zastaralý index se načte znovu v tasku na pozadí s vlastní session a
+požadavky mezitím čtou ten původní.
+
+Nová struktura se sestaví stranou a vymění se najednou. Zápisy, které přišly
+během načítání, se po výměně zopakují nad novou strukturou - snapshot z DB je
+mohl minout. Výměna i dohrání zápisů proběhnou bez `await`, dotaz tedy vidí
+buď původní, nebo úplný nový index.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger("hotel_api.indexes")
+
+
+class RefreshableIndex:
+    """Základ indexu s obnovou na pozadí; potomek implementuje `_load` (načtení a sestavení) a `_install` (výměna)."""
+    name = "index"
+
+    def __init__(self, refresh_seconds: float, enabled: bool = True):
+        self.refresh_seconds = refresh_seconds
+        self.enabled = enabled
+        self.ready = False
+        self._built_at = 0.0
+        self._lock = asyncio.Lock()
+        self._rebuilding = False
+        self._pending_writes: List[Tuple[Callable, tuple]] = []
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _is_fresh(self) -> bool:
+        return self.ready and time.monotonic() - self._built_at < self.refresh_seconds
+
+    async def ensure_ready(self, db: AsyncSession):
+        if not self.enabled or self._is_fresh():
+            return
+        if self.ready:
+            self.schedule_refresh()
+            return
+        async with self._lock:
+            if not self.ready:
+                await self._rebuild(db)
+
+    async def rebuild(self, db: AsyncSession):
+        async with self._lock:
+            await self._rebuild(db)
+
+    def schedule_refresh(self) -> asyncio.Task:
+        """Spustí znovunačtení na pozadí (nejvýš jedno současně)."""
+        if self._refresh_task is None or self._refresh_task.done():
+            # Prázdný kontext: dotazy obnovy se nezapočítají do měřiče požadavku, který ji spustil
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh(), context=contextvars.Context())
+        return self._refresh_task
+
+    async def _refresh(self):
+        try:
+            async with self._lock:
+                if self._is_fresh():
+                    return
+                async with AsyncSessionLocal() as db:
+                    await self._rebuild(db)
+        except Exception:
+            # Zůstává původní index; další požadavek obnovu zkusí znovu
+            logger.exception("Obnova indexu %s selhala.", self.name)
+
+    async def stop(self):
+        """Zruší rozběhnutou obnovu (při ukončení aplikace); původní index zůstane beze změny."""
+        task = self._refresh_task
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _rebuild(self, db: AsyncSession):
+        self._rebuilding, self._pending_writes = True, []
+        try:
+            built = await self._load(db)
+        finally:
+            self._rebuilding = False
+        pending, self._pending_writes = self._pending_writes, []
+        self._install(built)
+        self.ready = True
+        for method, args in pending:
+            method(*args)
+        self._built_at = time.monotonic()
+
+    def _record_write(self, method: Callable, *args):
+        """Volají zápisové metody potomka - zápis během načítání se po výměně zopakuje."""
+        if self._rebuilding:
+            self._pending_writes.append((method, args))
+
+    async def _load(self, db: AsyncSession) -> Any:
+        raise NotImplementedError
+
+    def _install(self, built: Any):
+        raise NotImplementedError
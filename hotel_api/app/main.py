@@ -1,25 +1,49 @@
-from fastapi import FastAPI
+import secrets
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 
 # Importujeme všechny potřebné routery
 # Přidány nové: 'pricing', 'booking'
-from .routers import auth, users, tasks, rooms, inventory, reservations, dashboard, pricing, booking
+from .routers import auth, users, tasks, rooms, inventory, reservations, dashboard, pricing, booking, events
 from .database import get_db
+from .config import settings
+from .query_stats import QueryStatsMiddleware
+from .slow_queries import slow_query_log
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, render_metrics
+from .availability import availability_index
+from .pricing_index import price_index
+from .restriction_index import restriction_index
 from . import crud
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Kód zde se spustí PŘED startem aplikace
     print("Aplikace startuje...")
+    if slow_query_log.enabled:
+        slow_query_log.start(settings.SLOW_QUERY_LOG_FILE, settings.SLOW_QUERY_LOG_MAX_BYTES, settings.SLOW_QUERY_LOG_BACKUP_COUNT)
+        print(f"Log pomalých dotazů (nad {settings.SLOW_QUERY_THRESHOLD_MS} ms): {settings.SLOW_QUERY_LOG_FILE}")
     # Zajistíme existenci Centrálního skladu při startu
     async for db in get_db():
         await crud.get_or_create_central_storage(db)
         print("Ověřena existence Centrálního skladu.")
+        await availability_index.ensure_ready(db)
+        print(f"Sestaven index obsazenosti pro {len(availability_index.room_bits)} pokojů.")
+        await price_index.ensure_ready(db)
+        print(f"Sestaven cenový index pro {len(price_index.series)} kombinací typ pokoje × plán.")
+        await restriction_index.ensure_ready(db)
+        print(f"Sestaven index restrikcí pro {len(restriction_index.series)} kombinací typ pokoje × plán.")
 
     yield  # Zde běží samotná aplikace
 
     # Kód zde se spustí PO ukončení aplikace
+    await availability_index.stop()
+    await price_index.stop()
+    await restriction_index.stop()
+    await slow_query_log.stop()
     print("Aplikace se ukončuje.")
 
 # Vytvoření instance aplikace
@@ -38,7 +62,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Stránkování a kurzor časové osy musí být čitelné i z prohlížeče
+    expose_headers=["X-Total-Count", "X-Timeline-Cursor"],
 )
+# Počítání SQL dotazů na požadavek (hlavičky jen v ladicím režimu)
+app.add_middleware(QueryStatsMiddleware, headers=settings.QUERY_STATS_HEADERS)
+# Latence podle routy a rozpracované požadavky (vnější vrstva - měří i ostatní middleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # Propojení jednotlivých routerů
 app.include_router(auth.router)
@@ -50,7 +81,17 @@ app.include_router(reservations.router)
 app.include_router(dashboard.router)
 app.include_router(pricing.router) # NOVÝ ROUTER
 app.include_router(booking.router) # NOVÝ ROUTER
+app.include_router(events.router)
 
 @app.get("/", tags=["Root"])
 async def read_root():
-    return {"message": "Vítejte v Hotel Management API v3.0"}
\ No newline at end of file
+    return {"message": "Vítejte v Hotel Management API v3.0"}
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", tags=["Root"], response_class=PlainTextResponse, include_in_schema=False)
+    async def read_metrics(authorization: Optional[str] = Header(None)):
+        """Metriky v textovém formátu Prometheu (s nastaveným `METRICS_TOKEN` jen s bearer tokenem)."""
+        expected = f"Bearer {settings.METRICS_TOKEN}".encode()
+        if settings.METRICS_TOKEN and not secrets.compare_digest((authorization or "").encode(), expected):
+            raise HTTPException(status_code=401, detail="Neplatný token pro metriky.", headers={"WWW-Authenticate": "Bearer"})
+        return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
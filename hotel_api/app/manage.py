@@ -0,0 +1,34 @@
+# FILE: hotel_api/app/manage.py
+"""
+Správcovské příkazy (spouštět z adresáře hotel_api):
+
+    python -m app.manage rebuild-stats [--from 2025-01-01] [--to 2025-12-31]
+"""
+import argparse
+import asyncio
+from datetime import date
+
+from .database import AsyncSessionLocal, engine
+from .stats import rebuild_daily_stats
+
+
+async def rebuild_stats(start_date, end_date):
+    async with AsyncSessionLocal() as db:
+        rows = await rebuild_daily_stats(db, start_date, end_date)
+    await engine.dispose()
+    print(f"Přepočítáno {rows} denních souhrnů.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Správcovské příkazy Hotel Management API.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    stats = commands.add_parser("rebuild-stats", help="Přepočítá tabulku daily_stats z rezervací, účtů a plateb.")
+    stats.add_argument("--from", dest="start_date", type=date.fromisoformat, default=None)
+    stats.add_argument("--to", dest="end_date", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+    if args.command == "rebuild-stats":
+        asyncio.run(rebuild_stats(args.start_date, args.end_date))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# FILE: hotel_api/app/metrics.py
+"""
+Metriky pro Prometheus (textový formát 0.0.4) na `GET /metrics`.
+
+Na horké cestě se jen přičítá: histogram má pevné hranice košů a při měření
+se najde index koše (bisect) a zvýší jeden čítač. Zámky nejsou potřeba -
+middleware i obsluha `/metrics` běží ve vlákně event loopu. Kumulativní součty
+košů, stav poolů a čítače cache se počítají až při stažení metrik.
+
+Cesta se zapisuje jako šablona routy (`/reservations/{reservation_id}/bill`),
+ne skutečná URL, aby počet časových řad nerostl s id v adresách. Nenalezené
+cesty (404 bez routy) sdílí štítek `<unmatched>`.
+"""
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .crud import availability_cache
+from .database import get_pool_stats
+from .events import event_bus
+from .pricing_index import price_index
+from .principals import principal_cache
+from .security import password_hasher
+from .slow_queries import slow_query_log
+
+# Horní hranice košů latence v sekundách (jako výchozí koše klientů Prometheu, plus 25 ms a 30 s)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 30.0)
+UNMATCHED_ROUTE = "<unmatched>"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Histogram s pevnými koši; `counts[i]` = počet měření v koši i (poslední koš = +Inf)."""
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Páry (le, kumulativní počet) pro řádky `_bucket`, včetně `+Inf`."""
+        rows, total = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            rows.append(("+Inf" if bound == float("inf") else _format_value(bound), total))
+        return rows
+
+
+class RequestMetrics:
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        # (metoda, šablona routy, status) -> histogram
+        self.latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.in_flight: Dict[str, int] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route, str(status))
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram(self.bounds)
+        histogram.observe(seconds)
+
+    def reset(self):
+        self.latency.clear()
+        self.in_flight.clear()
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """ASGI middleware: latence podle (metoda, routa, status) a počet rozpracovaných požadavků podle metody."""
+    def __init__(self, app, metrics: RequestMetrics = request_metrics, exclude_paths: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.metrics = metrics
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_flight = self.metrics.in_flight
+        in_flight[method] = in_flight.get(method, 0) + 1
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight[method] -= 1
+            # Router doplní `scope["route"]` až při shodě - bez ní jde o nenalezenou cestu
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            self.metrics.observe(method, route, status, time.perf_counter() - started)
+
+
+# --- Textový formát ---
+
+def _format_value(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricsWriter:
+    """Skládá výstup; HELP/TYPE se zapíše jednou před prvním vzorkem dané metriky."""
+    def __init__(self):
+        self.lines: List[str] = []
+        self._declared = set()
+
+    def declare(self, name: str, kind: str, help_text: str):
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f"# HELP {name} {help_text}")
+            self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value, labels: Optional[Dict[str, str]] = None):
+        if value is None:
+            return
+        self.lines.append(f"{name}{_labels(labels or {})} {_format_value(value)}")
+
+    def gauge(self, name: str, help_text: str, value, labels: Optional[Dict[str, str]] = None):
+        self.declare(name, "gauge", help_text)
+        self.sample(name, value, labels)
+
+    def counter(self, name: str, help_text: str, value, labels: Optional[Dict[str, str]] = None):
+        self.declare(name, "counter", help_text)
+        self.sample(name, value, labels)
+
+    def histogram(self, name: str, help_text: str, histogram: Histogram, labels: Dict[str, str]):
+        self.declare(name, "histogram", help_text)
+        for le, count in histogram.cumulative():
+            self.sample(f"{name}_bucket", count, {**labels, "le": le})
+        self.sample(f"{name}_sum", histogram.sum, labels)
+        self.sample(f"{name}_count", sum(histogram.counts), labels)
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def write_request_metrics(writer: MetricsWriter, metrics: RequestMetrics = request_metrics):
+    for (method, route, status), histogram in sorted(metrics.latency.items()):
+        writer.histogram(
+            "hotel_http_request_duration_seconds", "Doba zpracování HTTP požadavku podle šablony routy.",
+            histogram, {"method": method, "route": route, "status": status},
+        )
+    writer.declare("hotel_http_requests_in_flight", "gauge", "Právě zpracovávané HTTP požadavky.")
+    for method, count in sorted(metrics.in_flight.items()):
+        writer.sample("hotel_http_requests_in_flight", count, {"method": method})
+
+
+# (klíč ve stats(), typ, název metriky, popis)
+POOL_METRICS = (
+    ("size", "gauge", "hotel_db_pool_size", "Nastavená velikost poolu spojení."),
+    ("checked_out", "gauge", "hotel_db_pool_checked_out", "Právě půjčená spojení."),
+    ("overflow", "gauge", "hotel_db_pool_overflow", "Spojení nad rámec velikosti poolu."),
+    ("max_in_use", "gauge", "hotel_db_pool_max_in_use", "Nejvyšší počet současně půjčených spojení."),
+    ("wait_seconds_max", "gauge", "hotel_db_pool_wait_seconds_max", "Nejdelší čekání na spojení."),
+    ("connects", "counter", "hotel_db_pool_connects_total", "Otevřená spojení do databáze."),
+    ("checkouts", "counter", "hotel_db_pool_checkouts_total", "Výdeje spojení z poolu."),
+    ("timeouts", "counter", "hotel_db_pool_timeouts_total", "Vypršená čekání na volné spojení."),
+)
+CACHE_METRICS = (
+    ("entries", "gauge", "hotel_cache_entries", "Počet záznamů v cache."),
+    ("cost", "gauge", "hotel_cache_cost", "Součet ceny záznamů v cache."),
+    ("hits", "counter", "hotel_cache_hits_total", "Zásahy cache."),
+    ("misses", "counter", "hotel_cache_misses_total", "Minutí cache (včetně expirovaných záznamů)."),
+    ("evictions", "counter", "hotel_cache_evictions_total", "Záznamy vytlačené kvůli kapacitě."),
+    ("expirations", "counter", "hotel_cache_expirations_total", "Záznamy odstraněné po vypršení TTL."),
+    ("invalidations", "counter", "hotel_cache_invalidations_total", "Záznamy odstraněné zneplatněním."),
+)
+
+
+def write_stats_metrics(writer: MetricsWriter, definitions: tuple, rows: List[dict], label: str):
+    """Řádky ze `stats()` (pooly, cache) - vzorky jedné metriky musí v textovém formátu jít po sobě."""
+    for key, kind, name, help_text in definitions:
+        writer.declare(name, kind, help_text)
+        for row in rows:
+            writer.sample(name, row[key], {label: row["name"]})
+
+
+def render_metrics() -> str:
+    writer = MetricsWriter()
+    write_request_metrics(writer)
+    write_stats_metrics(writer, POOL_METRICS, get_pool_stats(), "pool")
+    write_stats_metrics(writer, CACHE_METRICS, [availability_cache.stats(), price_index.derived_cache.stats(), principal_cache.stats()], "cache")
+
+    hasher = password_hasher.stats()
+    writer.gauge("hotel_password_hash_running", "Běžící hashování hesel.", hasher["running"])
+    writer.gauge("hotel_password_hash_waiting", "Hashování hesel čekající ve frontě.", hasher["waiting"])
+    writer.counter("hotel_password_hash_rejected_total", "Požadavky odmítnuté kvůli plné frontě hashování.", hasher["rejected"])
+
+    events = event_bus.stats()
+    writer.gauge("hotel_event_subscribers", "Připojení odběratelé živých událostí (SSE).", events["subscribers"])
+    writer.counter("hotel_events_published_total", "Publikované živé události.", events["published"])
+    writer.gauge("hotel_event_subscribers_dropped", "Události zahozené kvůli plné frontě (u připojených odběratelů).", events["dropped"])
+
+    slow = slow_query_log.stats()
+    writer.counter("hotel_slow_queries_total", "SQL příkazy nad prahem SLOW_QUERY_THRESHOLD_MS (včetně nezapsaných vzorkováním).", slow["slow"])
+    writer.counter("hotel_slow_queries_sampled_out_total", "Pomalé příkazy vynechané vzorkováním.", slow["sampled_out"])
+    writer.counter("hotel_slow_query_explains_total", "Spuštěné EXPLAINy pomalých příkazů.", slow["explains"])
+    return writer.render()
@@ -1,7 +1,8 @@
 # FILE: hotel_api/app/models.py
-from sqlalchemy import Column, Integer, String, Enum as SQLAlchemyEnum, ForeignKey, DateTime, Boolean, Float, Date
+from sqlalchemy import Column, Integer, String, Enum as SQLAlchemyEnum, ForeignKey, DateTime, Boolean, Float, Date, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from .database import Base
+from .rate_ranges import mask_to_weekdays
 import enum
 from datetime import datetime
 
@@ -35,6 +36,16 @@ class ReservationStatus(str, enum.Enum):
     zruseno = "zrušeno"
     no_show = "no-show"  # NOVÝ STAV
 
+class RateModifierType(str, enum.Enum):
+    percent = "percent"  # +/- procenta z ceny nadřazeného plánu
+    amount = "amount"    # +/- pevná částka za noc
+
+class PriceRounding(str, enum.Enum):
+    none = "none"          # na haléře
+    whole = "whole"        # na celé koruny
+    tens = "tens"          # na desítky
+    hundreds = "hundreds"  # na stovky
+
 # --- Modely Tabulek ---
 
 class User(Base):
@@ -47,6 +58,21 @@ class User(Base):
     
     tasks_assigned = relationship("Task", back_populates="assignee")
 
+# NOVÝ MODEL: Obnovovací (refresh) tokeny
+class RefreshToken(Base):
+    """ Dlouhodobý token pro obnovu přístupového tokenu. Ukládá se jen SHA-256 hash, při použití se rotuje. """
+    __tablename__ = "refresh_tokens"
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    # Všechny tokeny vzniklé rotací z jednoho přihlášení - při opakovaném použití se zneplatní celá rodina
+    family_id = Column(String(32), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user = relationship("User")
+
 class Task(Base):
     __tablename__ = "tasks"
     id = Column(Integer, primary_key=True, index=True)
@@ -54,6 +80,8 @@ class Task(Base):
     due_date = Column(Date, nullable=False)
     status = Column(SQLAlchemyEnum(TaskStatus), default=TaskStatus.cekajici)
     notes = Column(String(1000), nullable=True)
+    # Sledování změn pro delta dotazy časové osy
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     assignee_id = Column(Integer, ForeignKey("users.id"))
     assignee = relationship("User", back_populates="tasks_assigned")
@@ -61,12 +89,21 @@ class Task(Base):
     room_id = Column(Integer, ForeignKey("rooms.id"), nullable=True)
     room = relationship("Room", back_populates="tasks")
 
+    __table_args__ = (
+        # Moje úkoly, časová osa pokojů, aktivní úkoly a rozvrh zaměstnanců
+        Index("ix_tasks_assignee_id_due_date", "assignee_id", "due_date"),
+        Index("ix_tasks_room_id_due_date", "room_id", "due_date"),
+        Index("ix_tasks_status_due_date", "status", "due_date"),
+        Index("ix_tasks_due_date", "due_date"),
+    )
+
 class Room(Base):
     __tablename__ = "rooms"
     id = Column(Integer, primary_key=True, index=True)
     number = Column(String(20), unique=True, index=True, nullable=False)
     type = Column(String(100), nullable=False, default="Standard")
     capacity = Column(Integer, default=2)
+    floor = Column(Integer, nullable=True, index=True)
     # price_per_night = Column(Float, default=1000.0) # TOTO POLE JE NAHRAZENO CENOVÝMI PLÁNY
     status = Column(SQLAlchemyEnum(RoomStatus), default=RoomStatus.available_clean)
     
@@ -83,10 +120,46 @@ class RoomBlock(Base):
     reason = Column(String(255), nullable=False)
     start_date = Column(Date, nullable=False)
     end_date = Column(Date, nullable=False)
+    # Sledování změn pro delta dotazy časové osy
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     room_id = Column(Integer, ForeignKey("rooms.id"), nullable=False)
     room = relationship("Room", back_populates="blocks")
 
+    __table_args__ = (
+        # Překryv s obdobím pro vybrané pokoje (časová osa) i přes všechny pokoje (obsazenost)
+        Index("ix_room_blocks_room_id_dates", "room_id", "start_date", "end_date"),
+        Index("ix_room_blocks_end_date_start_date", "end_date", "start_date"),
+    )
+
+# NOVÝ MODEL: Záznamy o smazaných událostech časové osy
+class TimelineTombstone(Base):
+    """ Smazaná rezervace / úkol / blokace - aby klient delta dotazu věděl, co odebrat """
+    __tablename__ = "timeline_tombstones"
+    id = Column(Integer, primary_key=True, index=True)
+    entity_type = Column(String(20), nullable=False)  # "reservation" | "task" | "block"
+    entity_id = Column(Integer, nullable=False)
+    room_id = Column(Integer, nullable=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+# NOVÝ MODEL: Kniha obsazených nocí (ledger)
+class RoomNight(Base):
+    """ Jedna obsazená noc pokoje. Unikátní (room_id, night) zaručuje, že noc nelze prodat dvakrát. """
+    __tablename__ = "room_nights"
+    id = Column(Integer, primary_key=True, index=True)
+    room_id = Column(Integer, ForeignKey("rooms.id"), nullable=False)
+    night = Column(Date, nullable=False)
+
+    # Noc drží buď rezervace, nebo blokace
+    reservation_id = Column(Integer, ForeignKey("reservations.id", ondelete="CASCADE"), nullable=True, index=True)
+    block_id = Column(Integer, ForeignKey("room_blocks.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("room_id", "night", name="uq_room_nights_room_id_night"),
+        # Pro dotazy "které pokoje jsou v období obsazené" přes všechny pokoje
+        Index("ix_room_nights_night_room_id", "night", "room_id"),
+    )
+
 class Location(Base):
     __tablename__ = "locations"
     id = Column(Integer, primary_key=True, index=True)
@@ -113,6 +186,9 @@ class Stock(Base):
     item = relationship("InventoryItem")
     location = relationship("Location", back_populates="stock_items")
 
+    # Stav položky v lokaci i výpis skladu jedné lokace
+    __table_args__ = (Index("ix_stock_location_id_item_id", "location_id", "item_id"),)
+
 class Receipt(Base):
     __tablename__ = "receipts"
     id = Column(Integer, primary_key=True, index=True)
@@ -160,13 +236,22 @@ class Reservation(Base):
     
     # NOVÁ POLE
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     room = relationship("Room", back_populates="reservations")
     guest = relationship("Guest", back_populates="reservations")
     charges = relationship("RoomCharge", back_populates="reservation")
     payments = relationship("Payment", back_populates="reservation")
 
+    __table_args__ = (
+        # Překryv s obdobím: pro vybrané pokoje (časová osa, seznam), podle stavu (obsazenost,
+        # statistiky) a bez dalšího filtru (seznam rezervací). Konec pobytu je vpředu, protože
+        # "check_out_date >= začátek okna" odfiltruje historii.
+        Index("ix_reservations_room_id_dates", "room_id", "check_in_date", "check_out_date"),
+        Index("ix_reservations_status_dates", "status", "check_out_date", "check_in_date"),
+        Index("ix_reservations_check_out_date_check_in_date", "check_out_date", "check_in_date"),
+    )
+
 # ... (ostatní modely zůstávají stejné)
 
 class RoomCharge(Base):
@@ -179,7 +264,7 @@ class RoomCharge(Base):
     charged_at = Column(DateTime, default=datetime.utcnow)
     
     item_id = Column(Integer, ForeignKey("inventory_items.id"), nullable=True) # Může být i služba bez vazby na sklad
-    reservation_id = Column(Integer, ForeignKey("reservations.id"), nullable=False)
+    reservation_id = Column(Integer, ForeignKey("reservations.id"), nullable=False, index=True)
     
     item = relationship("InventoryItem")
     reservation = relationship("Reservation", back_populates="charges")
@@ -192,9 +277,25 @@ class Payment(Base):
     notes = Column(String(255), nullable=True) # NOVÉ POLE
     paid_at = Column(DateTime, default=datetime.utcnow)
     
-    reservation_id = Column(Integer, ForeignKey("reservations.id"), nullable=False)
+    reservation_id = Column(Integer, ForeignKey("reservations.id"), nullable=False, index=True)
     reservation = relationship("Reservation", back_populates="payments")
 
+# NOVÝ MODEL: Denní souhrny pro statistiky (obsazenost, ADR, RevPAR)
+class DailyStat(Base):
+    """ Prodané noci a tržby za den a typ pokoje. Udržuje se průběžně při zápisech rezervací, účtů a plateb. """
+    __tablename__ = "daily_stats"
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    room_type = Column(String(100), nullable=False)
+    rooms_sold = Column(Integer, nullable=False, default=0, server_default='0')
+    room_revenue = Column(Float, nullable=False, default=0.0, server_default='0')
+    other_revenue = Column(Float, nullable=False, default=0.0, server_default='0') # Položky na účtu (minibar, služby)
+    payments = Column(Float, nullable=False, default=0.0, server_default='0')
+
+    __table_args__ = (
+        UniqueConstraint("day", "room_type", name="uq_daily_stats_day_room_type"),
+    )
+
 # --- NOVÁ SEKCE: DYNAMICKÁ CENOTVORBA ---
 
 class RatePlan(Base):
@@ -203,6 +304,11 @@ class RatePlan(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, nullable=False)
     description = Column(String(500))
+    # Odvozený plán nemá vlastní ceny - počítají se z nadřazeného plánu pro každou noc
+    parent_plan_id = Column(Integer, ForeignKey("rate_plans.id"), nullable=True)
+    modifier_type = Column(SQLAlchemyEnum(RateModifierType), nullable=True)
+    modifier_value = Column(Float, nullable=True)
+    rounding = Column(SQLAlchemyEnum(PriceRounding), nullable=False, default=PriceRounding.none, server_default='none')
 
 class Rate(Base):
     """ Konkrétní cena pro typ pokoje na konkrétní den a v rámci plánu """
@@ -216,6 +322,29 @@ class Rate(Base):
     
     rate_plan = relationship("RatePlan")
 
+    # Jedna cena na den, typ pokoje a plán - umožňuje hromadný upsert
+    __table_args__ = (UniqueConstraint("room_type", "rate_plan_id", "date", name="uq_rates_room_type_plan_date"),)
+
+class RateRange(Base):
+    """ Cena pro typ pokoje a plán platná po celé období (sezónu), volitelně jen pro vybrané dny v týdnu """
+    __tablename__ = "rate_ranges"
+    id = Column(Integer, primary_key=True, index=True)
+    date_from = Column(Date, nullable=False)
+    date_to = Column(Date, nullable=False) # Včetně
+    price = Column(Float, nullable=False)
+    weekday_mask = Column(Integer, nullable=False, default=0b1111111) # bit 0 = pondělí ... bit 6 = neděle
+
+    room_type = Column(String(100), nullable=False)
+    rate_plan_id = Column(Integer, ForeignKey("rate_plans.id"), nullable=False)
+
+    rate_plan = relationship("RatePlan")
+
+    __table_args__ = (Index("ix_rate_ranges_room_type_plan_dates", "room_type", "rate_plan_id", "date_from", "date_to"),)
+
+    @property
+    def weekdays(self):
+        return mask_to_weekdays(self.weekday_mask)
+
 class Restriction(Base):
     """ Omezení (např. minimální délka pobytu) """
     __tablename__ = "restrictions"
@@ -228,4 +357,7 @@ class Restriction(Base):
     room_type = Column(String(100), nullable=False)
     rate_plan_id = Column(Integer, ForeignKey("rate_plans.id"), nullable=False)
     
-    rate_plan = relationship("RatePlan")
\ No newline at end of file
+    rate_plan = relationship("RatePlan")
+
+    # Jedna restrikce na den, typ pokoje a plán - umožňuje hromadný upsert
+    __table_args__ = (UniqueConstraint("room_type", "rate_plan_id", "date", name="uq_restrictions_room_type_plan_date"),)
\ No newline at end of file
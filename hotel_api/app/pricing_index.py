@@ -0,0 +1,288 @@
+# FILE: hotel_api/app/pricing_index.py
+"""
+Index kumulativních cen pro výpočet ceny pobytu v O(1).
+
+Pro každou kombinaci (typ pokoje, cenový plán) drží pole denních cen
+v rámci horizontu a k nim prefixové součty cen a počtu nocí s cenou.
+Cena pobytu [check_in, check_out) je pak rozdíl dvou prefixů; pokud počet
+nocenných nocí nesedí, chybějící dny se dohledají jen v tomto (chybovém) případě.
+
+Index se sestavuje z tabulek `rates` a `rate_ranges` (denní cena má přednost
+před obdobím), zápisy cen ho aktualizují a kvůli zápisům z jiných procesů
+se periodicky znovu načítá na pozadí (viz `index_refresh`).
+
+Odvozené plány (`parent_plan_id`) vlastní řady nemají. Cena každé noci se
+počítá z řady kořenového (základního) plánu přes všechny úpravy v řetězci
+a výsledek pro (typ, plán, okno pobytu) se memoizuje až do dalšího zápisu cen.
+"""
+import math
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .cache import TTLLRUCache
+from .config import settings
+from .index_refresh import RefreshableIndex
+from .rate_ranges import expand_rate_ranges, iter_range_nights
+
+NightlyPrices = Dict[Tuple[str, int], Dict[date, float]]
+
+ROUNDING_STEPS = {
+    models.PriceRounding.none: 0.01,
+    models.PriceRounding.whole: 1,
+    models.PriceRounding.tens: 10,
+    models.PriceRounding.hundreds: 100,
+}
+
+
+class RatePlanDef(NamedTuple):
+    name: str
+    parent_plan_id: Optional[int]
+    modifier_type: Optional[models.RateModifierType]
+    modifier_value: Optional[float]
+    rounding: models.PriceRounding
+
+
+def plan_def(plan) -> RatePlanDef:
+    return RatePlanDef(plan.name, plan.parent_plan_id, plan.modifier_type, plan.modifier_value, plan.rounding or models.PriceRounding.none)
+
+
+async def load_rate_plan_defs(db: AsyncSession) -> Dict[int, RatePlanDef]:
+    query = select(models.RatePlan.id, models.RatePlan.name, models.RatePlan.parent_plan_id, models.RatePlan.modifier_type, models.RatePlan.modifier_value, models.RatePlan.rounding)
+    return {row.id: plan_def(row) for row in (await db.execute(query)).all()}
+
+
+def derivation_chain(plans: Dict[int, RatePlanDef], plan_id: int) -> Tuple[int, List[RatePlanDef]]:
+    """Vrátí (id kořenového plánu, úpravy od kořene k `plan_id`)."""
+    chain: List[RatePlanDef] = []
+    seen = {plan_id}
+    while plan_id in plans and plans[plan_id].parent_plan_id is not None:
+        chain.append(plans[plan_id])
+        plan_id = plans[plan_id].parent_plan_id
+        if plan_id in seen:
+            raise ValueError(f"Cenový plán {plan_id} je odvozen sám ze sebe.")
+        seen.add(plan_id)
+    chain.reverse()
+    return plan_id, chain
+
+
+def derive_price(price: float, chain: List[RatePlanDef]) -> float:
+    """Cena jedné noci po úpravách odvozených plánů; zaokrouhluje se po každém kroku řetězce."""
+    for plan in chain:
+        if plan.modifier_type == models.RateModifierType.percent:
+            price = price * (1 + plan.modifier_value / 100)
+        elif plan.modifier_type == models.RateModifierType.amount:
+            price = price + plan.modifier_value
+        step = ROUNDING_STEPS[plan.rounding]
+        price = round(math.floor(price / step + 0.5) * step, 2)
+    return price
+
+
+async def load_rate_layers(db: AsyncSession, start: date, end: date, room_types: Optional[List[str]] = None, rate_plan_id: Optional[int] = None) -> Tuple[NightlyPrices, NightlyPrices]:
+    """
+    Načte ceny pro okno [start, end) dvěma dotazy a vrátí je po vrstvách:
+    (ceny rozbalené z období, denní ceny). Denní vrstva má přednost.
+    """
+    range_q = select(models.RateRange).filter(models.RateRange.date_from < end, models.RateRange.date_to >= start).order_by(models.RateRange.id)
+    daily_q = select(models.Rate.room_type, models.Rate.rate_plan_id, models.Rate.date, models.Rate.price).filter(models.Rate.date >= start, models.Rate.date < end)
+    if room_types is not None:
+        range_q = range_q.filter(models.RateRange.room_type.in_(room_types))
+        daily_q = daily_q.filter(models.Rate.room_type.in_(room_types))
+    if rate_plan_id is not None:
+        range_q = range_q.filter(models.RateRange.rate_plan_id == rate_plan_id)
+        daily_q = daily_q.filter(models.Rate.rate_plan_id == rate_plan_id)
+    range_prices = expand_rate_ranges((await db.execute(range_q)).scalars().all(), start, end)
+    daily_prices: NightlyPrices = {}
+    for room_type, plan_id, day, price in (await db.execute(daily_q)).all():
+        daily_prices.setdefault((room_type, plan_id), {})[day] = price
+    return range_prices, daily_prices
+
+
+async def load_nightly_prices(db: AsyncSession, start: date, end: date, room_types: Optional[List[str]] = None, rate_plan_id: Optional[int] = None) -> NightlyPrices:
+    """Platné ceny jednotlivých nocí v okně [start, end) bez ohledu na způsob uložení."""
+    range_prices, daily_prices = await load_rate_layers(db, start, end, room_types, rate_plan_id)
+    for key, nightly in daily_prices.items():
+        range_prices.setdefault(key, {}).update(nightly)
+    return range_prices
+
+
+class PriceSeries:
+    """Denní ceny jednoho (typ pokoje, plán) a jejich prefixové součty."""
+
+    def __init__(self, nights: int):
+        self.prices: List[Optional[float]] = [None] * nights
+        # 1 = noc má denní cenu z `rates`, období ji nepřepíše
+        self.fixed = bytearray(nights)
+        self.cum_price: List[float] = [0.0] * (nights + 1)
+        self.cum_covered: List[int] = [0] * (nights + 1)
+
+    def recompute(self, from_offset: int = 0):
+        cum_price, cum_covered = self.cum_price, self.cum_covered
+        for i in range(from_offset, len(self.prices)):
+            price = self.prices[i]
+            cum_price[i + 1] = cum_price[i] + (price or 0.0)
+            cum_covered[i + 1] = cum_covered[i] + (price is not None)
+
+
+class PriceIndex(RefreshableIndex):
+    name = "cen"
+
+    def __init__(self, horizon_days: int, refresh_seconds: float, enabled: bool = True):
+        super().__init__(refresh_seconds, enabled)
+        self.horizon_days = horizon_days
+        self.horizon_start: Optional[date] = None
+        self.series: Dict[Tuple[str, int], PriceSeries] = {}
+        self.plans: Dict[int, RatePlanDef] = {}
+        # (typ pokoje, odvozený plán, příjezd, odjezd) -> (cena, chybějící dny)
+        self.derived_cache = TTLLRUCache("derived_prices", max_entries=settings.DERIVED_PRICE_CACHE_MAX_ENTRIES, ttl_seconds=refresh_seconds)
+
+    @property
+    def horizon_end(self) -> date:
+        return self.horizon_start + timedelta(days=self.horizon_days)
+
+    def covers(self, start: date, end: date) -> bool:
+        return self.enabled and self.ready and self.horizon_start <= start and end <= self.horizon_end
+
+    def _is_fresh(self) -> bool:
+        return super()._is_fresh() and self.horizon_start == date.today()
+
+    async def _load(self, db: AsyncSession):
+        horizon_start = date.today()
+        horizon_end = horizon_start + timedelta(days=self.horizon_days)
+        plans = await load_rate_plan_defs(db)
+        range_prices, daily_prices = await load_rate_layers(db, horizon_start, horizon_end)
+        series: Dict[Tuple[str, int], PriceSeries] = {}
+        for is_daily, layer in ((0, range_prices), (1, daily_prices)):
+            for key, nightly in layer.items():
+                if key not in series:
+                    series[key] = PriceSeries(self.horizon_days)
+                item = series[key]
+                for day, price in nightly.items():
+                    offset = (day - horizon_start).days
+                    item.prices[offset] = price
+                    item.fixed[offset] = is_daily
+        for item in series.values():
+            item.recompute()
+        return horizon_start, plans, series
+
+    def _install(self, built):
+        self.horizon_start, self.plans, self.series = built
+        self.derived_cache.clear()
+
+    # --- Aktualizace ze zápisových cest ---
+    def add_plan(self, plan):
+        self._record_write(self.add_plan, plan)
+        if self.ready:
+            self.plans[plan.id] = plan_def(plan)
+
+    def apply_rates(self, rates: List[Tuple[str, int, date, float]]):
+        """Zapíše nové ceny (typ, plán, den, cena) a přepočítá prefixy od nejstaršího změněného dne."""
+        self._record_write(self.apply_rates, rates)
+        if not self.ready:
+            return
+        changed: Dict[Tuple[str, int], int] = {}
+        for room_type, plan_id, day, price in rates:
+            offset = (day - self.horizon_start).days
+            if not 0 <= offset < self.horizon_days:
+                continue
+            key = (room_type, plan_id)
+            if key not in self.series:
+                self.series[key] = PriceSeries(self.horizon_days)
+            self.series[key].prices[offset] = price
+            self.series[key].fixed[offset] = 1
+            changed[key] = min(offset, changed.get(key, offset))
+        for key, from_offset in changed.items():
+            self.series[key].recompute(from_offset)
+        if changed:
+            self.derived_cache.clear()
+
+    def apply_ranges(self, ranges: List[dict]):
+        """Zapíše nová období (v pořadí vložení); noci s denní cenou zůstávají beze změny."""
+        self._record_write(self.apply_ranges, ranges)
+        if not self.ready:
+            return
+        changed: Dict[Tuple[str, int], int] = {}
+        for rate_range in ranges:
+            key = (rate_range["room_type"], rate_range["rate_plan_id"])
+            for day in iter_range_nights(rate_range["date_from"], rate_range["date_to"], rate_range["weekday_mask"], self.horizon_start, self.horizon_end):
+                if key not in self.series:
+                    self.series[key] = PriceSeries(self.horizon_days)
+                offset = (day - self.horizon_start).days
+                if not self.series[key].fixed[offset]:
+                    self.series[key].prices[offset] = rate_range["price"]
+                    changed[key] = min(offset, changed.get(key, offset))
+        for key, from_offset in changed.items():
+            self.series[key].recompute(from_offset)
+        if changed:
+            self.derived_cache.clear()
+
+    # --- Dotazy ---
+    def quote(self, room_type: str, plan_id: int, start: date, end: date) -> Tuple[Optional[float], List[date]]:
+        """
+        Vrátí (celková cena, chybějící dny). Pokud některý den nemá cenu,
+        je cena None a seznam obsahuje dny bez ceny.
+        """
+        plan = self.plans.get(plan_id)
+        if plan is not None and plan.parent_plan_id is not None:
+            key = (room_type, plan_id, start, end)
+            cached = self.derived_cache.get(key)
+            if cached is None:
+                cached = self._quote_derived(room_type, plan_id, start, end)
+                self.derived_cache.set(key, cached)
+            return cached
+        first, last = (start - self.horizon_start).days, (end - self.horizon_start).days
+        item = self.series.get((room_type, plan_id))
+        missing = self._missing_days(item, start, first, last)
+        if missing:
+            return None, missing
+        return round(item.cum_price[last] - item.cum_price[first], 2), []
+
+    def _missing_days(self, item: Optional[PriceSeries], start: date, first: int, last: int) -> List[date]:
+        if item is None:
+            return [start + timedelta(days=i) for i in range(last - first)]
+        if item.cum_covered[last] - item.cum_covered[first] != last - first:
+            return [self.horizon_start + timedelta(days=i) for i in range(first, last) if item.prices[i] is None]
+        return []
+
+    def _quote_derived(self, room_type: str, plan_id: int, start: date, end: date) -> Tuple[Optional[float], List[date]]:
+        root_id, chain = derivation_chain(self.plans, plan_id)
+        first, last = (start - self.horizon_start).days, (end - self.horizon_start).days
+        item = self.series.get((room_type, root_id))
+        missing = self._missing_days(item, start, first, last)
+        if missing:
+            return None, missing
+        return round(sum(derive_price(price, chain) for price in item.prices[first:last]), 2), []
+
+    def nightly_prices(self, room_type: str, plan_id: int, start: date, end: date) -> List[Optional[float]]:
+        """Ceny jednotlivých nocí [start, end) pro plán, u odvozeného plánu již upravené (None = bez ceny)."""
+        root_id, chain = derivation_chain(self.plans, plan_id)
+        first, last = (start - self.horizon_start).days, (end - self.horizon_start).days
+        item = self.series.get((room_type, root_id))
+        if item is None:
+            return [None] * (last - first)
+        return [None if price is None else derive_price(price, chain) for price in item.prices[first:last]]
+
+    def quote_all(self, room_types: List[str], start: date, end: date) -> Dict[Tuple[str, int], Tuple[str, float]]:
+        """Ceny pobytu pro všechny plány zadaných typů (včetně odvozených); vrací jen kombinace s cenou na každou noc."""
+        wanted = set(room_types)
+        result = {}
+        for plan_id, plan in self.plans.items():
+            root_id, _ = derivation_chain(self.plans, plan_id)
+            for room_type in wanted:
+                if (room_type, root_id) not in self.series:
+                    continue
+                total, missing = self.quote(room_type, plan_id, start, end)
+                if total is not None:
+                    result[(room_type, plan_id)] = (plan.name, total)
+        return result
+
+
+# Jediná instance pro celou aplikaci
+price_index = PriceIndex(
+    horizon_days=settings.PRICE_INDEX_HORIZON_DAYS,
+    refresh_seconds=settings.PRICE_INDEX_REFRESH_SECONDS,
+    enabled=settings.PRICE_INDEX_ENABLED
+)
@@ -0,0 +1,38 @@
+# FILE: hotel_api/app/principals.py
+"""
+Cache přihlášených uživatelů (principalů) pro ověřování požadavků.
+
+`get_current_user` by jinak pro každý požadavek s tokenem načítal uživatele
+z DB. Principal je neměnná kopie údajů potřebných pro autorizaci (id, e-mail,
+role, aktivní), uložená podle subjektu tokenu s omezenou dobou platnosti.
+Změna role nebo deaktivace záznam zneplatní; ostatní procesy se změnu dozví
+nejpozději po `PRINCIPAL_CACHE_TTL_SECONDS`.
+"""
+from dataclasses import dataclass
+
+from . import models
+from .cache import TTLLRUCache
+from .config import settings
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    email: str
+    role: models.UserRole
+    is_active: bool
+
+
+def principal_from_user(user: models.User) -> Principal:
+    return Principal(id=user.id, email=user.email, role=user.role, is_active=bool(user.is_active))
+
+
+principal_cache = TTLLRUCache(
+    name="principals",
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_principal(email: str):
+    principal_cache.invalidate(email)
@@ -0,0 +1,149 @@
+# FILE: hotel_api/app/query_stats.py
+"""
+Počítání SQL dotazů a času stráveného v databázi pro jeden požadavek (nebo libovolný blok kódu).
+
+Posluchače `before/after_cursor_execute` na enginech přičítají každý příkaz do měřiče, který je
+právě aktivní v contextvaru. Měřič zakládá `QueryStatsMiddleware` pro každý HTTP požadavek;
+s `QUERY_STATS_HEADERS=true` vrací výsledek v hlavičkách `X-DB-Query-Count` a `X-DB-Time-Ms`.
+V testech `assert_max_queries` hlídá rozpočet dotazů, aby N+1 regrese shodila test.
+"""
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+
+QUERY_COUNT_HEADER = "x-db-query-count"
+QUERY_TIME_HEADER = "x-db-time-ms"
+
+
+class QueryStats:
+    """Čítač příkazů jednoho bloku; každý příkaz se započítá i do všech nadřazených měřičů."""
+    def __init__(self, parent: Optional["QueryStats"] = None, record_statements: bool = False):
+        self.parent = parent
+        self.count = 0
+        self.db_seconds = 0.0
+        self.statements: Optional[List[str]] = [] if record_statements else None
+
+    def record(self, statement: str, seconds: float):
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.db_seconds += seconds
+            if stats.statements is not None:
+                stats.statements.append(statement)
+            stats = stats.parent
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+# ASGI scope právě zpracovávaného požadavku (pro log pomalých dotazů)
+_request_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def current_route() -> Optional[str]:
+    """Řetězec "METODA šablona-routy" aktuálního požadavku (před nalezením routy skutečná cesta), mimo požadavek None."""
+    scope = _request_scope.get()
+    if scope is None:
+        return None
+    return f"{scope['method']} {getattr(scope.get('route'), 'path', None) or scope['path']}"
+
+
+@contextmanager
+def track_queries(record_statements: bool = False) -> Iterator[QueryStats]:
+    """Počítá dotazy provedené uvnitř bloku (ve stejném asyncio tasku)."""
+    stats = QueryStats(_current.get(), record_statements)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def attach_query_counter(sync_engine):
+    """Zaregistruje posluchače na engine; bez aktivního měřiče stojí jeden přístup ke contextvaru."""
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        started = conn.info.get("query_started")
+        if stats is not None and started:
+            stats.record(statement, time.perf_counter() - started.pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def on_error(exception_context):
+        # Po chybě příkazu se after_cursor_execute nevolá - zahodíme jeho začátek měření
+        started = exception_context.connection.info.get("query_started") if exception_context.connection is not None else None
+        if _current.get() is not None and started:
+            started.pop()
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware: každý HTTP požadavek dostane vlastní měřič. Hlavičky se posílají se
+    začátkem odpovědi, u streamovaných odpovědí (SSE) tedy pokrývají jen dotazy do té doby.
+    """
+    def __init__(self, app, headers: bool = False):
+        self.app = app
+        self.headers = headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        scope_token = _request_scope.set(scope)
+        with track_queries() as stats:
+            async def send_with_stats(message):
+                if self.headers and message["type"] == "http.response.start":
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (QUERY_COUNT_HEADER.encode(), str(stats.count).encode()),
+                        (QUERY_TIME_HEADER.encode(), f"{stats.db_seconds * 1000:.2f}".encode()),
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_stats)
+            finally:
+                _request_scope.reset(scope_token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def assert_max_queries(limit: int, label: str = "blok") -> Iterator[QueryStats]:
+    """
+    Test helper: selže, pokud blok provede víc než `limit` SQL příkazů. Chybová zpráva
+    obsahuje provedené příkazy, aby bylo vidět, co se opakuje.
+
+        with assert_max_queries(4, "check-in"):
+            await client.post(f"/reservations/{res_id}/checkin", headers=auth)
+    """
+    with track_queries(record_statements=True) as stats:
+        yield stats
+    if stats.count > limit:
+        listing = "\n".join(f"  {i}. {statement}" for i, statement in enumerate(stats.statements, 1))
+        raise QueryBudgetExceeded(f"{label}: {stats.count} SQL dotazů, povoleno nejvýše {limit}:\n{listing}")
+
+
+def max_queries(limit: int):
+    """Dekorátor pro async testy / funkce: celé volání musí zůstat v rozpočtu `limit` dotazů."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with assert_max_queries(limit, func.__name__):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
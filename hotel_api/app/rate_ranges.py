@@ -0,0 +1,63 @@
+# FILE: hotel_api/app/rate_ranges.py
+"""
+Práce s cenami uloženými po obdobích (`RateRange`).
+
+Období platí od `date_from` do `date_to` včetně a volitelně jen pro vybrané
+dny v týdnu (bitová maska `weekday_mask`, bit 0 = pondělí). Pro konkrétní noc platí:
+1. denní cena z tabulky `rates`, pokud existuje,
+2. jinak cena z naposledy vloženého období (nejvyšší id), které noc pokrývá.
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+ALL_WEEKDAYS = 0b1111111
+
+
+def weekdays_to_mask(weekdays: Optional[Iterable[int]]) -> int:
+    if weekdays is None:
+        return ALL_WEEKDAYS
+    mask = 0
+    for weekday in weekdays:
+        mask |= 1 << weekday
+    return mask
+
+
+def mask_to_weekdays(mask: int) -> List[int]:
+    return [weekday for weekday in range(7) if mask >> weekday & 1]
+
+
+def iter_range_nights(date_from: date, date_to: date, weekday_mask: int, start: date, end: date) -> Iterator[date]:
+    """Noci období, které spadají do [start, end) a do povolených dnů v týdnu."""
+    day, last = max(date_from, start), min(date_to, end - timedelta(days=1))
+    while day <= last:
+        if weekday_mask >> day.weekday() & 1:
+            yield day
+        day += timedelta(days=1)
+
+
+def expand_rate_ranges(ranges: Iterable, start: date, end: date) -> Dict[Tuple[str, int], Dict[date, float]]:
+    """
+    Rozbalí období na denní ceny v okně [start, end).
+    `ranges` musí být seřazené podle id, aby novější období přepsala starší.
+    """
+    prices: Dict[Tuple[str, int], Dict[date, float]] = {}
+    for rate_range in ranges:
+        nightly = prices.setdefault((rate_range.room_type, rate_range.rate_plan_id), {})
+        for day in iter_range_nights(rate_range.date_from, rate_range.date_to, rate_range.weekday_mask, start, end):
+            nightly[day] = rate_range.price
+    return prices
+
+
+def compact_daily_rates(rates: Iterable[Tuple[str, int, date, float]]) -> List[Tuple[str, int, date, date, float]]:
+    """
+    Složí denní ceny seřazené podle (typ, plán, den) do souvislých období se stejnou cenou.
+    Vrací (typ, plán, od, do včetně, cena).
+    """
+    ranges: List[list] = []
+    for room_type, plan_id, day, price in rates:
+        last = ranges[-1] if ranges else None
+        if last and last[0] == room_type and last[1] == plan_id and last[4] == price and last[3] + timedelta(days=1) == day:
+            last[3] = day
+        else:
+            ranges.append([room_type, plan_id, day, day, price])
+    return [tuple(r) for r in ranges]
@@ -0,0 +1,125 @@
+# FILE: hotel_api/app/restriction_index.py
+"""
+Index restrikcí (minimální délka pobytu, zákaz příjezdu) pro vyhodnocení bez dotazů do DB.
+
+Pro každou kombinaci (typ pokoje, cenový plán) drží v rámci horizontu pole
+minimální délky pobytu (0 = bez omezení) a příznaků closed-to-arrival.
+Restrikce se vyhodnocují podle dne příjezdu. Index se sestavuje z tabulky
+`restrictions`, zápisy restrikcí ho aktualizují a kvůli zápisům z jiných
+procesů se periodicky znovu načítá na pozadí (stejně jako cenový index).
+"""
+from array import array
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .config import settings
+from .index_refresh import RefreshableIndex
+
+RestrictionKey = Tuple[str, int]
+
+
+def restriction_violation(min_stay: Optional[int], closed_to_arrival: bool, arrival: date, nights: int) -> Optional[str]:
+    """Důvod, proč pobyt restrikce nesplňuje, nebo None."""
+    if closed_to_arrival:
+        return f"Příjezd dne {arrival.isoformat()} není možný."
+    if min_stay and nights < min_stay:
+        return f"Minimální počet nocí pro příjezd {arrival.isoformat()} je {min_stay}."
+    return None
+
+
+async def load_arrival_restrictions(db: AsyncSession, arrival: date, room_types: Optional[List[str]] = None) -> Dict[RestrictionKey, Tuple[Optional[int], bool]]:
+    """Restrikce pro jeden den příjezdu jedním dotazem: {(typ, plán): (min_stay, closed_to_arrival)}."""
+    query = select(models.Restriction.room_type, models.Restriction.rate_plan_id, models.Restriction.min_stay, models.Restriction.closed_to_arrival).filter(models.Restriction.date == arrival)
+    if room_types is not None:
+        query = query.filter(models.Restriction.room_type.in_(room_types))
+    return {(room_type, plan_id): (min_stay, bool(cta)) for room_type, plan_id, min_stay, cta in (await db.execute(query)).all()}
+
+
+async def load_restrictions(db: AsyncSession, start: date, end: date, room_types: Optional[List[str]] = None) -> Dict[RestrictionKey, Dict[date, Tuple[Optional[int], bool]]]:
+    """Restrikce pro dny příjezdu [start, end) jedním dotazem: {(typ, plán): {den: (min_stay, closed_to_arrival)}}."""
+    query = select(models.Restriction.room_type, models.Restriction.rate_plan_id, models.Restriction.date, models.Restriction.min_stay, models.Restriction.closed_to_arrival).filter(models.Restriction.date >= start, models.Restriction.date < end)
+    if room_types is not None:
+        query = query.filter(models.Restriction.room_type.in_(room_types))
+    restrictions: Dict[RestrictionKey, Dict[date, Tuple[Optional[int], bool]]] = {}
+    for room_type, plan_id, day, min_stay, cta in (await db.execute(query)).all():
+        restrictions.setdefault((room_type, plan_id), {})[day] = (min_stay, bool(cta))
+    return restrictions
+
+
+class RestrictionSeries:
+    def __init__(self, nights: int):
+        self.min_stay = array("H", bytes(2 * nights))
+        self.closed_to_arrival = bytearray(nights)
+
+
+class RestrictionIndex(RefreshableIndex):
+    name = "restrikcí"
+
+    def __init__(self, horizon_days: int, refresh_seconds: float, enabled: bool = True):
+        super().__init__(refresh_seconds, enabled)
+        self.horizon_days = horizon_days
+        self.horizon_start: Optional[date] = None
+        self.series: Dict[RestrictionKey, RestrictionSeries] = {}
+
+    @property
+    def horizon_end(self) -> date:
+        return self.horizon_start + timedelta(days=self.horizon_days)
+
+    def covers(self, arrival: date) -> bool:
+        return self.enabled and self.ready and self.horizon_start <= arrival < self.horizon_end
+
+    def _is_fresh(self) -> bool:
+        return super()._is_fresh() and self.horizon_start == date.today()
+
+    async def _load(self, db: AsyncSession):
+        horizon_start = date.today()
+        horizon_end = horizon_start + timedelta(days=self.horizon_days)
+        query = select(models.Restriction.room_type, models.Restriction.rate_plan_id, models.Restriction.date, models.Restriction.min_stay, models.Restriction.closed_to_arrival).filter(models.Restriction.date >= horizon_start, models.Restriction.date < horizon_end)
+        series: Dict[RestrictionKey, RestrictionSeries] = {}
+        self._write(series, horizon_start, (await db.execute(query)).all())
+        return horizon_start, series
+
+    def _install(self, built):
+        self.horizon_start, self.series = built
+
+    def _write(self, series: Dict[RestrictionKey, RestrictionSeries], horizon_start: date, rows):
+        for room_type, plan_id, day, min_stay, closed_to_arrival in rows:
+            offset = (day - horizon_start).days
+            if not 0 <= offset < self.horizon_days:
+                continue
+            key = (room_type, plan_id)
+            if key not in series:
+                series[key] = RestrictionSeries(self.horizon_days)
+            series[key].min_stay[offset] = min(min_stay or 0, 0xFFFF)
+            series[key].closed_to_arrival[offset] = bool(closed_to_arrival)
+
+    # --- Aktualizace ze zápisových cest ---
+    def apply(self, rows: List[Tuple[str, int, date, Optional[int], bool]]):
+        """Zapíše restrikce (typ, plán, den, min_stay, closed_to_arrival)."""
+        self._record_write(self.apply, rows)
+        if self.ready:
+            self._write(self.series, self.horizon_start, rows)
+
+    # --- Dotazy ---
+    def lookup(self, room_type: str, plan_id: int, arrival: date) -> Tuple[Optional[int], bool]:
+        item = self.series.get((room_type, plan_id))
+        if item is None:
+            return None, False
+        offset = (arrival - self.horizon_start).days
+        return item.min_stay[offset] or None, bool(item.closed_to_arrival[offset])
+
+    def violation(self, room_type: str, plan_id: int, start: date, end: date) -> Optional[str]:
+        min_stay, closed_to_arrival = self.lookup(room_type, plan_id, start)
+        return restriction_violation(min_stay, closed_to_arrival, start, (end - start).days)
+
+
+# Jediná instance pro celou aplikaci (horizont a obnova jako u cenového indexu)
+restriction_index = RestrictionIndex(
+    horizon_days=settings.PRICE_INDEX_HORIZON_DAYS,
+    refresh_seconds=settings.PRICE_INDEX_REFRESH_SECONDS,
+    enabled=settings.PRICE_INDEX_ENABLED
+)
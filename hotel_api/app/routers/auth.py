@@ -5,8 +5,9 @@ from datetime import timedelta
 
 from .. import crud, schemas
 from ..database import get_db
-from ..security import create_access_token, verify_password
+from ..security import create_access_token, password_hasher
 from ..config import settings
+from ..principals import Principal, principal_cache, principal_from_user
 
 router = APIRouter(
     prefix="/auth",
@@ -16,14 +17,46 @@ router = APIRouter(
 @router.post("/token", response_model=schemas.Token)
 async def login_for_access_token(db: AsyncSession = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
     user = await crud.get_user_by_email(db, email=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await password_hasher.verify_and_update(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    principal = principal_from_user(user)
+    if new_hash:
+        # Hash s jiným počtem kol než BCRYPT_ROUNDS - přehashujeme, dokud známe heslo
+        user.hashed_password = new_hash
+    refresh_token = await crud.issue_refresh_token(db, user_id=principal.id)
+    await db.commit()
+    return _token_response(principal, refresh_token)
+
+def _token_response(principal: Principal, refresh_token: str) -> dict:
+    # Následné požadavky s tokenem najdou uživatele v cache
+    principal_cache.set(principal.email, principal)
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": principal.email}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/refresh", response_model=schemas.Token)
+async def refresh_access_token(request: schemas.RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Vymění refresh token za nový přístupový token a nový refresh token (rotace).
+    Původní refresh token tím přestává platit; jeho opětovné použití zneplatní
+    všechny tokeny z daného přihlášení.
+    """
+    principal, refresh_token = await crud.rotate_refresh_token(db, request.refresh_token)
+    return _token_response(principal, refresh_token)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(request: schemas.RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Zneplatní refresh token (a tokeny vzniklé z téhož přihlášení). Přístupový token
+    platí do své expirace.
+    """
+    await crud.revoke_refresh_token_family(db, request.refresh_token)
\ No newline at end of file
@@ -29,6 +29,36 @@ async def check_availability(
         guests=request.guests
     )
 
+@router.post("/availability/detailed", response_model=schemas.AvailabilitySearchResult)
+async def check_availability_detailed(
+    request: schemas.AvailabilityRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stejné hledání jako `/availability`, navíc vrací nabídky vyřazené restrikcemi
+    (minimální délka pobytu, zákaz příjezdu) i s důvodem vyřazení.
+    """
+    if request.end_date <= request.start_date:
+        raise HTTPException(status_code=400, detail="Datum odjezdu musí být po datu příjezdu.")
+    return await crud.find_available_room_types_detailed(
+        db,
+        start_date=request.start_date,
+        end_date=request.end_date,
+        guests=request.guests
+    )
+
+@router.post("/availability/flexible", response_model=List[schemas.FlexibleAvailableRoomType])
+async def check_flexible_availability(
+    request: schemas.FlexibleAvailabilityRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Hledání s flexibilním termínem (např. "nejlevnější 3 noci kdykoliv v březnu").
+    Pro každý typ pokoje a cenový plán vrátí cenový kalendář všech možných pobytů
+    s příjezdem v zadaném okně a délkou v zadaném rozsahu.
+    """
+    return await crud.find_flexible_availability(db, request=request)
+
 @router.post("/reservations", response_model=schemas.Reservation, status_code=201)
 async def create_public_reservation(
     request: schemas.PublicReservationRequest,
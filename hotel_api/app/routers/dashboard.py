@@ -1,12 +1,18 @@
 # FILE: hotel_api/app/routers/dashboard.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from datetime import date
+from typing import List, Optional
+from datetime import date, datetime
 
 from .. import crud, schemas
-from ..database import get_db
+from ..database import get_db, get_read_db, get_pool_stats
 from ..dependencies import is_admin_or_manager
+from ..availability import availability_index
+from ..pricing_index import price_index
+from ..stats import rebuild_daily_stats
+from ..principals import principal_cache
+from ..security import password_hasher
+from ..config import settings
 
 router = APIRouter(
     prefix="/dashboard",
@@ -16,22 +22,66 @@ router = APIRouter(
 
 @router.get("/timeline", response_model=List[schemas.RoomTimeline])
 async def get_rooms_timeline(
+    response: Response,
     start_date: date,
     end_date: date,
-    db: AsyncSession = Depends(get_db)
+    room_type: Optional[str] = None,
+    floor: Optional[int] = None,
+    room_number_from: Optional[str] = None,
+    room_number_to: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(crud.TIMELINE_MAX_ROOMS, gt=0, le=crud.TIMELINE_MAX_ROOMS),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Vrátí kompletní časovou osu událostí (rezervace, úkoly) pro všechny pokoje
+    Vrátí časovou osu událostí (rezervace, úkoly, blokace) pro pokoje
     v zadaném časovém rozmezí. Ideální pro vizuální kalendář pokojů.
+    Pokoje jsou seřazené podle čísla a stránkované (`skip`, `limit`);
+    lze je omezit typem, patrem nebo rozsahem čísel pokojů. Celkový počet
+    pokojů pro filtry vrací hlavička `X-Total-Count`.
+    """
+    # Kurzor bereme před načtením - změny během dotazu zachytí příští delta dotaz.
+    # Data z repliky se mohou opožďovat, kurzor proto posuneme o její maximální zpoždění.
+    replica_lag = settings.DATABASE_READ_MAX_LAG_SECONDS if settings.DATABASE_READ_URL else 0.0
+    response.headers["X-Timeline-Cursor"] = crud.timeline_cursor(replica_lag).isoformat()
+    total = await crud.count_timeline_rooms(db, room_type=room_type, floor=floor, room_number_from=room_number_from, room_number_to=room_number_to)
+    response.headers["X-Total-Count"] = str(total)
+    return await crud.get_timeline_data(
+        db, start_date=start_date, end_date=end_date,
+        room_type=room_type, floor=floor,
+        room_number_from=room_number_from, room_number_to=room_number_to,
+        skip=skip, limit=limit
+    )
+
+@router.get("/timeline/changes", response_model=schemas.TimelineDelta)
+async def get_rooms_timeline_changes(
+    since: datetime,
+    start_date: date,
+    end_date: date,
+    room_type: Optional[str] = None,
+    floor: Optional[int] = None,
+    room_number_from: Optional[str] = None,
+    room_number_to: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Delta režim časové osy: vrátí jen rezervace, úkoly a blokace vytvořené, změněné
+    nebo smazané po kurzoru `since` (z hlavičky `X-Timeline-Cursor` plné časové osy
+    nebo z pole `cursor` předchozí delty). Filtry pokojů a okno mají stejný význam
+    jako u `/timeline`; události, které do nich přestaly patřit, jsou v `removed`.
     """
-    return await crud.get_timeline_data(db, start_date=start_date, end_date=end_date)
+    return await crud.get_timeline_changes(
+        db, since=since, start_date=start_date, end_date=end_date,
+        room_type=room_type, floor=floor,
+        room_number_from=room_number_from, room_number_to=room_number_to
+    )
 
 
 @router.get("/employees-schedule", response_model=List[schemas.EmployeeSchedule])
 async def get_full_employees_schedule(
     start_date: date,
     end_date: date,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Vrátí přehled všech zaměstnanců a jejich naplánovaných úkolů v zadaném
@@ -41,9 +91,98 @@ async def get_full_employees_schedule(
 
 
 @router.get("/active-tasks", response_model=List[schemas.ActiveTask])
-async def get_current_active_tasks(db: AsyncSession = Depends(get_db)):
+async def get_current_active_tasks(db: AsyncSession = Depends(get_read_db)):
     """
     Poskytuje "živý" přehled o tom, co se právě děje. Vrací seznam všech úkolů,
     které jsou ve stavu 'probíhá', včetně informací o zaměstnanci a pokoji.
     """
-    return await crud.get_active_tasks(db)
\ No newline at end of file
+    return await crud.get_active_tasks(db)
+
+
+# --- Statistiky obsazenosti a tržeb ---
+
+def _check_stats_range(start_date: date, end_date: date, max_days: Optional[int] = None):
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="Datum konce musí být stejné nebo pozdější než datum začátku.")
+    if max_days and (end_date - start_date).days + 1 > max_days:
+        raise HTTPException(status_code=400, detail=f"Maximální rozsah je {max_days} dní.")
+
+@router.get("/stats/daily", response_model=List[schemas.StatsRow])
+async def get_daily_stats(
+    start_date: date,
+    end_date: date,
+    room_type: Optional[str] = None,
+    by_room_type: bool = False,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Obsazenost, ADR a RevPAR po dnech v rozmezí `start_date`-`end_date` (včetně),
+    volitelně pro jeden typ pokoje nebo rozpadnuté po typech (`by_room_type`).
+    Počítá se z denních souhrnů, ne z rezervací.
+    """
+    _check_stats_range(start_date, end_date, crud.STATS_MAX_DAYS)
+    return await crud.get_daily_stats(db, start_date, end_date, room_type=room_type, by_room_type=by_room_type)
+
+@router.get("/stats/summary", response_model=schemas.StatsSummary)
+async def get_stats_summary(start_date: date, end_date: date, db: AsyncSession = Depends(get_read_db)):
+    """
+    Obsazenost, ADR a RevPAR za celé období celkem a po typech pokojů.
+    """
+    _check_stats_range(start_date, end_date)
+    return await crud.get_stats_summary(db, start_date, end_date)
+
+@router.post("/stats/rebuild", response_model=schemas.StatsRebuildResult)
+async def rebuild_stats(start_date: Optional[date] = None, end_date: Optional[date] = None, db: AsyncSession = Depends(get_db)):
+    """
+    Přepočítá denní souhrny ze zdrojových tabulek (bez dat = celá historie).
+    Totéž z příkazové řádky: `python -m app.manage rebuild-stats`.
+    """
+    rows = await rebuild_daily_stats(db, start_date, end_date)
+    return schemas.StatsRebuildResult(message=f"Přepočítáno {rows} denních souhrnů.", rows=rows)
+
+
+# --- Systémová diagnostika ---
+
+@router.get("/system/availability-index", response_model=schemas.AvailabilityIndexReport)
+async def verify_availability_index(db: AsyncSession = Depends(get_db)):
+    """
+    Porovná in-memory index obsazenosti s databází a vrátí noci, ve kterých se liší.
+    Prázdný seznam `mismatches` znamená, že index je konzistentní.
+    """
+    return await availability_index.verify(db)
+
+
+@router.post("/system/availability-index/rebuild", response_model=schemas.AvailabilityIndexReport)
+async def rebuild_availability_index(db: AsyncSession = Depends(get_db)):
+    """
+    Znovu sestaví index obsazenosti z databáze (např. po zjištěném driftu) a vrátí výsledek ověření.
+    """
+    await availability_index.rebuild(db)
+    return await availability_index.verify(db)
+
+
+
+@router.get("/system/caches", response_model=List[schemas.CacheStats])
+async def get_cache_stats():
+    """
+    Vrátí čítače in-memory cache (zásahy, minutí, vytlačení, zneplatnění) a jejich zaplnění.
+    """
+    return [crud.availability_cache.stats(), price_index.derived_cache.stats(), principal_cache.stats()]
+
+
+@router.get("/system/password-hasher", response_model=schemas.PasswordHasherStats)
+async def get_password_hasher_stats():
+    """
+    Vytížení poolu pro hashování hesel: běžící a čekající operace, odmítnuté požadavky
+    a průměrná / maximální doba čekání ve frontě.
+    """
+    return password_hasher.stats()
+
+
+@router.get("/system/db-pool")
+async def get_db_pool_stats():
+    """
+    Stav poolů spojení (primární DB a případně replika): velikost, půjčená spojení,
+    overflow, timeouty a průměrná / maximální doba čekání na spojení.
+    """
+    return get_pool_stats()
@@ -0,0 +1,77 @@
+# FILE: hotel_api/app/routers/events.py
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional, Set
+
+from .. import schemas
+from ..config import settings
+from ..dependencies import get_stream_user, is_admin_or_manager, is_staff
+from ..principals import Principal
+from ..security import create_stream_token
+from ..events import event_bus, format_sse
+
+router = APIRouter(prefix="/events", tags=["Živé události"])
+
+EVENT_TYPES = {"room_status", "task_created", "task_updated", "check_in", "check_out"}
+
+async def event_stream(request: Request, wanted: Optional[Set[str]]):
+    # Odběratel se registruje až při čtení těla odpovědi: `finally` ho pak odhlásí vždy,
+    # i když se odpověď nikdy neodešle (chyba, odpojení před začátkem streamu)
+    subscriber = event_bus.subscribe(wanted)
+    if subscriber is None:
+        # Limit mezitím zaplnil souběžný požadavek - prohlížeč se připojí znovu za 3 s
+        yield "retry: 3000\n\n"
+        return
+    try:
+        # Prohlížeč se po výpadku připojí znovu za 3 s
+        yield "retry: 3000\n\n"
+        while not await request.is_disconnected():
+            event = await subscriber.get(timeout=settings.EVENT_HEARTBEAT_SECONDS)
+            # Komentář jako heartbeat - proxy spojení bez provozu nezavřou
+            yield format_sse(event) if event is not None else ": ping\n\n"
+    finally:
+        event_bus.unsubscribe(subscriber)
+
+@router.post("/token", response_model=schemas.StreamToken)
+async def issue_stream_token(current_user: Principal = Depends(is_staff)):
+    """
+    Krátkodobý token pro `GET /events/stream?token=` (EventSource neumí poslat hlavičku).
+    Platí `STREAM_TOKEN_EXPIRE_SECONDS` a jen pro otevření streamu; přístupový token
+    tak nekončí v URL.
+    """
+    return schemas.StreamToken(stream_token=create_stream_token(current_user.email), expires_in=settings.STREAM_TOKEN_EXPIRE_SECONDS)
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    types: Optional[str] = None,
+    current_user: Principal = Depends(get_stream_user)
+):
+    """
+    Server-sent events se změnami stavu pokojů, úkolů a check-in/check-out
+    (`room_status`, `task_created`, `task_updated`, `check_in`, `check_out`).
+    Volitelné `types` (čárkami oddělené) omezí typy událostí. Přístupový token
+    se posílá v hlavičce Authorization, token z `POST /events/token` jako `?token=`.
+    Událost `resync` znamená,
+    že klient nestíhal číst a má si stav znovu načíst přes REST.
+    """
+    wanted = None
+    if types:
+        wanted = {t.strip() for t in types.split(",") if t.strip()}
+        unknown = wanted - EVENT_TYPES
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Neznámé typy událostí: {', '.join(sorted(unknown))}")
+    if not event_bus.has_capacity():
+        raise HTTPException(status_code=503, detail="Příliš mnoho připojených odběratelů, zkuste to později.")
+    return StreamingResponse(
+        event_stream(request, wanted),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stats", dependencies=[Depends(is_admin_or_manager)])
+async def get_event_stats():
+    """
+    Počet odběratelů, publikovaných a zahozených událostí.
+    """
+    return event_bus.stats()
@@ -1,7 +1,8 @@
 # FILE: hotel_api/app/routers/pricing.py
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
+from datetime import date
 
 from .. import crud, schemas
 from ..database import get_db
@@ -30,18 +31,74 @@ async def get_all_rate_plans(db: AsyncSession = Depends(get_db)):
     """
     return await crud.get_rate_plans(db)
 
-@router.post("/rates/batch", status_code=201)
+@router.post("/rates/batch", response_model=schemas.RateBatchResult, status_code=201)
 async def create_new_rates_in_batch(
     rates_data: List[schemas.RateCreate],
     db: AsyncSession = Depends(get_db)
 ):
     """
     Vytvoří nebo aktualizuje více cen najednou pro různé dny, typy pokojů a plány.
-    Toto je efektivní způsob, jak nahrát ceník na celé období.
+    Toto je efektivní způsob, jak nahrát ceník na celé období. Existující cena
+    pro stejný den, typ pokoje a plán se přepíše; odpověď obsahuje počet
+    nově vložených a aktualizovaných záznamů.
     """
-    # Zde by v reálné aplikaci byla i logika pro update, pokud cena pro daný den/typ/plán již existuje.
-    # Pro zjednodušení nyní pouze vkládáme nové.
-    await crud.create_rates_batch(db, rates=rates_data)
-    return {"message": f"{len(rates_data)} cenových záznamů bylo úspěšně vytvořeno."}
+    return await crud.create_rates_batch(db, rates=rates_data)
 
-# Zde by mohly být i endpointy pro správu restrikcí, např. /restrictions/batch
\ No newline at end of file
+@router.post("/rate-ranges/batch", response_model=schemas.RateRangeBatchResult, status_code=201)
+async def create_new_rate_ranges_in_batch(
+    ranges_data: List[schemas.RateRangeCreate],
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Nahraje ceny platné po celá období (např. sezóna, víkendy v sezóně) místo ceny
+    na každý den. Volitelné `weekdays` omezí období na vybrané dny v týdnu (0 = pondělí).
+    Denní ceny z `/rates/batch` mají před obdobím přednost, novější období přepisuje starší.
+    """
+    return await crud.create_rate_ranges_batch(db, ranges=ranges_data)
+
+@router.get("/rate-ranges/", response_model=List[schemas.RateRange])
+async def get_all_rate_ranges(
+    room_type: Optional[str] = None,
+    rate_plan_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Vrátí cenová období, volitelně filtrovaná podle typu pokoje a plánu.
+    """
+    return await crud.get_rate_ranges(db, room_type=room_type, rate_plan_id=rate_plan_id)
+
+@router.post("/rates/compact", response_model=schemas.RateCompactionResult)
+async def compact_daily_rates(
+    request: schemas.RateCompactionRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Složí denní ceny do období (souvislé dny se stejnou cenou) a denní záznamy odstraní.
+    Výsledné ceny pobytů se nemění, tabulka `rates` se ale výrazně zmenší.
+    """
+    return await crud.compact_rates(db, request=request)
+
+@router.post("/restrictions/batch", response_model=schemas.RestrictionBatchResult, status_code=201)
+async def create_new_restrictions_in_batch(
+    restrictions_data: List[schemas.RestrictionCreate],
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Vytvoří nebo aktualizuje restrikce (minimální délka pobytu, zákaz příjezdu)
+    pro více dní, typů pokojů a plánů najednou. Restrikce se vyhodnocují podle
+    dne příjezdu; existující restrikce pro stejný den, typ pokoje a plán se přepíše.
+    """
+    return await crud.create_restrictions_batch(db, restrictions=restrictions_data)
+
+@router.get("/restrictions/", response_model=List[schemas.Restriction])
+async def get_all_restrictions(
+    room_type: Optional[str] = None,
+    rate_plan_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Vrátí restrikce, volitelně filtrované podle typu pokoje, plánu a období.
+    """
+    return await crud.get_restrictions(db, room_type=room_type, rate_plan_id=rate_plan_id, date_from=date_from, date_to=date_to)
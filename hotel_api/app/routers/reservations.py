@@ -5,7 +5,7 @@ from typing import List, Optional
 from datetime import date
 
 from .. import crud, schemas, models
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..dependencies import require_role
 
 # Oprávnění pro recepční a vyšší
@@ -23,7 +23,7 @@ async def get_reservation_list(
     end_date: date,
     room_id: Optional[int] = None,
     status: Optional[str] = None,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Získá seznam rezervací pro interní účely s možností filtrace."""
     # Tato funkce `get_reservations` by se musela v crud.py rozšířit o nové filtry, pokud je potřeba.
@@ -6,6 +6,7 @@ from typing import List, Optional
 from .. import crud, models, schemas
 from ..database import get_db
 from ..dependencies import is_admin_or_manager, can_change_room_status
+from ..events import event_bus, room_status_data
 
 router = APIRouter(prefix="/rooms", tags=["Pokoje"])
 
@@ -39,6 +40,7 @@ async def update_room_status(
     db_room.status = status_update.status
     await db.commit()
     await db.refresh(db_room)
+    event_bus.publish("room_status", room_status_data(db_room))
     return db_room
 
 # --- NOVÉ: Správa Blokací Pokojů ---
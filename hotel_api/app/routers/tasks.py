@@ -6,6 +6,8 @@ from datetime import date
 from .. import crud, models, schemas
 from ..database import get_db
 from ..dependencies import get_current_active_user, is_admin_or_manager
+from ..principals import Principal
+from ..events import event_bus, task_data
 
 router = APIRouter(prefix="/tasks", tags=["Úkoly"])
 
@@ -14,7 +16,7 @@ async def read_my_tasks(
     start_date: date,
     end_date: date,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     tasks = await crud.get_tasks_for_user(db, user_id=current_user.id, start_date=start_date, end_date=end_date)
     return tasks
@@ -24,7 +26,7 @@ async def update_task_status(
     task_id: int,
     task_update: schemas.TaskUpdateStatus,
     db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     db_task = await crud.get_task_by_id(db, task_id=task_id)
     if not db_task:
@@ -42,6 +44,7 @@ async def update_task_status(
         
     await db.commit()
     await db.refresh(db_task)
+    event_bus.publish("task_updated", task_data(db_task))
     return db_task
 
 # Endpoint pro vytváření úkolů s ověřením oprávnění
@@ -4,6 +4,7 @@ from typing import List
 from .. import crud, schemas, models
 from ..database import get_db
 from ..dependencies import is_admin_or_manager, get_current_user
+from ..principals import Principal
 
 router = APIRouter(
     prefix="/users",
@@ -46,8 +47,21 @@ async def create_user_by_admin(user: schemas.UserCreate, db: AsyncSession = Depe
     return await crud.create_user(db=db, user=user)
 
 
+@router.patch("/{user_id}", response_model=schemas.UserInDB)
+async def update_user(
+    user_id: int,
+    user_update: schemas.UserUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(is_admin_or_manager)
+):
+    """
+    Změní roli nebo deaktivuje / znovu aktivuje uživatele (pouze pro administrátory).
+    Změna platí okamžitě v tomto procesu, v ostatních nejpozději po vypršení cache přihlášených uživatelů.
+    """
+    return await crud.update_user(db, user_id=user_id, user_update=user_update, changed_by=current_user)
+
 @router.get("/me", response_model=schemas.UserInDB)
-async def read_users_me(current_user: models.User = Depends(get_current_user)):
+async def read_users_me(current_user: Principal = Depends(get_current_user)):
     """Vrátí informace o aktuálně přihlášeném uživateli."""
     return current_user
 @router.get("/employees/", response_model=List[schemas.Employee], dependencies=[Depends(is_admin_or_manager)])
@@ -1,8 +1,8 @@
 # FILE: hotel_api/app/schemas.py
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List, Union
+from pydantic import BaseModel, EmailStr, Field, conint, field_validator
+from typing import Optional, List, Union, Literal, Annotated
 from datetime import date, datetime
-from .models import UserRole, TaskStatus, RoomStatus, ReservationStatus
+from .models import UserRole, TaskStatus, RoomStatus, ReservationStatus, RateModifierType, PriceRounding
 
 # --- Schémata pro Uživatele ---
 class UserBase(BaseModel):
@@ -18,6 +18,18 @@ class UserInDB(UserBase):
     is_active: bool
     class Config: from_attributes = True
 
+class UserUpdate(BaseModel):
+    """ Částečná změna - vynechané pole se nemění, explicitní null se odmítne (422) """
+    role: Optional[UserRole] = None
+    is_active: Optional[bool] = None
+
+    @field_validator("role", "is_active")
+    @classmethod
+    def reject_null(cls, value):
+        if value is None:
+            raise ValueError("Hodnota nesmí být null; pole, které se nemění, vynechte.")
+        return value
+
 class Employee(BaseModel):
     id: int
     email: EmailStr
@@ -51,12 +63,14 @@ class RoomBase(BaseModel):
     number: str
     type: str = "Standard"
     capacity: int = 2
+    floor: Optional[int] = None
 
 class RoomCreate(RoomBase): pass
 
 class RoomUpdate(BaseModel):
     type: Optional[str] = None
     capacity: Optional[int] = None
+    floor: Optional[int] = None
 
 class RoomUpdateStatus(BaseModel):
     status: RoomStatus
@@ -216,6 +230,39 @@ class AvailableRoomType(BaseModel):
     rate_plan_id: int
     rate_plan_name: str
 
+class RejectedOffer(BaseModel):
+    """ Nabídka, kterou vyřadila restrikce (min. délka pobytu, zákaz příjezdu) """
+    room_type: str
+    rate_plan_id: int
+    rate_plan_name: str
+    reason: str
+
+class AvailabilitySearchResult(BaseModel):
+    offers: List[AvailableRoomType]
+    rejected: List[RejectedOffer]
+
+class FlexibleAvailabilityRequest(BaseModel):
+    """ Hledání s flexibilním termínem: příjezd kdykoliv v [arrival_from, arrival_to], délka pobytu v [min_nights, max_nights] """
+    arrival_from: date
+    arrival_to: date
+    min_nights: int = Field(..., gt=0)
+    max_nights: Optional[int] = Field(None, gt=0)  # výchozí = min_nights
+    guests: int = Field(..., gt=0)
+
+class FlexibleStayPrice(BaseModel):
+    check_in_date: date
+    check_out_date: date
+    nights: int
+    total_price: float
+
+class FlexibleAvailableRoomType(BaseModel):
+    room_type: str
+    capacity: int
+    rate_plan_id: int
+    rate_plan_name: str
+    cheapest_price: float
+    stays: List[FlexibleStayPrice]
+
 class PublicReservationRequest(BaseModel):
     room_type: str
     rate_plan_id: int
@@ -229,6 +276,11 @@ class PublicReservationRequest(BaseModel):
 class RatePlanBase(BaseModel):
     name: str
     description: Optional[str] = None
+    # Odvozený plán: cena = cena nadřazeného plánu upravená o procenta / částku a zaokrouhlená
+    parent_plan_id: Optional[int] = None
+    modifier_type: Optional[RateModifierType] = None
+    modifier_value: Optional[float] = None
+    rounding: PriceRounding = PriceRounding.none
 
 class RatePlanCreate(RatePlanBase): pass
 
@@ -248,9 +300,44 @@ class Rate(RateBase):
     id: int
     class Config: from_attributes = True
 
+class RateBatchResult(BaseModel):
+    message: str
+    inserted: int
+    updated: int
+
+class RateRangeBase(BaseModel):
+    room_type: str
+    rate_plan_id: int
+    date_from: date
+    date_to: date # Včetně
+    price: float = Field(..., gt=0)
+    weekdays: Optional[List[conint(ge=0, le=6)]] = None # 0 = pondělí ... 6 = neděle, None = všechny dny
+
+class RateRangeCreate(RateRangeBase):
+    # Prázdný seznam by období nepřiřadil žádnou noc
+    weekdays: Optional[List[conint(ge=0, le=6)]] = Field(None, min_length=1)
+
+class RateRange(RateRangeBase):
+    id: int
+    class Config: from_attributes = True
+
+class RateRangeBatchResult(BaseModel):
+    message: str
+    created: int
+
+class RateCompactionRequest(BaseModel):
+    room_type: Optional[str] = None
+    rate_plan_id: Optional[int] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+class RateCompactionResult(BaseModel):
+    rates_removed: int
+    ranges_created: int
+
 class RestrictionBase(BaseModel):
     date: date
-    min_stay: Optional[int] = None
+    min_stay: Optional[conint(ge=1)] = None
     closed_to_arrival: Optional[bool] = None
     room_type: str
     rate_plan_id: int
@@ -260,6 +347,11 @@ class RestrictionCreate(RestrictionBase): pass
 class Restriction(RestrictionBase):
     id: int
     class Config: from_attributes = True
+
+class RestrictionBatchResult(BaseModel):
+    message: str
+    inserted: int
+    updated: int
     
 # --- Schémata pro Dashboard a Kalendář (zůstávají stejná) ---
 class EventBase(BaseModel):
@@ -268,30 +360,51 @@ class EventBase(BaseModel):
     end_date: datetime
 
 class ReservationEvent(EventBase):
-    type: str = "reservation"
+    type: Literal["reservation"] = "reservation"
     reservation_id: int
     guest_name: str
     status: ReservationStatus
 
 class TaskEvent(EventBase):
-    type: str = "task"
+    type: Literal["task"] = "task"
     task_id: int
     assignee_email: Optional[str]
     status: TaskStatus
     
 # NOVÉ: Událost pro blokaci
 class BlockEvent(EventBase):
-    type: str = "block"
+    type: Literal["block"] = "block"
     block_id: int
     reason: str
 
-TimelineEvent = Union[ReservationEvent, TaskEvent, BlockEvent]
+# Diskriminátor `type` - validace nemusí zkoušet všechny varianty
+TimelineEvent = Annotated[Union[ReservationEvent, TaskEvent, BlockEvent], Field(discriminator="type")]
 
 class RoomTimeline(BaseModel):
     room_id: int
     room_number: str
     events: List[TimelineEvent]
 
+class TimelineChange(BaseModel):
+    """ Nová nebo změněná událost; klient ji nahradí podle typu a id (může se přesunout i na jiný pokoj) """
+    room_id: int
+    room_number: str
+    event: TimelineEvent
+
+class TimelineRemoval(BaseModel):
+    """ Událost smazaná nebo přesunutá mimo sledované okno / pokoje """
+    type: Literal["reservation", "task", "block"]
+    id: int
+    room_id: Optional[int] = None
+
+class TimelineDelta(BaseModel):
+    """ Klient nejdřív odebere `removed`, pak použije `changed` (id smazané události se může znovu objevit jako nová) """
+    cursor: datetime
+    # Kurzor je starší než uchovávané záznamy o smazání - klient musí načíst celou časovou osu
+    resync_required: bool = False
+    changed: List[TimelineChange]
+    removed: List[TimelineRemoval]
+
 class TaskWithDetails(Task):
     room: Optional[Room] = None
     assignee: Employee
@@ -309,10 +422,81 @@ class ActiveTask(BaseModel):
     room: Optional[Room]
     class Config: from_attributes = True
 
+# --- Schémata pro statistiky (obsazenost, ADR, RevPAR) ---
+class StatsRow(BaseModel):
+    day: Optional[date] = None  # None = souhrn za celé období
+    room_type: Optional[str] = None  # None = všechny typy pokojů
+    rooms_available: int
+    rooms_sold: int
+    occupancy: float  # Podíl prodaných nocí (0-1)
+    adr: float  # Průměrná cena za prodanou noc
+    revpar: float  # Tržba za ubytování na dostupnou noc
+    room_revenue: float
+    other_revenue: float
+    payments: float
+
+class StatsSummary(BaseModel):
+    start_date: date
+    end_date: date
+    total: StatsRow
+    by_room_type: List[StatsRow]
+
+class StatsRebuildResult(BaseModel):
+    message: str
+    rows: int
+
+# --- Schémata pro systémovou diagnostiku ---
+class AvailabilityIndexMismatch(BaseModel):
+    room_id: int
+    missing_room: bool
+    missing_nights: List[date]
+    extra_nights: List[date]
+
+class AvailabilityIndexReport(BaseModel):
+    ready: bool
+    horizon_start: Optional[date] = None
+    horizon_end: Optional[date] = None
+    rooms_checked: int
+    mismatches: List[AvailabilityIndexMismatch]
+
+class CacheStats(BaseModel):
+    name: str
+    entries: int
+    max_entries: int
+    cost: int
+    max_cost: Optional[int] = None
+    ttl_seconds: float
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    invalidations: int
+
+class PasswordHasherStats(BaseModel):
+    workers: int
+    rounds: int
+    running: int
+    waiting: int
+    max_waiting: int
+    calls: int
+    rejected: int
+    queue_seconds_avg: float
+    queue_seconds_max: float
+    hash_seconds_avg: float
+
 # --- Schémata pro Autentizaci (zůstávají stejná) ---
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class StreamToken(BaseModel):
+    """ Krátkodobý token pro `GET /events/stream?token=` """
+    stream_token: str
+    expires_in: int
 
 class TokenData(BaseModel):
     email: Optional[str] = None
\ No newline at end of file
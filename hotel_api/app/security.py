@@ -1,18 +1,92 @@
+import asyncio
+import hashlib
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
+from fastapi import HTTPException
 from jose import JWTError, jwt
 
 # Importujeme centralni nastaveni
 from .config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# Aplikace hashuje jen přes `password_hasher` (pool vláken) - synchronní volání by blokovalo event loop
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+class PasswordHasher:
+    """
+    Spouští bcrypt v omezeném poolu vláken, aby hashování (stovky ms) neblokovalo event loop.
+
+    Souběh omezuje semafor o velikosti poolu; čas čekání na volné vlákno se měří.
+    Pokud čeká víc než `max_waiting` požadavků, další se rovnou odmítnou (503),
+    místo aby fronta rostla a přihlášení vypršela.
+    """
+    def __init__(self, workers: int, max_waiting: int):
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._semaphore = asyncio.Semaphore(workers)
+        self.waiting = 0
+        self.running = 0
+        self.calls = 0
+        self.rejected = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self.hash_seconds_total = 0.0
+
+    async def _run(self, fn, *args):
+        if self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server je přetížen, zkuste se přihlásit znovu za chvíli.")
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        queue_time = started - queued_at
+        self.calls += 1
+        self.queue_seconds_total += queue_time
+        self.queue_seconds_max = max(self.queue_seconds_max, queue_time)
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.running -= 1
+            self.hash_seconds_total += time.perf_counter() - started
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """(heslo sedí, nový hash nebo None) - nový hash vrací, pokud starý neodpovídá BCRYPT_ROUNDS."""
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(pwd_context.verify, password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "rounds": settings.BCRYPT_ROUNDS,
+            "running": self.running,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "queue_seconds_avg": self.queue_seconds_total / self.calls if self.calls else 0.0,
+            "queue_seconds_max": self.queue_seconds_max,
+            "hash_seconds_avg": self.hash_seconds_total / self.calls if self.calls else 0.0,
+        }
+
+
+# Jediná instance pro celou aplikaci
+password_hasher = PasswordHasher(workers=settings.PASSWORD_HASH_WORKERS, max_waiting=settings.PASSWORD_HASH_MAX_WAITING)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -23,4 +97,17 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+STREAM_TOKEN_SCOPE = "stream"
+
+def create_stream_token(email: str) -> str:
+    """Krátkodobý token jen pro otevření SSE streamu (posílá se v URL, proto ne přístupový token)."""
+    return create_access_token({"sub": email, "scope": STREAM_TOKEN_SCOPE}, expires_delta=timedelta(seconds=settings.STREAM_TOKEN_EXPIRE_SECONDS))
+
+def create_refresh_token() -> str:
+    return secrets.token_urlsafe(48)
+
+def hash_refresh_token(token: str) -> str:
+    """Refresh token je náhodný s vysokou entropií - stačí rychlý SHA-256, bcrypt není potřeba."""
+    return hashlib.sha256(token.encode()).hexdigest()
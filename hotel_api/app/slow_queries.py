@@ -0,0 +1,211 @@
+# FILE: hotel_api/app/slow_queries.py
+"""
+Log pomalých SQL dotazů.
+
+Příkaz delší než `SLOW_QUERY_THRESHOLD_MS` se zapíše jako jeden JSON řádek do
+rotovaného souboru: SQL, tvar parametrů (jen typy, ne hodnoty - v parametrech
+jsou e-maily a jména hostů), routa požadavku, funkce aplikace, ze které dotaz
+vzešel, a doba trvání. `SLOW_QUERY_SAMPLE_RATE` zapisuje jen část pomalých
+dotazů, aby log nezdražil špičku, kvůli které vznikl.
+
+S `SLOW_QUERY_EXPLAIN` se k SELECTům připojí plán. EXPLAIN běží jako samostatný
+task na vlastním spojení, takže požadavek na něj nečeká. Stejný příkaz se
+vysvětluje nejvýš jednou za `SLOW_QUERY_EXPLAIN_TTL_SECONDS` a současně běží
+nejvýš `SLOW_QUERY_EXPLAIN_MAX_PENDING` EXPLAINů. Zápis do souboru obstarává
+vlákno `QueueListener`, event loop na disk nečeká.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+from typing import Any, Callable, Optional, Set
+
+import greenlet
+from sqlalchemy import event
+
+from .cache import TTLLRUCache
+from .config import settings
+from .query_stats import current_route
+
+# Moduly, které dotaz jen předávají - původ hledáme až za nimi
+_INFRA_MODULES = {"app.database", "app.query_stats", "app.slow_queries"}
+# Delší seznamy parametrů (rozbalené IN) se shrnou na počet a typy
+_MAX_LISTED_PARAMETERS = 20
+
+_explaining: contextvars.ContextVar[bool] = contextvars.ContextVar("slow_query_explaining", default=False)
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> Any:
+    """Typy vázaných parametrů bez hodnot."""
+    if executemany:
+        rows = list(parameters)
+        return {"rows": len(rows), "row": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if len(parameters) > _MAX_LISTED_PARAMETERS:
+            return {"count": len(parameters), "types": dict(Counter(type(value).__name__ for value in parameters))}
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__ if parameters is not None else None
+
+
+def query_origin() -> Optional[str]:
+    """
+    První funkce aplikace (`modul.funkce`) na zásobníku volání. Async engine spouští příkazy
+    v podřízeném greenletu, volající korutiny jsou na zásobníku nadřazeného greenletu.
+    """
+    current = greenlet.getcurrent()
+    frame = current.parent.gr_frame if current.parent is not None else sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.") and module not in _INFRA_MODULES:
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class SlowQueryLog:
+    def __init__(
+        self, threshold_ms: float, sample_rate: float = 1.0, explain: bool = False,
+        explain_ttl_seconds: float = 600.0, explain_max_pending: int = 4,
+        random_source: Callable[[], float] = random.random,
+    ):
+        self.threshold_seconds = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.explain = explain
+        self.explain_max_pending = explain_max_pending
+        self._random = random_source
+        self._explained = TTLLRUCache("slow_query_explains", max_entries=1000, ttl_seconds=explain_ttl_seconds)
+        self._pending: Set[asyncio.Task] = set()
+        self._listener: Optional[QueueListener] = None
+        self.logger = logging.getLogger("hotel_api.slow_queries")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.slow = 0
+        self.sampled_out = 0
+        self.explains = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_seconds > 0
+
+    # --- Životní cyklus (lifespan aplikace) ---
+    def start(self, path: str, max_bytes: int, backup_count: int):
+        if self._listener is not None:
+            return
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        queue = SimpleQueue()
+        self.logger.addHandler(QueueHandler(queue))
+        self._listener = QueueListener(queue, handler)
+        self._listener.start()
+
+    async def stop(self, timeout: float = 5.0):
+        """Počká na rozběhnuté EXPLAINy, dopíše frontu a zavře soubor."""
+        if self._pending:
+            await asyncio.wait(set(self._pending), timeout=timeout)
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+
+    def stats(self) -> dict:
+        return {"slow": self.slow, "sampled_out": self.sampled_out, "explains": self.explains, "explains_pending": len(self._pending)}
+
+    # --- Měření ---
+    def attach(self, engine):
+        """Posluchače na async engine (EXPLAIN potřebuje vlastní spojení z téhož enginu)."""
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            if self.enabled:
+                conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after_execute(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info.get("slow_query_started")
+            if not started:
+                return
+            seconds = time.perf_counter() - started.pop()
+            if seconds >= self.threshold_seconds and not _explaining.get():
+                self._on_slow_query(engine, statement, parameters, executemany, seconds)
+
+        @event.listens_for(sync_engine, "handle_error")
+        def on_error(exception_context):
+            started = exception_context.connection.info.get("slow_query_started") if exception_context.connection is not None else None
+            if started:
+                started.pop()
+
+    def _on_slow_query(self, engine, statement: str, parameters, executemany: bool, seconds: float):
+        self.slow += 1
+        if self.sample_rate < 1.0 and self._random() >= self.sample_rate:
+            self.sampled_out += 1
+            return
+        record = {
+            "at": datetime.utcnow().isoformat(),
+            "duration_ms": round(seconds * 1000, 3),
+            "threshold_ms": self.threshold_seconds * 1000,
+            "database": engine.dialect.name,
+            "route": current_route(),
+            "origin": query_origin(),
+            "statement": statement,
+            "parameters": parameter_shape(parameters, executemany),
+        }
+        if self.explain and not executemany and statement.lstrip()[:6].upper() == "SELECT":
+            if self._schedule_explain(engine, statement, parameters, record) is not None:
+                return  # záznam i s plánem zapíše task
+        self._write(record)
+
+    def _schedule_explain(self, engine, statement: str, parameters, record: dict) -> Optional[asyncio.Task]:
+        if len(self._pending) >= self.explain_max_pending or self._explained.get(statement) is not None:
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Synchronní použití enginu (skripty) - bez event loopu plán nezjistíme
+            return None
+        self._explained.set(statement, True)
+        # Prázdný kontext: EXPLAIN se nesmí započítat do měřiče dotazů požadavku
+        task = loop.create_task(self._explain_and_write(engine, statement, parameters, record), context=contextvars.Context())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def _explain_and_write(self, engine, statement: str, parameters, record: dict):
+        _explaining.set(True)
+        self.explains += 1
+        try:
+            async with engine.connect() as conn:
+                if engine.dialect.name == "sqlite":
+                    rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+                    record["plan"] = [row[-1] for row in rows]
+                else:
+                    rows = (await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)).mappings().all()
+                    record["plan"] = [{key: value for key, value in row.items()} for row in rows]
+        except Exception as exc:
+            record["explain_error"] = f"{type(exc).__name__}: {exc}"
+        self._write(record)
+
+    def _write(self, record: dict):
+        if self.logger.handlers:
+            self.logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    sample_rate=settings.SLOW_QUERY_SAMPLE_RATE,
+    explain=settings.SLOW_QUERY_EXPLAIN,
+    explain_ttl_seconds=settings.SLOW_QUERY_EXPLAIN_TTL_SECONDS,
+    explain_max_pending=settings.SLOW_QUERY_EXPLAIN_MAX_PENDING,
+)
@@ -0,0 +1,160 @@
+# FILE: hotel_api/app/stats.py
+"""
+Denní souhrny (rollupy) pro statistiky obsazenosti a tržeb.
+
+Tabulka `daily_stats` drží pro každý den a typ pokoje počet prodaných nocí,
+tržbu za ubytování, tržbu z položek na účtu a přijaté platby. Zápisové cesty
+(rezervace, účty, platby) k ní v téže transakci přičtou rozdíl (+/-), takže
+dotazy na období čtou jen pár řádků souhrnu místo procházení `reservations`,
+`room_charges` a `payments`. `rebuild_daily_stats` souhrny přepočítá ze
+zdrojových tabulek (např. když se změní typ pokoje); existující data naplní
+už migrace, která tabulku zakládá.
+
+Cena ubytování se rozpočítává rovnoměrně na noci pobytu (haléřový zbytek
+připadne na poslední noc). Položky účtu a platby se počítají ke dni zápisu.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+
+# Stavy, jejichž noci se počítají jako prodané (zrušené a no-show ne)
+SOLD_STATUSES = {models.ReservationStatus.potvrzeno, models.ReservationStatus.ubytovan, models.ReservationStatus.odhlasen}
+STATS_COLUMNS = ("rooms_sold", "room_revenue", "other_revenue", "payments")
+STATS_UPSERT_CHUNK_SIZE = 1000
+
+StatsKey = Tuple[date, str]
+StatsDelta = Dict[StatsKey, Dict[str, float]]
+
+
+def nightly_revenue(price: float, nights: int) -> List[float]:
+    """Rozpočítá cenu pobytu na noci po haléřích; zbytek připadne na poslední noc."""
+    if nights <= 0:
+        return []
+    per_night = round(price / nights, 2)
+    return [per_night] * (nights - 1) + [round(price - per_night * (nights - 1), 2)]
+
+
+def add_to_delta(delta: StatsDelta, day: date, room_type: str, column: str, value: float):
+    cell = delta.setdefault((day, room_type), {})
+    cell[column] = cell.get(column, 0) + value
+
+
+def reservation_stats(room_type: str, check_in: date, check_out: date, price: Optional[float], status) -> StatsDelta:
+    """Příspěvek jedné rezervace do souhrnů."""
+    delta: StatsDelta = {}
+    if status not in SOLD_STATUSES:
+        return delta
+    for i, revenue in enumerate(nightly_revenue(price or 0.0, (check_out - check_in).days)):
+        day = check_in + timedelta(days=i)
+        add_to_delta(delta, day, room_type, "rooms_sold", 1)
+        add_to_delta(delta, day, room_type, "room_revenue", revenue)
+    return delta
+
+
+def diff_stats(old: StatsDelta, new: StatsDelta) -> StatsDelta:
+    """Rozdíl new - old; nulové buňky vynechá, aby se nezapisovaly."""
+    delta: StatsDelta = {}
+    for key in old.keys() | new.keys():
+        for column in STATS_COLUMNS:
+            value = new.get(key, {}).get(column, 0) - old.get(key, {}).get(column, 0)
+            if abs(value) > 1e-9:
+                add_to_delta(delta, key[0], key[1], column, value)
+    return delta
+
+
+def _additive_upsert(dialect_name: str, rows: List[dict]):
+    """INSERT, který při kolizi (den, typ) hodnoty přičte k existujícímu řádku - atomicky v DB."""
+    table = models.DailyStat.__table__
+    if dialect_name == "mysql":
+        stmt = mysql.insert(table).values(rows)
+        return stmt.on_duplicate_key_update(**{column: table.c[column] + stmt.inserted[column] for column in STATS_COLUMNS})
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(table).values(rows)
+    return stmt.on_conflict_do_update(index_elements=["day", "room_type"], set_={column: table.c[column] + stmt.excluded[column] for column in STATS_COLUMNS})
+
+
+async def apply_stats_delta(db: AsyncSession, delta: StatsDelta):
+    """Přičte rozdíl k souhrnům. Necommituje - volá se v transakci zápisu, který rozdíl způsobil."""
+    rows = [
+        {"day": day, "room_type": room_type, **{column: values.get(column, 0) for column in STATS_COLUMNS}}
+        for (day, room_type), values in sorted(delta.items()) if values
+    ]
+    # Seřazené klíče = stejné pořadí zámků řádků ve všech transakcích (bez deadlocků)
+    for i in range(0, len(rows), STATS_UPSERT_CHUNK_SIZE):
+        await db.execute(_additive_upsert(db.bind.dialect.name, rows[i:i + STATS_UPSERT_CHUNK_SIZE]))
+
+
+async def rebuild_daily_stats(db: AsyncSession, start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+    """
+    Přepočítá souhrny pro dny [start_date, end_date] (bez mezí = vše) ze zdrojových tabulek
+    a vrátí počet zapsaných řádků. Běží v jedné transakci.
+
+    Řádky období se nejdřív smažou a teprve potom se čtou zdrojové tabulky. DELETE
+    drží zámky řádků (v InnoDB i mezer mezi nimi, v SQLite zámek zápisu celé DB)
+    do commitu, takže `apply_stats_delta` souběžného zápisu do období počká na konec
+    přepočtu a svůj rozdíl přičte k přepočítaným řádkům - rezervace se nezapočítá
+    dvakrát ani neztratí. Zápisy do období proto po dobu přepočtu čekají.
+    """
+    # Ukončí případnou rozpracovanou transakci session, aby se zdroje četly až po získání zámků
+    await db.commit()
+    clear_q = delete(models.DailyStat)
+    if start_date is not None:
+        clear_q = clear_q.filter(models.DailyStat.day >= start_date)
+    if end_date is not None:
+        clear_q = clear_q.filter(models.DailyStat.day <= end_date)
+    await db.execute(clear_q)
+    delta = await _collect_stats(db, start_date, end_date)
+    rows = [
+        {"day": day, "room_type": room_type, **{column: values.get(column, 0) for column in STATS_COLUMNS}}
+        for (day, room_type), values in sorted(delta.items())
+    ]
+    for i in range(0, len(rows), STATS_UPSERT_CHUNK_SIZE):
+        await db.execute(insert(models.DailyStat), rows[i:i + STATS_UPSERT_CHUNK_SIZE])
+    await db.commit()
+    return len(rows)
+
+
+async def _collect_stats(db: AsyncSession, start_date: Optional[date], end_date: Optional[date]) -> StatsDelta:
+    """Souhrny dnů [start_date, end_date] spočítané ze zdrojových tabulek."""
+    delta: StatsDelta = {}
+
+    def in_range(day: date) -> bool:
+        return (start_date is None or day >= start_date) and (end_date is None or day <= end_date)
+
+    res_q = (
+        select(models.Room.type, models.Reservation.check_in_date, models.Reservation.check_out_date, models.Reservation.accommodation_price, models.Reservation.status)
+        .join(models.Room, models.Reservation.room_id == models.Room.id)
+        .filter(models.Reservation.status.in_(SOLD_STATUSES))
+    )
+    if start_date is not None:
+        res_q = res_q.filter(models.Reservation.check_out_date > start_date)
+    if end_date is not None:
+        res_q = res_q.filter(models.Reservation.check_in_date <= end_date)
+    async for room_type, check_in, check_out, price, status in await db.stream(res_q.execution_options(yield_per=2000)):
+        for (day, _), values in reservation_stats(room_type, check_in, check_out, price, status).items():
+            if in_range(day):
+                for column, value in values.items():
+                    add_to_delta(delta, day, room_type, column, value)
+
+    for model, amount, stamp, column in (
+        (models.RoomCharge, models.RoomCharge.total_price, models.RoomCharge.charged_at, "other_revenue"),
+        (models.Payment, models.Payment.amount, models.Payment.paid_at, "payments"),
+    ):
+        query = (
+            select(models.Room.type, stamp, amount)
+            .join(models.Reservation, model.reservation_id == models.Reservation.id)
+            .join(models.Room, models.Reservation.room_id == models.Room.id)
+        )
+        if start_date is not None:
+            query = query.filter(stamp >= datetime.combine(start_date, datetime.min.time()))
+        if end_date is not None:
+            query = query.filter(stamp < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+        async for room_type, at, value in await db.stream(query.execution_options(yield_per=2000)):
+            if at is not None:
+                add_to_delta(delta, at.date(), room_type, column, value or 0.0)
+    return delta
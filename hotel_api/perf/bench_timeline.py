@@ -0,0 +1,147 @@
+# FILE: hotel_api/perf/bench_timeline.py
+"""
+Benchmark časové osy dashboardu: původní implementace (ORM objekty pro všechny pokoje
+a události) proti stránkovanému načítání jen potřebných sloupců.
+
+Na syntetických datech (výchozí 400 pokojů, okno 60 dní) změří čas a špičku
+alokované paměti včetně validace a serializace odpovědi, tak jak ji dělá
+FastAPI přes `response_model`.
+
+Spuštění (z adresáře hotel_api, vyžaduje aiosqlite nebo jinou async DB):
+    python -m perf.bench_timeline --rooms 400 --days 60
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///./perf_timeline.db"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark /dashboard/timeline (před a po).")
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--rooms", type=int, default=400)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Nemazat a znovu neplnit existující databázi.")
+    return parser.parse_args()
+
+
+args = parse_args()
+# Aplikace vytváří engine při importu - musí dostat URL benchmarku
+os.environ["DATABASE_URL"] = args.database_url
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+from app import crud, models, schemas  # noqa: E402
+from app.database import Base  # noqa: E402
+
+
+async def legacy_get_timeline_data(db: AsyncSession, start_date: date, end_date: date) -> List[schemas.RoomTimeline]:
+    """Původní implementace `crud.get_timeline_data` (před stránkováním) pro srovnání."""
+    rooms = (await db.execute(select(models.Room).order_by(models.Room.number))).scalars().all()
+    reservations = (await db.execute(select(models.Reservation).options(joinedload(models.Reservation.guest)).filter(models.Reservation.check_in_date <= end_date, models.Reservation.check_out_date >= start_date))).scalars().all()
+    tasks = (await db.execute(select(models.Task).options(joinedload(models.Task.assignee)).filter(models.Task.due_date >= start_date, models.Task.due_date <= end_date))).scalars().all()
+    blocks = (await db.execute(select(models.RoomBlock).filter(models.RoomBlock.start_date <= end_date, models.RoomBlock.end_date >= start_date))).scalars().all()
+    room_map = {room.id: schemas.RoomTimeline(room_id=room.id, room_number=room.number, events=[]) for room in rooms}
+    for res in reservations:
+        if res.room_id in room_map:
+            room_map[res.room_id].events.append(schemas.ReservationEvent(title=f"Rezervace: {res.guest.name}", start_date=datetime.combine(res.check_in_date, datetime.min.time()), end_date=datetime.combine(res.check_out_date, datetime.min.time()), reservation_id=res.id, guest_name=res.guest.name, status=res.status))
+    for task in tasks:
+        if task.room_id and task.room_id in room_map:
+            room_map[task.room_id].events.append(schemas.TaskEvent(title=f"Úkol: {task.title}", start_date=datetime.combine(task.due_date, datetime.min.time()), end_date=datetime.combine(task.due_date, datetime.max.time()), task_id=task.id, assignee_email=task.assignee.email if task.assignee else "Nepřiřazeno", status=task.status))
+    for block in blocks:
+        if block.room_id in room_map:
+            room_map[block.room_id].events.append(schemas.BlockEvent(title=f"Blokace: {block.reason}", start_date=datetime.combine(block.start_date, datetime.min.time()), end_date=datetime.combine(block.end_date, datetime.min.time()), block_id=block.id, reason=block.reason))
+    return list(room_map.values())
+
+
+async def seed(session_factory, rooms: int, start: date, days: int, rng: random.Random):
+    """Pokoje po 20 na patro, souvislé pobyty (~75 % obsazenost), úklid každý třetí den a občasné blokace."""
+    async with session_factory() as db:
+        await db.execute(insert(models.User), [{"id": i, "email": f"uklid{i}@bench.cz", "hashed_password": "x", "role": models.UserRole.uklizecka, "is_active": True} for i in range(1, 11)])
+        await db.execute(insert(models.Location), [{"id": i, "name": f"Minibar Pokoje {i}"} for i in range(1, rooms + 1)])
+        await db.execute(insert(models.Room), [
+            {"id": i, "number": f"{(i - 1) // 20 + 1}{(i - 1) % 20 + 1:02d}", "type": rng.choice(["Standard", "Superior", "Apartmá"]), "capacity": rng.choice([2, 2, 3, 4]), "floor": (i - 1) // 20 + 1, "status": models.RoomStatus.available_clean, "location_id": i}
+            for i in range(1, rooms + 1)
+        ])
+        guests, reservations, tasks, blocks = [], [], [], []
+        for room_id in range(1, rooms + 1):
+            day = start - timedelta(days=rng.randint(0, 4))
+            while day < start + timedelta(days=days):
+                nights = rng.randint(1, 6)
+                if rng.random() < 0.75:
+                    guest_id = len(guests) + 1
+                    guests.append({"id": guest_id, "name": f"Host {guest_id}", "email": f"host{guest_id}@bench.cz"})
+                    reservations.append({"room_id": room_id, "guest_id": guest_id, "check_in_date": day, "check_out_date": day + timedelta(days=nights), "status": models.ReservationStatus.potvrzeno, "accommodation_price": 1000.0 * nights})
+                elif rng.random() < 0.1:
+                    blocks.append({"room_id": room_id, "reason": "Údržba", "start_date": day, "end_date": day + timedelta(days=nights)})
+                day += timedelta(days=nights)
+            for offset in range(0, days, 3):
+                tasks.append({"room_id": room_id, "title": f"Úklid pokoje {room_id}", "due_date": start + timedelta(days=offset), "status": models.TaskStatus.cekajici, "assignee_id": rng.choice([None, *range(1, 11)])})
+        for table, rows in ((models.Guest, guests), (models.Reservation, reservations), (models.Task, tasks), (models.RoomBlock, blocks)):
+            for i in range(0, len(rows), 5000):
+                await db.execute(insert(table), rows[i:i + 5000])
+        await db.commit()
+    return {"rooms": rooms, "reservations": len(reservations), "tasks": len(tasks), "blocks": len(blocks)}
+
+
+async def measure(label: str, session_factory, repeat: int, call):
+    adapter = TypeAdapter(List[schemas.RoomTimeline])
+
+    async def run_once() -> int:
+        async with session_factory() as db:
+            result = await call(db)
+            # Stejně jako response_model ve FastAPI: validace + serializace do JSON
+            return len(adapter.dump_json(adapter.validate_python(result, from_attributes=True)))
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = await run_once()
+        timings.append(time.perf_counter() - started)
+    # Paměť měříme zvlášť - tracemalloc výrazně zpomaluje
+    tracemalloc.start()
+    await run_once()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    best = min(timings)
+    print(f"{label:<42} {best * 1000:9.1f} ms  {peak / 2 ** 20:8.1f} MiB  {size / 1024:9.1f} KiB")
+    return best
+
+
+async def main():
+    engine = create_async_engine(args.database_url)
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    start = date.today()
+    end = start + timedelta(days=args.days)
+    if not args.keep:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        counts = await seed(session_factory, args.rooms, start, args.days, random.Random(args.seed))
+        print(f"Data: {counts}")
+    print(f"{'varianta':<42} {'čas':>12}  {'paměť':>12}  {'odpověď':>12}")
+    before = await measure("původní (všechny pokoje, ORM)", session_factory, args.repeat, lambda db: legacy_get_timeline_data(db, start, end))
+    after = await measure(f"nová (všechny pokoje, limit {crud.TIMELINE_MAX_ROOMS})", session_factory, args.repeat, lambda db: crud.get_timeline_data(db, start, end, limit=crud.TIMELINE_MAX_ROOMS))
+    await measure(f"nová (stránka {args.page_size} pokojů)", session_factory, args.repeat, lambda db: crud.get_timeline_data(db, start, end, limit=args.page_size))
+    await measure("nová (jedno patro)", session_factory, args.repeat, lambda db: crud.get_timeline_data(db, start, end, floor=1))
+    print(f"Zrychlení pro všechny pokoje: {before / after:.1f}x")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+# FILE: hotel_api/perf/conftest.py
+"""
+Společné nastavení výkonnostních testů (spouštět z adresáře hotel_api):
+
+    python -m pytest perf
+
+Aplikace vytváří engine při importu, proto se DATABASE_URL (a ostatní povinné
+proměnné) nastaví dřív, než se `app` poprvé naimportuje. Výchozí databáze je
+dočasný SQLite soubor; jinou lze zadat přes PERF_DATABASE_URL. Na MySQL se schéma
+staví migracemi (`alembic upgrade head`), aby testy plánů dotazů ověřily indexy
+z migrací, ne jen z modelů; SQLite migrace (ALTER sloupců) nepodporuje, tam
+se tabulky vytvoří z modelů.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _ROOT)
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="hotel_perf_"), "perf.db")
+os.environ["DATABASE_URL"] = os.environ.get("PERF_DATABASE_URL", f"sqlite+aiosqlite:///{_DB_PATH}")
+os.environ.setdefault("SECRET_KEY", "perf-tests")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+# Scénáře se přihlašují - plná cena bcryptu by testy jen zdržovala
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# Endpoint /metrics je ve výchozím stavu vypnutý - testy metrik ho potřebují
+os.environ.setdefault("METRICS_ENABLED", "true")
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy import create_engine, insert, text  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+
+from app.database import Base  # noqa: E402
+from perf.seed import SeedConfig, analyze_statement, generate  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def seed_config():
+    """200 pokojů, rok zpět i dopředu; testy se odkazují na dnešek a nízká id (pokoj 17, uživatel 3...)."""
+    return SeedConfig(rooms=200, history_days=365, future_days=365, seed=20261017)
+
+
+def _upgrade_to_head():
+    """`alembic upgrade head` nad DATABASE_URL (env.py si URL bere z nastavení aplikace)."""
+    # Bez alembic.ini: jeho konfigurace logování by přepsala loggery aplikace
+    config = Config()
+    config.set_main_option("script_location", os.path.join(_ROOT, "alembic"))
+    command.upgrade(config, "head")
+
+
+@pytest.fixture(scope="session")
+def seeded_database(seed_config):
+    """Naplní databázi generátorem z perf.seed (synchronně - fixture běží i mimo event loop)."""
+    url = make_url(os.environ["DATABASE_URL"])
+    backend = url.get_backend_name()
+    sync_url = url.set(drivername={"sqlite": "sqlite", "mysql": "mysql+pymysql"}.get(backend, url.drivername))
+    engine = create_engine(sync_url)
+    with engine.begin() as connection:
+        Base.metadata.drop_all(connection)
+        if backend == "mysql":
+            connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+        else:
+            Base.metadata.create_all(connection)
+    if backend == "mysql":
+        _upgrade_to_head()
+    with engine.begin() as connection:
+        for model, rows in generate(seed_config):
+            connection.execute(insert(model), rows)
+        statement = analyze_statement(backend)
+        if statement:
+            connection.execute(text(statement))
+    engine.dispose()
+    return os.environ["DATABASE_URL"]
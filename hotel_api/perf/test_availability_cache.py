@@ -0,0 +1,81 @@
+# FILE: hotel_api/perf/test_availability_cache.py
+"""Cache dostupnosti: zápisy zneplatní jen hledání, jejichž pobyt se s nimi překrývá; meze TTL a LRU."""
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app import cache, crud, schemas
+from app.availability import availability_index
+from app.crud import availability_cache
+from app.database import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_writes_evict_only_overlapping_searches(seeded_database, seed_config, monkeypatch):
+    # Dočítání změn z jiných workerů by cache zahodilo celou - tady měříme jen zápisy tohoto procesu
+    monkeypatch.setattr(availability_index, "sync_seconds", 0)
+    touched = (seed_config.today + timedelta(days=345), seed_config.today + timedelta(days=347))
+    untouched = (seed_config.today + timedelta(days=360), seed_config.today + timedelta(days=362))
+
+    async def cached_searches(db):
+        offers = await crud.find_available_room_types(db, *touched, 2)
+        await crud.find_available_room_types(db, *untouched, 2)
+        assert availability_cache.get((*touched, 2)) is not None
+        assert availability_cache.get((*untouched, 2)) is not None
+        return offers
+
+    async with AsyncSessionLocal() as db:
+        offer = (await cached_searches(db))[0]
+        await crud.create_reservation(db, schemas.PublicReservationRequest(
+            room_type=offer.room_type, rate_plan_id=offer.rate_plan_id, guest_name="Cache Test", guest_email="cache.test@hotel.com",
+            check_in_date=touched[0], check_out_date=touched[1],
+        ))
+        writes = [
+            lambda: crud.create_room_block(db, schemas.RoomBlockCreate(reason="Test cache", room_id=free_room_id, start_date=touched[0], end_date=touched[1])),
+            lambda: crud.create_rates_batch(db, [schemas.RateCreate(date=touched[0], price=2500, room_type=offer.room_type, rate_plan_id=offer.rate_plan_id)]),
+            lambda: crud.create_restrictions_batch(db, [schemas.RestrictionCreate(date=touched[0], min_stay=1, room_type=offer.room_type, rate_plan_id=offer.rate_plan_id)]),
+        ]
+        assert availability_cache.get((*touched, 2)) is None
+        assert availability_cache.get((*untouched, 2)) is not None
+
+        for write in writes:
+            await cached_searches(db)
+            free_room_id = (await crud.get_free_rooms(db, *touched))[0][0]
+            await write()
+            assert availability_cache.get((*touched, 2)) is None
+            assert availability_cache.get((*untouched, 2)) is not None
+
+
+async def test_availability_cache_enforces_entry_limit_and_ttl(seeded_database, seed_config, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(availability_cache, "max_entries", 2)
+    availability_cache.clear()
+    first, second, third = [(seed_config.today + timedelta(days=d), seed_config.today + timedelta(days=d + 2)) for d in (30, 40, 50)]
+
+    async with AsyncSessionLocal() as db:
+        await crud.find_available_room_types(db, *first, 2)
+        await crud.find_available_room_types(db, *second, 2)
+        # Použité hledání se posune na konec LRU - vytlačí se to druhé
+        await crud.find_available_room_types(db, *first, 2)
+        evictions = availability_cache.evictions
+        await crud.find_available_room_types(db, *third, 2)
+        assert len(availability_cache) == 2
+        assert availability_cache.evictions == evictions + 1
+        assert availability_cache.get((*second, 2)) is None
+        assert availability_cache.get((*first, 2)) is not None
+
+        # Po uplynutí TTL se hledání počítá znovu
+        now[0] += availability_cache.ttl_seconds
+        expirations = availability_cache.expirations
+        await crud.find_available_room_types(db, *third, 2)
+        assert availability_cache.expirations == expirations + 1
+        assert availability_cache.get((*third, 2)) is not None
+
+        # Výsledek dražší než celý rozpočet nabídek se neuloží
+        monkeypatch.setattr(availability_cache, "max_cost", 1)
+        offers = await crud.find_available_room_types(db, *second, 2)
+        assert offers
+        assert availability_cache.get((*second, 2)) is None
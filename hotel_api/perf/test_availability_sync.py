@@ -0,0 +1,46 @@
+# FILE: hotel_api/perf/test_availability_sync.py
+"""Dočítání změn obsazenosti z jiných workerů do indexu obsazenosti."""
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app import crud, models, schemas
+from app.availability import AvailabilityIndex
+from app.database import AsyncSessionLocal
+from app.query_stats import track_queries
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_index_picks_up_nights_freed_by_another_worker(seeded_database, seed_config):
+    # Index "jiného workeru" - zápisy přes crud aktualizují jen index tohoto procesu
+    other_worker = AvailabilityIndex(horizon_days=400, sync_seconds=5)
+    changes = []
+    other_worker.on_external_change = lambda: changes.append(True)
+    async with AsyncSessionLocal() as db:
+        await other_worker.ensure_ready(db)
+        reservation = (await db.execute(
+            select(models.Reservation).where(
+                models.Reservation.status == models.ReservationStatus.potvrzeno,
+                models.Reservation.check_in_date >= seed_config.today + timedelta(days=300),
+            ).order_by(models.Reservation.check_in_date).limit(1)
+        )).scalar_one()
+    stay = (reservation.check_in_date, reservation.check_out_date)
+    assert reservation.room_id not in {room_id for room_id, _, _ in other_worker.free_rooms(*stay)}
+
+    async with AsyncSessionLocal() as db:
+        await crud.update_reservation(db, reservation.id, schemas.ReservationUpdate(status=models.ReservationStatus.zruseno))
+
+    # Do uplynutí intervalu index změnu nevidí; pak ji dočte na pozadí, požadavek nečeká
+    other_worker._synced_at -= other_worker.sync_seconds
+    async with AsyncSessionLocal() as db:
+        with track_queries() as stats:
+            await other_worker.ensure_ready(db)
+    assert stats.count == 0
+    await other_worker.schedule_sync()
+
+    assert reservation.room_id in {room_id for room_id, _, _ in other_worker.free_rooms(*stay)}
+    assert changes
+    async with AsyncSessionLocal() as db:
+        assert (await other_worker.verify(db))["mismatches"] == []
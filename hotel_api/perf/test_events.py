@@ -0,0 +1,58 @@
+# FILE: hotel_api/perf/test_events.py
+"""Ověření SSE streamu: přístupový token jen v hlavičce, v URL jen krátkodobý token pro stream; odhlášení odběratele."""
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.database import AsyncSessionLocal
+from app.dependencies import _user_from_token, get_stream_user
+from app.events import event_bus
+from app.main import app
+from app.routers.events import stream_events
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_stream_token_is_only_accepted_for_the_stream(seeded_database):
+    email = f"stream.{time.time_ns()}@hotel.com"
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await client.post("/users/", json={"email": email, "password": "heslo_12345", "role": "recepcni"})
+            access_token = (await client.post("/auth/token", data={"username": email, "password": "heslo_12345"})).json()["access_token"]
+            assert (await client.post("/events/token")).status_code == 401
+            issued = (await client.post("/events/token", headers={"Authorization": f"Bearer {access_token}"})).json()
+            stream_token = issued["stream_token"]
+            # Token pro stream neotevře jiné endpointy
+            assert (await client.get("/users/me", headers={"Authorization": f"Bearer {stream_token}"})).status_code == 401
+    assert issued["expires_in"] == 60
+
+    assert (await get_stream_user(header_token=access_token, token=None)).email == email
+    assert (await get_stream_user(header_token=None, token=stream_token)).email == email
+    # Přístupový token v URL se nepřijme
+    with pytest.raises(HTTPException) as rejected:
+        await get_stream_user(header_token=None, token=access_token)
+    assert rejected.value.status_code == 401
+    async with AsyncSessionLocal() as db:
+        with pytest.raises(HTTPException):
+            await _user_from_token(stream_token, db)
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+async def test_stream_subscriber_is_released_even_if_body_is_never_read():
+    subscribers = event_bus.stats()["subscribers"]
+    # Odpověď zahozená před odesláním (chyba, odpojení klienta) odběratele nezaregistruje
+    await stream_events(_ConnectedRequest(), types="check_in", current_user=None)
+    assert event_bus.stats()["subscribers"] == subscribers
+
+    response = await stream_events(_ConnectedRequest(), types="check_in", current_user=None)
+    stream = response.body_iterator
+    assert await stream.__anext__() == "retry: 3000\n\n"
+    assert event_bus.stats()["subscribers"] == subscribers + 1
+    await stream.aclose()
+    assert event_bus.stats()["subscribers"] == subscribers
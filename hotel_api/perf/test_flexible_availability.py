@@ -0,0 +1,38 @@
+# FILE: hotel_api/perf/test_flexible_availability.py
+"""Hledání s flexibilním termínem: meze okna a délky pobytu, ceny shodné s hledáním pro konkrétní termín."""
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app import crud, schemas
+from app.database import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_flexible_stays_stay_within_bounds_and_match_single_searches(seeded_database, seed_config):
+    arrival_from = seed_config.today + timedelta(days=100)
+    arrival_to = arrival_from + timedelta(days=6)
+    request = schemas.FlexibleAvailabilityRequest(arrival_from=arrival_from, arrival_to=arrival_to, min_nights=2, max_nights=4, guests=2)
+    async with AsyncSessionLocal() as db:
+        results = await crud.find_flexible_availability(db, request)
+        assert results
+        single_searches = {}
+        for offer in results:
+            assert offer.cheapest_price == min(stay.total_price for stay in offer.stays)
+            for stay in offer.stays:
+                assert arrival_from <= stay.check_in_date <= arrival_to
+                assert 2 <= stay.nights <= 4
+                assert (stay.check_out_date - stay.check_in_date).days == stay.nights
+                key = (stay.check_in_date, stay.check_out_date)
+                if key not in single_searches:
+                    offers = await crud.find_available_room_types(db, *key, 2)
+                    single_searches[key] = {(o.room_type, o.rate_plan_id): o.total_price for o in offers}
+                # Každý nalezený pobyt jde zarezervovat za stejnou cenu jako při hledání konkrétního termínu
+                assert single_searches[key][(offer.room_type, offer.rate_plan_id)] == pytest.approx(stay.total_price)
+
+        with pytest.raises(HTTPException) as inverted:
+            await crud.find_flexible_availability(db, request.model_copy(update={"min_nights": 5}))
+        assert inverted.value.status_code == 400
+    assert {stay.nights for offer in results for stay in offer.stays} == {2, 3, 4}
@@ -0,0 +1,24 @@
+# FILE: hotel_api/perf/test_harness.py
+"""Scénář harnessu musí projít proti aplikaci in-process a změřit každý endpoint."""
+import pytest
+
+from perf.harness import percentile, run_benchmark, summarize
+
+pytestmark = pytest.mark.anyio
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile(values, 100) == 100.0
+    assert percentile([7.0], 90) == 7.0
+
+
+async def test_scenario_runs_in_process(seeded_database):
+    report = summarize(await run_benchmark(iterations=1))
+    assert report["POST /booking/reservations"]["requests"] == 1
+    assert report["GET /dashboard/timeline"]["requests"] == 2
+    assert report["POST /reservations/{id}/checkout"]["queries_avg"] > 0
+    for row in report.values():
+        assert row["p50_ms"] <= row["p90_ms"] <= row["p99_ms"] <= row["max_ms"]
@@ -0,0 +1,76 @@
+# FILE: hotel_api/perf/test_metrics.py
+"""Middleware metrik a výstup `/metrics` v textovém formátu Prometheu."""
+import re
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.main import app
+from app.metrics import Histogram, request_metrics
+
+pytestmark = pytest.mark.anyio
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*\})? (\S+)$')
+
+
+def _parse(text: str) -> dict:
+    """{(název, štítky): hodnota}; zároveň ověří gramatiku řádků a souvislost rodin metrik."""
+    samples, families, current = {}, [], None
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            name = line.split()[2]
+            assert name not in families, f"rodina {name} není souvislá"
+            families.append(name)
+            current = name
+            continue
+        if line.startswith("#"):
+            continue
+        match = _SAMPLE.match(line)
+        assert match, f"neplatný řádek: {line!r}"
+        name = match.group(1)
+        assert name == current or re.sub(r"_(bucket|sum|count)$", "", name) == current, f"vzorek {name} mimo svou rodinu"
+        samples[(name, match.group(2) or "")] = float(match.group(3))
+    return samples
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    histogram = Histogram((0.1, 0.5, 1.0))
+    for value in (0.05, 0.1, 0.3, 2.0):
+        histogram.observe(value)
+    # Hranice koše patří do koše (le = "menší nebo rovno")
+    assert histogram.cumulative() == [("0.1", 2), ("0.5", 3), ("1.0", 3), ("+Inf", 4)]
+    assert histogram.sum == pytest.approx(2.45)
+
+
+async def test_metrics_endpoint_reports_templated_routes():
+    request_metrics.reset()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/")
+        await client.get("/reservations/12345/bill")  # bez tokenu: 401, ale routa se najde
+        await client.get("/neexistuje/6789")
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = _parse(response.text)
+    name = "hotel_http_request_duration_seconds_count"
+    assert samples[(name, '{method="GET",route="/",status="200"}')] == 1
+    assert samples[(name, '{method="GET",route="/reservations/{reservation_id}/bill",status="401"}')] == 1
+    assert samples[(name, '{method="GET",route="<unmatched>",status="404"}')] == 1
+    # Skutečné id z URL se do štítků nedostane a samotné stahování metrik se neměří
+    assert "12345" not in response.text and "6789" not in response.text
+    assert not any('route="/metrics"' in labels for _, labels in samples)
+    assert samples[("hotel_http_requests_in_flight", '{method="GET"}')] == 0
+    assert ("hotel_db_pool_checkouts_total", '{pool="primary"}') in samples
+    assert ("hotel_cache_hits_total", '{cache="availability"}') in samples
+
+
+async def test_metrics_token_is_required_when_configured(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "tajne-metriky")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        missing = await client.get("/metrics")
+        wrong = await client.get("/metrics", headers={"Authorization": "Bearer jiny"})
+        allowed = await client.get("/metrics", headers={"Authorization": "Bearer tajne-metriky"})
+    assert (missing.status_code, wrong.status_code, allowed.status_code) == (401, 401, 200)
+    assert "hotel_http_requests_in_flight" in allowed.text
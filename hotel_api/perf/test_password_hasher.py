@@ -0,0 +1,47 @@
+# FILE: hotel_api/perf/test_password_hasher.py
+"""Hashování hesel v poolu vláken: registrace a přihlášení mimo event loop, odmítnutí nad limitem fronty."""
+import threading
+import time
+
+import httpx
+import pytest
+
+from app import security
+from app.main import app
+from app.security import password_hasher
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_create_user_and_login_hash_in_executor(seeded_database, monkeypatch):
+    threads = []
+    for name in ("hash", "verify_and_update"):
+        original = getattr(security.pwd_context, name)
+
+        def recording(*args, _original=original, **kwargs):
+            threads.append(threading.current_thread().name)
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(security.pwd_context, name, recording)
+    email = f"hasher.{time.time_ns()}@hotel.com"
+    calls = password_hasher.calls
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.post("/users/", json={"email": email, "password": "heslo_12345", "role": "majitel"})).status_code == 201
+            login = await client.post("/auth/token", data={"username": email, "password": "heslo_12345"})
+            stats = await client.get("/dashboard/system/password-hasher", headers={"Authorization": f"Bearer {login.json()['access_token']}"})
+    assert login.status_code == 200
+    assert len(threads) == 2 and all(name.startswith("password-hash") for name in threads)
+    assert password_hasher.calls == calls + 2
+    assert stats.json()["calls"] == calls + 2
+    assert stats.json()["workers"] == password_hasher.workers
+
+
+async def test_login_is_rejected_with_503_when_queue_is_full(seeded_database, monkeypatch):
+    monkeypatch.setattr(password_hasher, "max_waiting", 0)
+    rejected = password_hasher.rejected
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            login = await client.post("/auth/token", data={"username": "majitel@seed.cz", "password": "heslo123"})
+    assert login.status_code == 503
+    assert password_hasher.rejected == rejected + 1
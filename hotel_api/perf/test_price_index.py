@@ -0,0 +1,85 @@
+# FILE: hotel_api/perf/test_price_index.py
+"""Cenový index: obnova na pozadí (výměna sestavené struktury, dohrání souběžných zápisů) a nové plány v nabídce."""
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import delete, insert
+
+from app import crud, models, schemas
+from app.database import AsyncSessionLocal
+from app.pricing_index import PriceIndex, price_index
+from app.query_stats import track_queries
+
+pytestmark = pytest.mark.anyio
+
+
+async def _built_index() -> PriceIndex:
+    index = PriceIndex(horizon_days=60, refresh_seconds=300)
+    async with AsyncSessionLocal() as db:
+        await index.ensure_ready(db)
+    return index
+
+
+async def test_stale_index_is_refreshed_in_background(seeded_database):
+    index = await _built_index()
+    old_series = index.series
+    index._built_at -= index.refresh_seconds + 1
+
+    async with AsyncSessionLocal() as db:
+        with track_queries() as stats:
+            await index.ensure_ready(db)
+    # Požadavek na načtení nečeká a do výměny čte původní index
+    assert stats.count == 0
+    assert index.series is old_series
+
+    await index.schedule_refresh()
+    assert index.series is not old_series
+    assert index.series.keys() == old_series.keys()
+    assert index._is_fresh()
+
+
+async def test_writes_during_refresh_are_replayed_on_new_index(seeded_database):
+    index = await _built_index()
+    room_type, plan_id = next(iter(index.series))
+    day = date.today() + timedelta(days=3)
+    load_snapshot = index._load
+
+    async def load_with_concurrent_write(db):
+        built = await load_snapshot(db)
+        # Zápis ceny z jiného požadavku, který snapshot z DB už nezachytil
+        index.apply_rates([(room_type, plan_id, day, 12345.0)])
+        return built
+
+    index._load = load_with_concurrent_write
+    async with AsyncSessionLocal() as db:
+        await index.rebuild(db)
+    assert index.quote(room_type, plan_id, day, day + timedelta(days=1)) == (12345.0, [])
+
+
+async def test_new_derived_plan_is_offered_despite_cached_availability(seeded_database, seed_config):
+    start = seed_config.today + timedelta(days=320)
+    end = start + timedelta(days=2)
+    async with AsyncSessionLocal() as db:
+        offers = await crud.find_available_room_types(db, start, end, 2)
+        plan = await crud.create_rate_plan(db, schemas.RatePlanCreate(
+            name="Se snídaní (test cache)", parent_plan_id=offers[0].rate_plan_id,
+            modifier_type=models.RateModifierType.amount, modifier_value=250,
+        ))
+        offers = await crud.find_available_room_types(db, start, end, 2)
+    assert plan.id in {offer.rate_plan_id for offer in offers}
+
+
+async def test_booking_price_reflects_rates_written_by_another_worker(seeded_database, seed_config):
+    start = seed_config.today + timedelta(days=330)
+    end = start + timedelta(days=2)
+    async with AsyncSessionLocal() as db:
+        await price_index.ensure_ready(db)
+        room_type, plan_id = next(iter(price_index.series))
+        indexed_total, _ = price_index.quote(room_type, plan_id, start, end)
+        # Zápis jiného workeru - přímo do DB, index tohoto procesu o něm neví
+        await db.execute(delete(models.Rate).where(models.Rate.room_type == room_type, models.Rate.rate_plan_id == plan_id, models.Rate.date >= start, models.Rate.date < end))
+        await db.execute(insert(models.Rate), [{"room_type": room_type, "rate_plan_id": plan_id, "date": start + timedelta(days=i), "price": 4321.0} for i in range(2)])
+        await db.commit()
+        price = await crud.calculate_accommodation_price(db, start, end, room_type, plan_id)
+    assert indexed_total != 8642.0
+    assert price == 8642.0
@@ -0,0 +1,111 @@
+# FILE: hotel_api/perf/test_query_counts.py
+"""
+Rozpočty SQL dotazů na endpoint. Scénář harnessu se projde jednou a každý endpoint
+nesmí překročit svůj rozpočet - N+1 regrese (dotaz v cyklu, líné načítání po commitu,
+zbytečný refresh) tak shodí test dřív, než se projeví na produkčních datech.
+"""
+import time
+from datetime import timedelta
+
+import httpx
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app import crud, models
+from app.database import AsyncSessionLocal
+from app.main import app
+from app.query_stats import QUERY_COUNT_HEADER, QUERY_TIME_HEADER, QueryBudgetExceeded, QueryStatsMiddleware, assert_max_queries, max_queries, track_queries
+from perf.harness import run_benchmark, summarize
+
+pytestmark = pytest.mark.anyio
+
+# Nejvyšší povolený počet SQL příkazů na jedno volání (stav po odstranění zbytečných dotazů)
+QUERY_BUDGETS = {
+    "POST /users/": 4,
+    "POST /users/admin_create_user/": 3,
+    "POST /auth/token": 3,
+    "POST /rooms/": 4,
+    "POST /pricing/rate-plans/": 2,
+    "POST /pricing/rates/batch": 3,
+    "POST /booking/availability": 0,
+    "POST /booking/reservations": 17,
+    "POST /reservations/{id}/checkin": 3,
+    "POST /reservations/{id}/charges": 3,
+    "POST /reservations/{id}/payments": 3,
+    "GET /reservations/{id}/bill": 3,
+    "POST /reservations/{id}/checkout": 6,
+    "GET /rooms/": 1,
+    "POST /tasks/": 2,
+    "PATCH /tasks/{id}/status": 3,
+    "PATCH /rooms/{id}/status": 3,
+    "POST /rooms/blocks/": 3,
+    "GET /dashboard/timeline": 5,
+    "DELETE /rooms/blocks/{id}": 7,
+}
+
+
+async def test_scenario_stays_within_query_budgets(seeded_database):
+    report = summarize(await run_benchmark(iterations=1))
+    assert set(report) == set(QUERY_BUDGETS), "scénář harnessu se změnil - doplňte rozpočty"
+    over = {label: row["queries_max"] for label, row in report.items() if row["queries_max"] > QUERY_BUDGETS[label]}
+    assert not over, "Překročen rozpočet SQL dotazů: " + ", ".join(f"{label} {count} > {QUERY_BUDGETS[label]}" for label, count in over.items())
+
+
+async def test_front_desk_round_trips(seeded_database, seed_config):
+    # Check-out uvolní noci - rezervace daleko za oknem, ve kterém rezervuje test booking stormu
+    async with AsyncSessionLocal() as db:
+        reservation_id = (await db.execute(
+            select(models.Reservation.id).where(
+                models.Reservation.status == models.ReservationStatus.potvrzeno,
+                models.Reservation.check_in_date >= seed_config.today + timedelta(days=90),
+            ).limit(1)
+        )).scalar_one()
+
+    async with AsyncSessionLocal() as db:
+        with assert_max_queries(3, "check-in"):
+            reservation = await crud.perform_check_in(db, reservation_id)
+            # Odpověď se serializuje z objektů v paměti - žádné líné načítání po commitu
+            assert (reservation.status, reservation.room.status) == (models.ReservationStatus.ubytovan, models.RoomStatus.occupied)
+            assert reservation.guest.name
+
+    @max_queries(6)
+    async def check_out():
+        async with AsyncSessionLocal() as db:
+            return await crud.perform_check_out(db, reservation_id)
+
+    assert (await check_out()).room.status == models.RoomStatus.available_dirty
+
+
+async def test_commit_keep_loaded_restores_session_setting(seeded_database):
+    async with AsyncSessionLocal() as db:
+        night = (await db.execute(select(models.RoomNight).limit(1))).scalar_one()
+        # Druhý záznam téže noci - commit selže na unikátním klíči
+        db.add(models.RoomNight(room_id=night.room_id, night=night.night, reservation_id=night.reservation_id, block_id=night.block_id))
+        with pytest.raises(IntegrityError):
+            await crud._commit_keep_loaded(db)
+        assert db.sync_session.expire_on_commit is True
+
+    async with AsyncSessionLocal(expire_on_commit=False) as db:
+        await crud._commit_keep_loaded(db)
+        assert db.sync_session.expire_on_commit is False
+
+
+async def test_budget_failure_lists_statements(seeded_database):
+    with pytest.raises(QueryBudgetExceeded, match="bill: 3 SQL dotazů, povoleno nejvýše 1") as failure:
+        with assert_max_queries(1, "bill"):
+            async with AsyncSessionLocal() as db:
+                await crud.get_bill_for_reservation(db, 42)
+    assert "FROM payments" in str(failure.value)
+
+
+async def test_debug_headers_report_request_queries(seeded_database):
+    debug_app = QueryStatsMiddleware(app, headers=True)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=debug_app), base_url="http://test") as client:
+            with track_queries() as stats:
+                response = await client.post("/users/", json={"email": f"hlavicky.{time.time_ns()}@hotel.com", "password": "heslo_12345", "role": "majitel"})
+    assert response.status_code == 201
+    # Měřič aplikace je vnořený do měřiče ladicí obálky a přičte se do něj
+    assert int(response.headers[QUERY_COUNT_HEADER]) == stats.count > 0
+    assert float(response.headers[QUERY_TIME_HEADER]) >= 0
@@ -0,0 +1,112 @@
+# FILE: hotel_api/perf/test_query_plans.py
+"""
+Regresní testy plánů dotazů horkých cest.
+
+Každý test zavolá funkci z crud / indexů nad naplněnou databází, zachytí
+všechny SELECTy, které při tom proběhly, a pro každý si vyžádá plán
+(`EXPLAIN QUERY PLAN` na SQLite, `EXPLAIN` na MySQL). Test selže, pokud se
+některá z velkých tabulek čte celá (SQLite `SCAN <tabulka>` bez indexu,
+MySQL `type = ALL`) - tedy když někdo odebere index nebo změní dotaz tak,
+že ho přestane používat.
+"""
+import re
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app import availability, crud, pricing_index, restriction_index
+
+pytestmark = pytest.mark.anyio
+
+# Tabulky, které rostou s provozem; malé číselníky (pokoje, plány, lokace) se číst celé smí
+HOT_TABLES = {
+    "reservations", "tasks", "room_blocks", "stock", "rates", "rate_ranges", "restrictions",
+    "room_nights", "daily_stats", "room_charges", "payments",
+}
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: AS (\w+))?(.*)$")
+
+
+def _sqlite_full_scans(rows) -> list:
+    scans = []
+    for row in rows:
+        detail = row[-1]
+        match = _SQLITE_SCAN.match(detail)
+        # "SCAN t USING INDEX ..." prochází index (např. kvůli řazení), ne tabulku
+        if match and match.group(1) in HOT_TABLES and "USING" not in match.group(3):
+            scans.append(detail)
+    return scans
+
+
+def _mysql_full_scans(rows) -> list:
+    return [f"{row['table']} ({row['type']})" for row in rows if row["table"] in HOT_TABLES and row["type"] == "ALL"]
+
+
+@pytest.fixture(scope="module")
+async def plan_checker(seeded_database):
+    engine = create_async_engine(seeded_database)
+    captured = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            captured.append((statement, parameters))
+
+    async def full_scans() -> list:
+        statements = list(captured)
+        captured.clear()
+        assert statements, "volání neprovedlo žádný SELECT"
+        found = []
+        async with engine.connect() as conn:
+            for statement, parameters in statements:
+                if engine.dialect.name == "sqlite":
+                    rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+                    scans = _sqlite_full_scans(rows)
+                else:
+                    rows = (await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)).mappings().all()
+                    scans = _mysql_full_scans(rows)
+                found += [f"{scan}\n    {statement}" for scan in scans]
+        return found
+
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    yield session_factory, captured, full_scans
+    await engine.dispose()
+
+
+def _calls(today):
+    start, end = today - timedelta(days=3), today + timedelta(days=14)
+    return {
+        "reservations": lambda db: crud.get_reservations(db, start, end),
+        "reservations_room": lambda db: crud.get_reservations(db, start, end, room_id=17),
+        "reservations_status": lambda db: crud.get_reservations(db, start, end, status="potvrzeno"),
+        "tasks_for_user": lambda db: crud.get_tasks_for_user(db, 3, today, today + timedelta(days=7)),
+        "active_tasks": lambda db: crud.get_active_tasks(db),
+        "employees_schedule": lambda db: crud.get_employees_schedule(db, today, today + timedelta(days=7)),
+        "timeline": lambda db: crud.get_timeline_data(db, start, end, limit=50),
+        "timeline_floor": lambda db: crud.get_timeline_data(db, start, end, floor=2),
+        "timeline_changes": lambda db: crud.get_timeline_changes(db, datetime.utcnow() - timedelta(hours=1), start, end),
+        "occupancy": lambda db: availability.load_occupancy(db, today, today + timedelta(days=7)),
+        "occupancy_rooms": lambda db: availability.load_occupancy(db, today, today + timedelta(days=7), room_ids=[1, 2, 3]),
+        "stock_entry": lambda db: crud.get_stock_entry(db, 5, 12),
+        "nightly_prices": lambda db: pricing_index.load_nightly_prices(db, today, today + timedelta(days=7), room_types=["Standard"]),
+        "restrictions": lambda db: restriction_index.load_restrictions(db, today, today + timedelta(days=7), room_types=["Standard"]),
+        "daily_stats": lambda db: crud.get_daily_stats(db, today - timedelta(days=30), today),
+        "rate_ranges": lambda db: crud.get_rate_ranges(db, room_type="Standard", rate_plan_id=1),
+        "bill": lambda db: crud.get_bill_for_reservation(db, 42),
+    }
+
+
+CALL_NAMES = list(_calls(date.today()))
+
+
+@pytest.mark.parametrize("name", CALL_NAMES)
+async def test_hot_path_uses_indexes(name, plan_checker, seed_config):
+    session_factory, captured, full_scans = plan_checker
+    call = _calls(seed_config.today)[name]
+    async with session_factory() as db:
+        captured.clear()
+        await call(db)
+    scans = await full_scans()
+    assert not scans, "Úplné čtení velké tabulky:\n" + "\n".join(scans)
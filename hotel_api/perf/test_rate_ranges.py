@@ -0,0 +1,17 @@
+# FILE: hotel_api/perf/test_rate_ranges.py
+"""Validace cenových období (`POST /pricing/rate-ranges/batch`)."""
+from datetime import date
+
+import pytest
+from pydantic import ValidationError
+
+from app import schemas
+
+RANGE = {"room_type": "Standard", "rate_plan_id": 1, "date_from": date(2026, 12, 1), "date_to": date(2026, 12, 31), "price": 1500}
+
+
+def test_empty_weekdays_are_rejected():
+    with pytest.raises(ValidationError):
+        schemas.RateRangeCreate(**RANGE, weekdays=[])
+    assert schemas.RateRangeCreate(**RANGE).weekdays is None
+    assert schemas.RateRangeCreate(**RANGE, weekdays=[4, 5]).weekdays == [4, 5]
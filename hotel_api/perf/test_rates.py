@@ -0,0 +1,33 @@
+# FILE: hotel_api/perf/test_rates.py
+"""Hromadné nahrání denních cen: opakované nahrání sezóny ceny přepíše, nezdvojí."""
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app import crud, models, schemas
+from app.database import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_reuploaded_season_updates_rates_in_place(seeded_database, seed_config):
+    season = [seed_config.today + timedelta(days=370 + i) for i in range(30)]
+    async with AsyncSessionLocal() as db:
+        plan = await crud.create_rate_plan(db, schemas.RatePlanCreate(name="Sezóna (test nahrání cen)"))
+        plan_id = plan.id
+
+        def upload(price):
+            return [schemas.RateCreate(date=day, price=price, room_type="Standard", rate_plan_id=plan_id) for day in season]
+
+        first = await crud.create_rates_batch(db, upload(1800))
+        # Stejný den dvakrát v jedné dávce - platí poslední cena
+        second = await crud.create_rates_batch(db, upload(1900) + [schemas.RateCreate(date=season[0], price=2100, room_type="Standard", rate_plan_id=plan_id)])
+        stored = dict((await db.execute(select(models.Rate.date, models.Rate.price).where(models.Rate.rate_plan_id == plan_id))).all())
+        rows = (await db.execute(select(func.count()).select_from(models.Rate).where(models.Rate.rate_plan_id == plan_id))).scalar_one()
+
+    assert (first.inserted, first.updated) == (30, 0)
+    assert (second.inserted, second.updated) == (0, 30)
+    assert rows == 30
+    assert stored[season[0]] == 2100
+    assert set(stored[day] for day in season[1:]) == {1900}
@@ -0,0 +1,48 @@
+# FILE: hotel_api/perf/test_read_replica.py
+"""Směrování na read repliku: čtecí endpointy berou session z `get_read_db`, booking zůstává na primární DB."""
+import time
+from datetime import timedelta
+
+import httpx
+import pytest
+from fastapi import Request
+
+from app.database import AsyncSessionLocal, get_db, get_read_db
+from app.main import app
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_reads_use_replica_and_booking_stays_on_primary(seeded_database, seed_config, monkeypatch):
+    sessions = {"primary": [], "replica": []}
+
+    def tracking(kind):
+        async def dependency(request: Request):
+            sessions[kind].append(request.url.path)
+            async with AsyncSessionLocal() as session:
+                yield session
+        return dependency
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, tracking("primary"))
+    monkeypatch.setitem(app.dependency_overrides, get_read_db, tracking("replica"))
+    email = f"replica.{time.time_ns()}@hotel.com"
+    window = {"start_date": seed_config.today.isoformat(), "end_date": (seed_config.today + timedelta(days=7)).isoformat()}
+    stay = {"start_date": (seed_config.today + timedelta(days=60)).isoformat(), "end_date": (seed_config.today + timedelta(days=62)).isoformat()}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await client.post("/users/", json={"email": email, "password": "heslo_12345", "role": "majitel"})
+            token = (await client.post("/auth/token", data={"username": email, "password": "heslo_12345"})).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            assert (await client.get("/dashboard/timeline", params=window, headers=headers)).status_code == 200
+            assert (await client.get("/reservations/", params=window, headers=headers)).status_code == 200
+            offer = (await client.post("/booking/availability", json={**stay, "guests": 2})).json()[0]
+            booking = await client.post("/booking/reservations", json={
+                "room_type": offer["room_type"], "rate_plan_id": offer["rate_plan_id"], "guest_name": "Replika Test", "guest_email": "replica.test@hotel.com",
+                "check_in_date": stay["start_date"], "check_out_date": stay["end_date"],
+            })
+
+    assert booking.status_code == 201
+    assert {"/dashboard/timeline", "/reservations/"} <= set(sessions["replica"])
+    # Booking engine z repliky nečte - dostupnost i zápis rezervace jdou na primární DB
+    assert {"/booking/availability", "/booking/reservations"} <= set(sessions["primary"])
+    assert not {"/booking/availability", "/booking/reservations"} & set(sessions["replica"])
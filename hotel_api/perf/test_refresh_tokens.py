@@ -0,0 +1,36 @@
+# FILE: hotel_api/perf/test_refresh_tokens.py
+"""Rotace refresh tokenů: obnova bez bcryptu, opětovné použití vyměněného tokenu zneplatní jeho rodinu."""
+import time
+
+import httpx
+import pytest
+
+from app.main import app
+from app.security import password_hasher
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_reused_refresh_token_revokes_its_family(seeded_database):
+    email = f"refresh.{time.time_ns()}@hotel.com"
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await client.post("/users/", json={"email": email, "password": "heslo_12345", "role": "recepcni"})
+            tablet = (await client.post("/auth/token", data={"username": email, "password": "heslo_12345"})).json()
+            laptop = (await client.post("/auth/token", data={"username": email, "password": "heslo_12345"})).json()
+
+            hashes = password_hasher.calls
+            rotated = await client.post("/auth/refresh", json={"refresh_token": tablet["refresh_token"]})
+            assert password_hasher.calls == hashes
+            me = await client.get("/users/me", headers={"Authorization": f"Bearer {rotated.json()['access_token']}"})
+            # Původní token už byl vyměněn - jeho znovupoužití odmítne i token, který z něj vznikl
+            reused = await client.post("/auth/refresh", json={"refresh_token": tablet["refresh_token"]})
+            successor = await client.post("/auth/refresh", json={"refresh_token": rotated.json()["refresh_token"]})
+            # Jiné přihlášení téhož uživatele je jiná rodina a platí dál
+            other_login = await client.post("/auth/refresh", json={"refresh_token": laptop["refresh_token"]})
+
+    assert rotated.status_code == 200
+    assert rotated.json()["refresh_token"] != tablet["refresh_token"]
+    assert me.json()["email"] == email
+    assert (reused.status_code, successor.status_code) == (401, 401)
+    assert other_login.status_code == 200
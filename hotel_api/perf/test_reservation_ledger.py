@@ -0,0 +1,83 @@
+# FILE: hotel_api/perf/test_reservation_ledger.py
+"""Ledger nocí (room_nights) při změnách stavu rezervace."""
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app import crud, models, schemas
+from app.database import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+
+async def _cancelled_reservation(seed_config, offset_days: int) -> models.Reservation:
+    """Potvrzená rezervace daleko v budoucnu (mimo okna ostatních testů), zrušená přes API vrstvu."""
+    async with AsyncSessionLocal() as db:
+        reservation = (await db.execute(
+            select(models.Reservation).where(
+                models.Reservation.status == models.ReservationStatus.potvrzeno,
+                models.Reservation.check_in_date >= seed_config.today + timedelta(days=offset_days),
+            ).order_by(models.Reservation.check_in_date).limit(1)
+        )).scalar_one()
+        await crud.update_reservation(db, reservation.id, schemas.ReservationUpdate(status=models.ReservationStatus.zruseno))
+        return reservation
+
+
+async def _ledger_nights(reservation_id: int) -> int:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(func.count()).select_from(models.RoomNight).where(models.RoomNight.reservation_id == reservation_id))).scalar_one()
+
+
+async def test_check_in_of_cancelled_reservation_reclaims_nights(seeded_database, seed_config):
+    reservation = await _cancelled_reservation(seed_config, 200)
+    nights = (reservation.check_out_date - reservation.check_in_date).days
+    assert await _ledger_nights(reservation.id) == 0
+
+    async with AsyncSessionLocal() as db:
+        checked_in = await crud.perform_check_in(db, reservation.id)
+    assert checked_in.status == models.ReservationStatus.ubytovan
+    assert await _ledger_nights(reservation.id) == nights
+
+    # Pokoj už nejde v termínu prodat ani zablokovat podruhé
+    async with AsyncSessionLocal() as db:
+        with pytest.raises(HTTPException) as conflict:
+            await crud.create_room_block(db, schemas.RoomBlockCreate(
+                reason="Test", room_id=reservation.room_id, start_date=reservation.check_in_date, end_date=reservation.check_out_date,
+            ))
+    assert conflict.value.status_code == 409
+
+
+async def test_check_in_of_cancelled_reservation_rejects_resold_room(seeded_database, seed_config):
+    reservation = await _cancelled_reservation(seed_config, 250)
+    async with AsyncSessionLocal() as db:
+        await crud.create_room_block(db, schemas.RoomBlockCreate(
+            reason="Prodáno jinému hostovi", room_id=reservation.room_id, start_date=reservation.check_in_date, end_date=reservation.check_out_date,
+        ))
+
+    async with AsyncSessionLocal() as db:
+        with pytest.raises(HTTPException) as conflict:
+            await crud.perform_check_in(db, reservation.id)
+    assert conflict.value.status_code == 409
+    async with AsyncSessionLocal() as db:
+        assert (await db.get(models.Reservation, reservation.id)).status == models.ReservationStatus.zruseno
+
+
+async def test_update_with_inverted_dates_is_rejected_before_touching_ledger(seeded_database, seed_config):
+    async with AsyncSessionLocal() as db:
+        reservation = (await db.execute(
+            select(models.Reservation).where(
+                models.Reservation.status == models.ReservationStatus.potvrzeno,
+                models.Reservation.check_in_date >= seed_config.today + timedelta(days=260),
+            ).order_by(models.Reservation.check_in_date).limit(1)
+        )).scalar_one()
+        reservation_id, stay = reservation.id, (reservation.check_in_date, reservation.check_out_date)
+        with pytest.raises(HTTPException) as rejected:
+            await crud.update_reservation(db, reservation_id, schemas.ReservationUpdate(check_out_date=stay[0]))
+    assert rejected.value.status_code == 400
+    assert rejected.value.detail == "Datum odjezdu musí být po datu příjezdu."
+    assert await _ledger_nights(reservation_id) == (stay[1] - stay[0]).days
+    async with AsyncSessionLocal() as db:
+        stored = await db.get(models.Reservation, reservation_id)
+        assert (stored.check_in_date, stored.check_out_date) == stay
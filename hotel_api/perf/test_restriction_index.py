@@ -0,0 +1,59 @@
+# FILE: hotel_api/perf/test_restriction_index.py
+"""Index restrikcí: obnova na pozadí a restrikce při zápisu rezervace."""
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete
+
+from app import crud, models, schemas
+from app.database import AsyncSessionLocal
+from app.query_stats import track_queries
+from app.restriction_index import RestrictionIndex
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_stale_index_is_refreshed_in_background_with_replayed_writes(seeded_database):
+    index = RestrictionIndex(horizon_days=60, refresh_seconds=300)
+    async with AsyncSessionLocal() as db:
+        await index.ensure_ready(db)
+    old_series = index.series
+    arrival = date.today() + timedelta(days=4)
+    load_snapshot = index._load
+
+    async def load_with_concurrent_write(db):
+        built = await load_snapshot(db)
+        # Restrikce z jiného požadavku, kterou snapshot z DB už nezachytil
+        index.apply([("Test", 1, arrival, 5, True)])
+        return built
+
+    index._load = load_with_concurrent_write
+    index._built_at -= index.refresh_seconds + 1
+    async with AsyncSessionLocal() as db:
+        with track_queries() as stats:
+            await index.ensure_ready(db)
+    assert stats.count == 0
+    assert index.series is old_series
+
+    await index.schedule_refresh()
+    assert index.series is not old_series
+    assert index.lookup("Test", 1, arrival) == (5, True)
+
+
+async def test_booking_enforces_restriction_written_by_another_worker(seeded_database, seed_config):
+    arrival = seed_config.today + timedelta(days=340)
+    async with AsyncSessionLocal() as db:
+        offers = await crud.find_available_room_types(db, arrival, arrival + timedelta(days=2), 2)
+        room_type, plan_id = offers[0].room_type, offers[0].rate_plan_id
+        # Stop-sell z jiného workeru - přímo do DB, index tohoto procesu o něm neví
+        await db.execute(delete(models.Restriction).where(models.Restriction.room_type == room_type, models.Restriction.rate_plan_id == plan_id, models.Restriction.date == arrival))
+        db.add(models.Restriction(date=arrival, room_type=room_type, rate_plan_id=plan_id, closed_to_arrival=True))
+        await db.commit()
+        with pytest.raises(HTTPException) as rejected:
+            await crud.create_reservation(db, schemas.PublicReservationRequest(
+                room_type=room_type, rate_plan_id=plan_id, guest_name="Stop Sell", guest_email="stop.sell@hotel.com",
+                check_in_date=arrival, check_out_date=arrival + timedelta(days=2),
+            ))
+    assert rejected.value.status_code == 400
+    assert "není možný" in rejected.value.detail
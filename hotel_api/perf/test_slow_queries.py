@@ -0,0 +1,70 @@
+# FILE: hotel_api/perf/test_slow_queries.py
+"""Log pomalých dotazů: obsah záznamu, plán z EXPLAIN mimo požadavek a vzorkování."""
+import json
+import time
+
+import httpx
+import pytest
+
+from app.main import app
+from app.query_stats import track_queries
+from app.slow_queries import parameter_shape, slow_query_log
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def slow_log(tmp_path):
+    """Globální log s prahem ~0 ms (zachytí vše) zapisující do dočasného souboru."""
+    path = tmp_path / "slow.log"
+    saved = (slow_query_log.threshold_seconds, slow_query_log.sample_rate, slow_query_log.explain, slow_query_log._random)
+    slow_query_log.threshold_seconds, slow_query_log.explain = 1e-9, True
+    slow_query_log._explained.clear()
+    slow_query_log.start(str(path), max_bytes=1_000_000, backup_count=1)
+
+    async def records() -> list:
+        await slow_query_log.stop()
+        return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+    yield records
+    await slow_query_log.stop()
+    slow_query_log.threshold_seconds, slow_query_log.sample_rate, slow_query_log.explain, slow_query_log._random = saved
+
+
+def test_parameter_shape_hides_values():
+    assert parameter_shape({"email_1": "host@hotel.cz", "id": 5}) == {"email_1": "str", "id": "int"}
+    assert parameter_shape(("host@hotel.cz", 5)) == ["str", "int"]
+    assert parameter_shape(tuple(range(100))) == {"count": 100, "types": {"int": 100}}
+    assert parameter_shape([{"a": 1}, {"a": 2}], executemany=True) == {"rows": 2, "row": {"a": "int"}}
+
+
+async def test_slow_query_record_with_route_origin_and_plan(seeded_database, slow_log):
+    email = f"pomaly.{time.time_ns()}@hotel.com"
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        with track_queries() as stats:
+            response = await client.post("/users/", json={"email": email, "password": "heslo_12345", "role": "majitel"})
+    assert response.status_code == 201
+    records = await slow_log()
+
+    lookup = next(r for r in records if r["origin"] == "app.crud.get_user_by_email")
+    assert lookup["route"] == "POST /users/"
+    assert lookup["statement"].lstrip().startswith("SELECT")
+    assert lookup["duration_ms"] >= 0 and lookup["database"] == "sqlite"
+    assert set(lookup["parameters"] if isinstance(lookup["parameters"], list) else lookup["parameters"].values()) == {"str"}
+    # Plán doplnil task po odpovědi, ne požadavek - do měřiče požadavku se EXPLAIN nezapočítal
+    assert lookup["plan"] and "explain_error" not in lookup
+    assert stats.count == sum(1 for r in records if r["route"] == "POST /users/")
+    # Hodnoty parametrů (e-mail, hash hesla) se do logu nedostanou
+    assert all(email not in json.dumps(r) for r in records)
+
+
+async def test_sampling_caps_logged_queries(seeded_database, slow_log):
+    slow_query_log.sample_rate, slow_query_log._random = 0.25, iter([0.1, 0.5, 0.9, 0.2] * 100).__next__
+    slow_before, sampled_before = slow_query_log.slow, slow_query_log.sampled_out
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        for _ in range(2):
+            await client.post("/users/", json={"email": f"vzorek.{time.time_ns()}@hotel.com", "password": "heslo_12345", "role": "majitel"})
+    records = await slow_log()
+    slow = slow_query_log.slow - slow_before
+    assert slow > 0
+    assert len(records) == slow - (slow_query_log.sampled_out - sampled_before) == sum(1 for i in range(slow) if [0.1, 0.5, 0.9, 0.2][i % 4] < 0.25)
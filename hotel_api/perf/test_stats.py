@@ -0,0 +1,47 @@
+# FILE: hotel_api/perf/test_stats.py
+"""Denní souhrny: přepočet souběžný se zápisem rezervace."""
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app import crud, models, schemas, stats
+from app.database import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_reservation_written_during_rebuild_is_counted_once(seeded_database, seed_config, monkeypatch):
+    arrival = seed_config.today + timedelta(days=350)
+    async with AsyncSessionLocal() as db:
+        offers = await crud.find_available_room_types(db, arrival, arrival + timedelta(days=2), 2)
+    room_type, plan_id = offers[0].room_type, offers[0].rate_plan_id
+    collect_snapshot = stats._collect_stats
+    writers = []
+
+    async def book():
+        async with AsyncSessionLocal() as db:
+            return await crud.create_reservation(db, schemas.PublicReservationRequest(
+                room_type=room_type, rate_plan_id=plan_id, guest_name="Souběh Přepočtu", guest_email="rebuild.race@hotel.com",
+                check_in_date=arrival, check_out_date=arrival + timedelta(days=2),
+            ))
+
+    async def collect_with_concurrent_booking(db, start_date, end_date):
+        delta = await collect_snapshot(db, start_date, end_date)
+        # Rezervace z jiného požadavku zapsaná poté, co přepočet přečetl zdrojové tabulky
+        writers.append(asyncio.get_running_loop().create_task(book()))
+        await asyncio.sleep(0.3)
+        return delta
+
+    monkeypatch.setattr(stats, "_collect_stats", collect_with_concurrent_booking)
+    async with AsyncSessionLocal() as db:
+        await stats.rebuild_daily_stats(db, arrival, arrival)
+    await writers[0]
+    monkeypatch.undo()
+
+    async with AsyncSessionLocal() as db:
+        stored = (await db.execute(select(models.DailyStat).where(models.DailyStat.day == arrival, models.DailyStat.room_type == room_type))).scalar_one()
+        expected = (await stats._collect_stats(db, arrival, arrival))[(arrival, room_type)]
+    assert stored.rooms_sold == expected["rooms_sold"]
+    assert stored.room_revenue == pytest.approx(expected["room_revenue"])
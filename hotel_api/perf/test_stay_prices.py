@@ -0,0 +1,64 @@
+# FILE: hotel_api/perf/test_stay_prices.py
+"""Hromadná cena pobytu (`get_stay_prices`) proti součtu cen jednotlivých nocí v DB - z indexu i bez něj."""
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import delete, distinct, insert, select
+
+from app import crud, models, schemas
+from app.database import AsyncSessionLocal
+from app.pricing_index import price_index
+
+pytestmark = pytest.mark.anyio
+
+
+async def _per_night_total(db, room_type, plan_id, start, nights, markup=1.0):
+    """Součet po nocích, každá noc vlastním dotazem; None, pokud některá noc cenu nemá."""
+    total = 0.0
+    for i in range(nights):
+        price = (await db.execute(select(models.Rate.price).where(
+            models.Rate.room_type == room_type, models.Rate.rate_plan_id == plan_id, models.Rate.date == start + timedelta(days=i),
+        ))).scalar_one_or_none()
+        if price is None:
+            return None
+        total += round(price * markup, 2)
+    return total
+
+
+async def test_batched_stay_prices_match_per_night_sum(seeded_database, seed_config, monkeypatch):
+    start, nights = seed_config.today + timedelta(days=356), 3
+    end = start + timedelta(days=nights)
+    async with AsyncSessionLocal() as db:
+        full_type, gappy_type = sorted((await db.execute(select(distinct(models.Room.type)))).scalars())[:2]
+        base_plan_id = (await db.execute(select(models.RatePlan.id).where(models.RatePlan.parent_plan_id.is_(None)).order_by(models.RatePlan.id).limit(1))).scalar_one()
+        derived = await crud.create_rate_plan(db, schemas.RatePlanCreate(
+            name="Flexibilní +10 % (test ceny pobytu)", parent_plan_id=base_plan_id,
+            modifier_type=models.RateModifierType.percent, modifier_value=10,
+        ))
+        derived_id = derived.id
+        # Ceny okna nastavené přímo: jeden typ má všechny noci, druhému prostřední noc chybí
+        await db.execute(delete(models.Rate).where(models.Rate.room_type.in_([full_type, gappy_type]), models.Rate.rate_plan_id == base_plan_id, models.Rate.date >= start, models.Rate.date < end))
+        await db.execute(delete(models.RateRange).where(models.RateRange.room_type.in_([full_type, gappy_type]), models.RateRange.rate_plan_id == base_plan_id, models.RateRange.date_from < end, models.RateRange.date_to >= start))
+        await db.execute(insert(models.Rate), [
+            {"room_type": full_type, "rate_plan_id": base_plan_id, "date": start + timedelta(days=i), "price": 1000.40 + 100 * i} for i in range(nights)
+        ] + [
+            {"room_type": gappy_type, "rate_plan_id": base_plan_id, "date": start + timedelta(days=i), "price": 900.0} for i in (0, 2)
+        ])
+        await db.commit()
+        expected_base = await _per_night_total(db, full_type, base_plan_id, start, nights)
+        expected_derived = await _per_night_total(db, full_type, base_plan_id, start, nights, markup=1.1)
+        assert await _per_night_total(db, gappy_type, base_plan_id, start, nights) is None
+
+        await price_index.rebuild(db)
+        assert price_index.covers(start, end)
+        from_index = await crud.get_stay_prices(db, start, end, [full_type, gappy_type])
+        monkeypatch.setattr(price_index, "enabled", False)
+        from_db = await crud.get_stay_prices(db, start, end, [full_type, gappy_type])
+
+    for quotes in (from_index, from_db):
+        assert quotes[(full_type, base_plan_id)][1] == pytest.approx(expected_base)
+        assert quotes[(full_type, derived_id)][1] == pytest.approx(expected_derived)
+        # Noc bez ceny = pobyt nelze prodat v žádném plánu odvozeném z tohoto
+        assert (gappy_type, base_plan_id) not in quotes
+        assert (gappy_type, derived_id) not in quotes
+    assert from_index == from_db
@@ -0,0 +1,46 @@
+# FILE: hotel_api/perf/test_storm.py
+"""Booking storm jako regresní brána: souběžné rezervace nesmí prodat žádnou noc dvakrát."""
+from datetime import timedelta
+
+import httpx
+import pytest
+from sqlalchemy import delete
+
+from app import models
+from app.database import AsyncSessionLocal
+from app.main import app
+from perf.storm import find_double_bookings, gate_failures, run_storm
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_scan_finds_overlapping_reservations(seeded_database, seed_config):
+    # Mimo horizont generovaných dat, ať scan vidí jen tyto dvě rezervace
+    check_in = seed_config.today + timedelta(days=seed_config.future_days + 30)
+    async with AsyncSessionLocal() as db:
+        rows = [
+            models.Reservation(room_id=1, guest_id=1, check_in_date=check_in, check_out_date=check_in + timedelta(days=3), status=models.ReservationStatus.potvrzeno),
+            models.Reservation(room_id=1, guest_id=2, check_in_date=check_in + timedelta(days=2), check_out_date=check_in + timedelta(days=4), status=models.ReservationStatus.ubytovan),
+            models.Reservation(room_id=1, guest_id=3, check_in_date=check_in, check_out_date=check_in + timedelta(days=4), status=models.ReservationStatus.zruseno),
+        ]
+        db.add_all(rows)
+        await db.flush()
+        ids = [r.id for r in rows]
+        await db.commit()
+        try:
+            found = await find_double_bookings(db, check_in, check_in + timedelta(days=10))
+            assert [(d.room_id, d.night, d.reservation_ids) for d in found] == [(1, check_in + timedelta(days=2), ids[:2])]
+        finally:
+            await db.execute(delete(models.Reservation).where(models.Reservation.id.in_(ids)))
+            await db.commit()
+
+
+async def test_booking_storm_does_not_overbook(seeded_database, seed_config):
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://storm", timeout=60) as client:
+            result = await run_storm(client, attempts=80, concurrency=16, days=10, date_skew=1.5, book_ratio=1.0)
+    async with AsyncSessionLocal() as db:
+        report = result.report(await find_double_bookings(db, seed_config.today, seed_config.today + timedelta(days=20)))
+    assert report["bookings"] > 0
+    assert report["error_rate"] == 0
+    assert gate_failures(report) == []
@@ -0,0 +1,64 @@
+# FILE: hotel_api/perf/test_timeline.py
+"""Stránkování časové osy pokojů (`GET /dashboard/timeline`) a delta režim (`/timeline/changes`)."""
+import asyncio
+import time
+from datetime import timedelta
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app import crud, models, schemas
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.main import app
+
+pytestmark = pytest.mark.anyio
+
+
+async def _admin_headers(client: httpx.AsyncClient) -> dict:
+    email = f"timeline.{time.time_ns()}@hotel.com"
+    await client.post("/users/", json={"email": email, "password": "heslo_12345", "role": "majitel"})
+    token = (await client.post("/auth/token", data={"username": email, "password": "heslo_12345"})).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def test_timeline_returns_all_rooms_and_total_count(seeded_database, seed_config):
+    window = {"start_date": seed_config.today.isoformat(), "end_date": (seed_config.today + timedelta(days=7)).isoformat()}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            headers = await _admin_headers(client)
+            everything = await client.get("/dashboard/timeline", params=window, headers=headers)
+            page = await client.get("/dashboard/timeline", params={**window, "skip": 10, "limit": 25}, headers=headers)
+
+    # Bez `limit` přijdou všechny pokoje (seed jich má víc než dřívější výchozí stránka 100)
+    total = int(everything.headers["X-Total-Count"])
+    assert total >= seed_config.rooms > 100
+    assert len(everything.json()) == total
+    assert int(page.headers["X-Total-Count"]) == total
+    assert [room["room_id"] for room in page.json()] == [room["room_id"] for room in everything.json()[10:35]]
+
+
+async def test_timeline_delta_returns_only_changes_after_cursor(seeded_database, seed_config, monkeypatch):
+    # Bez bezpečnostní prodlevy stačí na posun kurzoru počkat do další celé sekundy
+    monkeypatch.setattr(settings, "TIMELINE_DELTA_SAFETY_LAG_SECONDS", 0)
+    window = (seed_config.today + timedelta(days=379), seed_config.today + timedelta(days=385))
+    stay = (window[0] + timedelta(days=1), window[0] + timedelta(days=3))
+    async with AsyncSessionLocal() as db:
+        rooms = (await db.execute(select(models.Room.id, models.Room.type).order_by(models.Room.id).limit(2))).all()
+        since = crud.timeline_cursor()
+        kept_id = (await crud.create_room_block(db, schemas.RoomBlockCreate(reason="Delta - zůstává", room_id=rooms[0].id, start_date=stay[0], end_date=stay[1]))).id
+        dropped_id = (await crud.create_room_block(db, schemas.RoomBlockCreate(reason="Delta - smazaná", room_id=rooms[1].id, start_date=stay[0], end_date=stay[1]))).id
+        await crud.delete_room_block(db, dropped_id)
+        await asyncio.sleep(1.1)
+
+        delta = await crud.get_timeline_changes(db, since, *window)
+        other_type = next(room_type for room_type in {room.type for room in (await db.execute(select(models.Room.type).distinct()))} if room_type != rooms[0].type)
+        filtered = await crud.get_timeline_changes(db, since, *window, room_type=other_type)
+        repeated = await crud.get_timeline_changes(db, delta["cursor"], *window)
+
+    # Jen změněné blokace, ne celý kalendář; smazaná přijde jako záznam o smazání
+    assert [change["event"]["block_id"] for change in delta["changed"]] == [kept_id]
+    assert {"type": "block", "id": dropped_id, "room_id": rooms[1].id} in delta["removed"]
+    assert {"type": "block", "id": kept_id, "room_id": rooms[0].id} in filtered["removed"]
+    assert repeated["changed"] == [] and repeated["removed"] == []
@@ -0,0 +1,27 @@
+# FILE: hotel_api/perf/test_users.py
+"""Změna role a aktivace uživatele (`PATCH /users/{user_id}`)."""
+import time
+
+import httpx
+import pytest
+
+from app.main import app
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_explicit_null_is_rejected(seeded_database):
+    email = f"null.{time.time_ns()}@hotel.com"
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await client.post("/users/", json={"email": email, "password": "heslo_12345", "role": "majitel"})
+            token = (await client.post("/auth/token", data={"username": email, "password": "heslo_12345"})).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            user_id = (await client.get("/users/me", headers=headers)).json()["id"]
+
+            for body in ({"role": None}, {"is_active": None}):
+                assert (await client.patch(f"/users/{user_id}", json=body, headers=headers)).status_code == 422
+            # Vynechané pole se nemění
+            response = await client.patch(f"/users/{user_id}", json={"role": "majitel"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["is_active"] is True
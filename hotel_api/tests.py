@@ -1,4 +1,6 @@
 # FILE: hotel_api/tests.py
+# Scénář proti běžícímu serveru. Stejný scénář bez serveru a externí DB, s měřením latence
+# a počtu dotazů na endpoint: python -m perf.harness (viz API_DOCS.md, sekce 5).
 import requests
 import time
 from datetime import datetime, timedelta